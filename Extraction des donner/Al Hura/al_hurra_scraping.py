@@ -1,21 +1,15 @@
 import requests
-from bs4 import BeautifulSoup
-import pandas as pd
 from datetime import datetime
+import os
+import sys
 
-# Tags list (Arabic remains for content matching)
-TAGS = [
-    "حماس", "إسرائيل", "اسرائيل", "الفلسطينيين", "نتنياهو", "غزة", "أسرى",
-    "الاحتلال", "فلسطينية", "الإسرائيلي", "استشهاد", "الجيش الإسرائيلي",
-    "المقاومة", "المقاومة الإسلامية", "سرايا القدس", "القسام", "طوفان الأقصى",
-    "الفلسطينية", "الإسرائيلية", "أبو عبيدة", "عبيدة", "مقاطعة", "المقاطعة",
-    "سوريا", "بشار", "الأسد", "السوريين", "السورية",
-    "دونالد", "ترامب", "أميركا", "الرئاسة الأميركية", "انتخابات", "الأميركية",
-    "الانتخابات", "الولايات المتحدة", "ولاية ثانية", "الانتخابات الأميركية",
-    "الأميركي", "الانتخابية", "الرئاسية", "التصويت", "المرشح", "الولاية", "الرئيس",
-    "حرائق", "كاليفورنيا", "الغابات", "نيران", "اندلاع حرائق", "الحرائق",
-    "لوس أنجلوس", "لوس", "أنجلوس", "للحرائق", "الخسائر", "للحرق", "الرياح القوية"
-]
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from crawl_frontier import CrawlFrontier, DONE
+from html_parsing import alhurra_article, alhurra_teasers
+from http_cache import HttpCache
+from record_sink import open_sink
+from tag_matcher import TAGS, TagMatcher
 
 # Arabic month conversion
 ARABIC_MONTHS = {
@@ -24,6 +18,13 @@ ARABIC_MONTHS = {
     'سبتمبر': '09', 'أكتوبر': '10', 'نوفمبر': '11', 'ديسمبر': '12'
 }
 
+OUTPUT_DIR = 'alhurra_10k'  # Rotating Parquet part files, see record_sink.py
+FRONTIER_SOURCE = 'alhurra_10k'
+
+HTTP_CACHE = HttpCache()
+TAG_MATCHER = TagMatcher(TAGS)  # Built once, matches every tag in one pass
+FRONTIER = CrawlFrontier()
+
 
 def parse_date(date_str):
     day, month_ar, year = date_str.split()
@@ -32,105 +33,109 @@ def parse_date(date_str):
 
 
 def fetch_article_content(url):
+    """Content and author, None (and the URL marked failed) when the fetch failed"""
     try:
-        response = requests.get(url, timeout=10)
-        soup = BeautifulSoup(response.text, 'html.parser')
-
-        content_div = soup.find('div', class_='article__body')
-        content = ' '.join([p.text.strip() for p in content_div.find_all('p')]) if content_div else ''
-
-        author_div = soup.find('div', class_='page-header__meta-item')
-        author = author_div.text.split(':')[-1].strip() if author_div else None
-
-        return {'content': content, 'author': author}
+        response = HTTP_CACHE.fetch(url, timeout=10)
+        return alhurra_article(response.text)
     except Exception as e:
         print(f"Error fetching article: {e}")
-        return {'content': '', 'author': None}
+        FRONTIER.mark_failed(FRONTIER_SOURCE, url, e)
+        return None
 
 
 def scrape_alhurra():
     BASE_URL = "https://www.alhurra.com/search"
-    page = 0
-    collected = 0
+    page = FRONTIER.get_cursor(FRONTIER_SOURCE, page=0)['page']
+    collected = FRONTIER.count(FRONTIER_SOURCE, DONE)
     MAX_ARTICLES = 10400
 
-    articles = []
-
-    while collected < MAX_ARTICLES:
-        params = {
-            "search_api_fulltext": "",
-            "type": "2",
-            "sort_by": "publication_time",
-            "changed": "All",
-            "_wrapper_format": "html",
-            "page": page
-        }
-
-        try:
-            response = requests.get(BASE_URL, params=params)
-            soup = BeautifulSoup(response.text, 'html.parser')
-            articles_list = soup.find_all('div', class_='teaser teaser--dated')
-
-            if not articles_list:
-                break
-
-            for article in articles_list:
-                title_element = article.find('h2', class_='teaser__title')
-                if not title_element:
-                    continue
-                title = title_element.text.strip()
-
-                if not any(tag.lower() in title.lower() for tag in TAGS):
-                    continue
-
-                link = article.find('a', class_='teaser__title-link')['href']
-                full_url = f"https://www.alhurra.com{link}"
-
-                date_element = article.find('div', class_='teaser__date')
-                if not date_element:
-                    continue
-
-                try:
-                    pub_date = parse_date(date_element.text.strip())
-                except:
-                    continue
-
-                desc_element = article.find('div', class_='teaser__text')
-                description = desc_element.text.strip() if desc_element else ''
-
-                img_element = article.find('img', class_='media__element')
-                image_url = img_element['src'] if img_element else ''
-
-                article_data = fetch_article_content(full_url)
-
-                articles.append({
-                    'source': 'Al Hurra',
-                    'author': article_data['author'],
-                    'title': title,
-                    'content': article_data['content'],
-                    'description': description,
-                    'url': full_url,
-                    'image_url': image_url,
-                    'published_at': pub_date.strftime('%Y-%m-%d'),
-                    'tags': [tag for tag in TAGS if tag.lower() in title.lower()]
-                })
-
-                collected += 1
-                print(f"Collected: {collected}/{MAX_ARTICLES}")
-
-                if collected >= MAX_ARTICLES:
+    # URLs are marked done, and the resume page saved, only once the
+    # part file holding their rows is on disk
+    finished = {'page': page}
+    first_failed = None  # First listing page with a failed article, crawled again on resume
+
+    def mark_done(urls):
+        for url in urls:
+            FRONTIER.mark_done(FRONTIER_SOURCE, url)
+        FRONTIER.set_cursor(FRONTIER_SOURCE, page=finished['page'])
+
+    collected_urls = set()  # The same teaser can show up on two listing pages
+    with open_sink(OUTPUT_DIR, on_durable=mark_done) as sink:
+        while collected < MAX_ARTICLES:
+            params = {
+                "search_api_fulltext": "",
+                "type": "2",
+                "sort_by": "publication_time",
+                "changed": "All",
+                "_wrapper_format": "html",
+                "page": page
+            }
+
+            try:
+                response = requests.get(BASE_URL, params=params)
+                articles_list = alhurra_teasers(response.text)
+
+                if not articles_list:
                     break
 
-            page += 1
-
-        except Exception as e:
-            print(f"Page error: {e}")
-            break
+                for article in articles_list:
+                    title = article['title']
+                    if not title or not article['href']:
+                        continue
+
+                    if not TAG_MATCHER.matches(title):
+                        continue
+
+                    full_url = f"https://www.alhurra.com{article['href']}"
+                    if FRONTIER.is_done(FRONTIER_SOURCE, full_url) or full_url in collected_urls:
+                        continue
+
+                    if not article['date']:
+                        continue
+
+                    try:
+                        pub_date = parse_date(article['date'])
+                    except:
+                        continue
+
+                    article_data = fetch_article_content(full_url)
+                    if article_data is None:
+                        first_failed = page if first_failed is None else first_failed
+                        continue
+
+                    sink.write({
+                        'source': 'Al Hurra',
+                        'author': article_data['author'],
+                        'title': title,
+                        'content': article_data['content'],
+                        'description': article['description'],
+                        'url': full_url,
+                        'image_url': article['image_url'],
+                        'published_at': pub_date.strftime('%Y-%m-%d'),
+                        'tags': TAG_MATCHER.tags(f"{title}\n{article_data['content']}")
+                    })
+
+                    collected_urls.add(full_url)
+                    collected += 1
+                    print(f"Collected: {collected}/{MAX_ARTICLES}")
+
+                    if collected >= MAX_ARTICLES:
+                        break
+
+                page += 1
+                finished['page'] = page if first_failed is None else first_failed
+                sink.tick()
+                if not sink.pending:
+                    FRONTIER.set_cursor(FRONTIER_SOURCE, page=finished['page'])
+
+            except Exception as e:
+                print(f"Page error: {e}")
+                break
 
-    return pd.DataFrame(articles)
+    return collected
 
 
-# Run and save
-df = scrape_alhurra()
-df.to_csv('alhurra_10k.csv', index=False)
+# Run and save, resuming from the last finished page
+scrape_alhurra()
+FRONTIER.close()
 print("Scraping completed successfully!")
\ No newline at end of file
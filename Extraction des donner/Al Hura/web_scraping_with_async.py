@@ -1,21 +1,22 @@
 import aiohttp
 import asyncio
-from bs4 import BeautifulSoup
-import pandas as pd
 from datetime import datetime
+from functools import partial
+import os
+import sys
 
-TAGS = [
-    "حماس", "إسرائيل", "اسرائيل", "الفلسطينيين", "نتنياهو", "غزة", "أسرى",
-    "الاحتلال", "فلسطينية", "الإسرائيلي", "استشهاد", "الجيش الإسرائيلي",
-    "المقاومة", "المقاومة الإسلامية", "سرايا القدس", "القسام", "طوفان الأقصى",
-    "الفلسطينية", "الإسرائيلية", "أبو عبيدة", "عبيدة", "مقاطعة", "المقاطعة",
-    "سوريا", "بشار", "الأسد", "السوريين", "السورية",
-    "دونالد", "ترامب", "أميركا", "الرئاسة الأميركية", "انتخابات", "الأميركية",
-    "الانتخابات", "الولايات المتحدة", "ولاية ثانية", "الانتخابات الأميركية",
-    "الأميركي", "الانتخابية", "الرئاسية", "التصويت", "المرشح", "الولاية", "الرئيس",
-    "حرائق", "كاليفورنيا", "الغابات", "نيران", "اندلاع حرائق", "الحرائق",
-    "لوس أنجلوس", "لوس", "أنجلوس", "للحرائق", "الخسائر", "للحرق", "الرياح القوية"
-]
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from crawl_engine import crawl
+from crawl_frontier import CrawlFrontier, DONE
+from html_parsing import ParserPool, alhurra_article, alhurra_teasers
+from http_cache import HttpCache
+from record_sink import open_sink
+from tag_matcher import TAGS, TagMatcher
+
+MAX_ARTICLES = 10400
+PAGES_IN_FLIGHT = 8  # Listing pages fetched ahead of the article workers
+ARTICLE_WORKERS = 50
 
 ARABIC_MONTHS = {
     'يناير': '01', 'فبراير': '02', 'مارس': '03', 'أبريل': '04',
@@ -23,6 +24,14 @@ ARABIC_MONTHS = {
     'سبتمبر': '09', 'أكتوبر': '10', 'نوفمبر': '11', 'ديسمبر': '12'
 }
 
+OUTPUT_DIR = 'alhurra_async'  # Rotating Parquet part files, see record_sink.py
+FRONTIER_SOURCE = 'alhurra_async'
+
+HTTP_CACHE = HttpCache()
+TAG_MATCHER = TagMatcher(TAGS)  # Built once, matches every tag in one pass
+FRONTIER = CrawlFrontier()
+FAILED_PAGES = set()  # Listing pages with an article that failed, the resume point can't pass them
+
 
 async def parse_date(date_str):
     try:
@@ -33,25 +42,18 @@ async def parse_date(date_str):
         return None
 
 
-async def fetch_article(session, url):
+async def fetch_article(session, url, pool):
+    """Content and author, None (and the URL marked failed) when the fetch failed"""
     try:
-        async with session.get(url) as response:
-            html = await response.text()
-            soup = BeautifulSoup(html, 'html.parser')
-
-            content_div = soup.find('div', class_='article__body')
-            content = ' '.join([p.text.strip() for p in content_div.find_all('p')]) if content_div else ''
-
-            author_div = soup.find('div', class_='page-header__meta-item')
-            author = author_div.text.split(':')[-1].strip() if author_div else None
-
-            return {'content': content, 'author': author}
+        response = await HTTP_CACHE.fetch_async(session, url)
+        return await pool.run(alhurra_article, response.text)
     except Exception as e:
         print(f"Error fetching article: {e}")
-        return {'content': '', 'author': None}
+        FRONTIER.mark_failed(FRONTIER_SOURCE, url, e)
+        return None
 
 
-async def process_page(session, page_num, sem):
+async def process_page(session, page_num, sem, pool):
     async with sem:
         params = {
             "search_api_fulltext": "",
@@ -65,79 +67,96 @@ async def process_page(session, page_num, sem):
         try:
             async with session.get("https://www.alhurra.com/search", params=params) as response:
                 html = await response.text()
-                soup = BeautifulSoup(html, 'html.parser')
-                articles = soup.find_all('div', class_='teaser teaser--dated')
-                return articles
+            teasers = await pool.run(alhurra_teasers, html)
+            for teaser in teasers:
+                teaser['page'] = page_num
+            return teasers
         except:
             return []
 
 
-async def process_article(session, article):
-    title_element = article.find('h2', class_='teaser__title')
-    if not title_element:
+async def process_article(session, article, pool):
+    title = article['title']
+    if not title or not article['href']:
         return None
 
-    title = title_element.text.strip()
-    if not any(tag.lower() in title.lower() for tag in TAGS):
+    if not TAG_MATCHER.matches(title):
         return None
 
-    link = article.find('a', class_='teaser__title-link')['href']
-    full_url = f"https://www.alhurra.com{link}"
+    full_url = f"https://www.alhurra.com{article['href']}"
+    if FRONTIER.is_done(FRONTIER_SOURCE, full_url):
+        return None
 
-    date_element = article.find('div', class_='teaser__date')
-    if not date_element:
+    if not article['date']:
         return None
 
-    pub_date = await parse_date(date_element.text.strip())
+    pub_date = await parse_date(article['date'])
     if not pub_date:
         return None
 
-    desc_element = article.find('div', class_='teaser__text')
-    description = desc_element.text.strip() if desc_element else ''
-
-    img_element = article.find('img', class_='media__element')
-    image_url = img_element['src'] if img_element else ''
-
-    article_data = await fetch_article(session, full_url)
+    article_data = await fetch_article(session, full_url, pool)
+    if article_data is None:
+        FAILED_PAGES.add(article['page'])  # Crawled again on resume
+        return None
 
     return {
         'source': 'Al Hurra',
         'author': article_data['author'],
         'title': title,
         'content': article_data['content'],
-        'description': description,
+        'description': article['description'],
         'url': full_url,
-        'image_url': image_url,
+        'image_url': article['image_url'],
         'published_at': pub_date.strftime('%Y-%m-%d'),
-        'tags': [tag for tag in TAGS if tag.lower() in title.lower()]
+        'tags': TAG_MATCHER.tags(f"{title}\n{article_data['content']}")
     }
 
 
 async def main():
     connector = aiohttp.TCPConnector(limit=50)
     sem = asyncio.Semaphore(20)  # Concurrent page requests
-    articles = []
-    page_num = 0
-    MAX_ARTICLES = 10400
-
-    async with aiohttp.ClientSession(connector=connector) as session:
-        while len(articles) < MAX_ARTICLES:
-            page_articles = await process_page(session, page_num, sem)
-            if not page_articles:
-                break
-
-            tasks = [process_article(session, article) for article in page_articles]
-            results = await asyncio.gather(*tasks)
-
-            for result in results:
-                if result and len(articles) < MAX_ARTICLES:
-                    articles.append(result)
-                    print(f"Collected: {len(articles)}/{MAX_ARTICLES}")
-
-            page_num += 1
-
-    df = pd.DataFrame(articles)
-    df.to_csv('alhurra_async.csv', index=False)
+    start_page = FRONTIER.get_cursor(FRONTIER_SOURCE, page=0)['page']
+    collected = FRONTIER.count(FRONTIER_SOURCE, DONE)
+    if collected:
+        print(f"Resuming from page {start_page} with {collected} articles")
+
+    # URLs are marked done, and the resume page saved, only once the
+    # part file holding their rows is on disk
+    finished = {'page': start_page}
+
+    def mark_done(urls):
+        for url in urls:
+            FRONTIER.mark_done(FRONTIER_SOURCE, url)
+        FRONTIER.set_cursor(FRONTIER_SOURCE, page=finished['page'])
+
+    collected_urls = set()  # The same teaser can show up on two listing pages
+    with open_sink(OUTPUT_DIR, on_durable=mark_done) as sink:
+
+        def collect(result):
+            nonlocal collected
+            if result['url'] in collected_urls:
+                return False
+            collected_urls.add(result['url'])
+            sink.write(result)
+            collected += 1
+            print(f"Collected: {collected}/{MAX_ARTICLES}")
+            return collected >= MAX_ARTICLES
+
+        def checkpoint(page_num):
+            finished['page'] = min(FAILED_PAGES | {page_num})
+            sink.tick()
+            if not sink.pending:
+                FRONTIER.set_cursor(FRONTIER_SOURCE, page=finished['page'])
+
+        if collected < MAX_ARTICLES:
+            with ParserPool() as pool:
+                async with aiohttp.ClientSession(connector=connector) as session:
+                    await crawl(session, partial(process_page, sem=sem, pool=pool),
+                                partial(process_article, pool=pool), collect,
+                                on_checkpoint=checkpoint, start_page=start_page,
+                                pages_in_flight=PAGES_IN_FLIGHT, workers=ARTICLE_WORKERS)
+
+    FRONTIER.close()
     print("Scraping completed successfully!")
 
 
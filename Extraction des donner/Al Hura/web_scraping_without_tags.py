@@ -1,8 +1,17 @@
 import aiohttp
 import asyncio
-from bs4 import BeautifulSoup
-import pandas as pd
 from datetime import datetime
+from functools import partial
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from crawl_engine import crawl
+from crawl_frontier import CrawlFrontier, DONE
+from html_parsing import ParserPool, alhurra_article, alhurra_teasers
+from http_cache import HttpCache
+from record_sink import open_sink
 
 ARABIC_MONTHS = {
     'يناير': '01', 'فبراير': '02', 'مارس': '03', 'أبريل': '04',
@@ -12,6 +21,15 @@ ARABIC_MONTHS = {
 
 STOP_DATE = datetime(2023, 10, 7)
 MAX_ARTICLES = 50000
+PAGES_IN_FLIGHT = 16  # Listing pages fetched ahead of the article workers
+ARTICLE_WORKERS = 150
+
+OUTPUT_DIR = 'alhurra_full_collection'  # Rotating Parquet part files, see record_sink.py
+FRONTIER_SOURCE = 'alhurra_full_collection'
+
+HTTP_CACHE = HttpCache()
+FRONTIER = CrawlFrontier()
+FAILED_PAGES = set()  # Listing pages with an article that failed, the resume point can't pass them
 
 
 async def parse_date(date_str):
@@ -23,25 +41,18 @@ async def parse_date(date_str):
         return None
 
 
-async def fetch_article(session, url):
+async def fetch_article(session, url, pool):
+    """Content and author, None (and the URL marked failed) when the fetch failed"""
     try:
-        async with session.get(url, timeout=30) as response:
-            html = await response.text()
-            soup = BeautifulSoup(html, 'html.parser')
-
-            content_div = soup.find('div', class_='article__body')
-            content = ' '.join([p.text.strip() for p in content_div.find_all('p')]) if content_div else ''
-
-            author_div = soup.find('div', class_='page-header__meta-item')
-            author = author_div.text.split(':')[-1].strip() if author_div else None
-
-            return {'content': content, 'author': author}
+        response = await HTTP_CACHE.fetch_async(session, url, timeout=30)
+        return await pool.run(alhurra_article, response.text)
     except Exception as e:
         print(f"Article fetch error: {e}")
-        return {'content': '', 'author': None}
+        FRONTIER.mark_failed(FRONTIER_SOURCE, url, e)
+        return None
 
 
-async def process_page(session, page_num, sem):
+async def process_page(session, page_num, sem, pool):
     async with sem:
         try:
             params = {
@@ -55,40 +66,42 @@ async def process_page(session, page_num, sem):
 
             async with session.get("https://www.alhurra.com/search", params=params) as response:
                 html = await response.text()
-                soup = BeautifulSoup(html, 'html.parser')
-                return soup.find_all('div', class_='teaser teaser--dated')
+            teasers = await pool.run(alhurra_teasers, html)
+            for teaser in teasers:
+                teaser['page'] = page_num
+            return teasers
         except Exception as e:
             print(f"Page error: {e}")
             return []
 
 
-async def process_article(session, article):
+async def process_article(session, article, pool):
     try:
-        title = article.find('h2', class_='teaser__title').text.strip()
-        link = f"https://www.alhurra.com{article.find('a', class_='teaser__title-link')['href']}"
+        if not article['title'] or not article['href']:
+            return None
+        title = article['title']
+        link = f"https://www.alhurra.com{article['href']}"
+        if FRONTIER.is_done(FRONTIER_SOURCE, link):
+            return None
 
-        date_str = article.find('div', class_='teaser__date').text.strip()
-        pub_date = await parse_date(date_str)
+        pub_date = await parse_date(article['date'])
 
         if not pub_date or pub_date < STOP_DATE:
             return None
 
-        desc_element = article.find('div', class_='teaser__text')
-        description = desc_element.text.strip() if desc_element else ''
-
-        img_element = article.find('img', class_='media__element')
-        image_url = img_element['src'] if img_element else ''
-
-        article_data = await fetch_article(session, link)
+        article_data = await fetch_article(session, link, pool)
+        if article_data is None:
+            FAILED_PAGES.add(article['page'])  # Crawled again on resume
+            return None
 
         return {
             'source': 'Al Hurra',
             'author': article_data['author'],
             'title': title,
             'content': article_data['content'],
-            'description': description,
+            'description': article['description'],
             'url': link,
-            'image_url': image_url,
+            'image_url': article['image_url'],
             'published_at': pub_date.strftime('%Y-%m-%d'),
             'tags': []
         }
@@ -97,48 +110,67 @@ async def process_article(session, article):
         return None
 
 
+async def is_past_stop_date(page_articles):
+    """True once the oldest teaser of a listing page is older than STOP_DATE"""
+    dates = []
+    for article in page_articles:
+        if article['date']:
+            dates.append(await parse_date(article['date']))
+    dates = [d for d in dates if d]
+    return bool(dates) and min(dates) < STOP_DATE
+
+
 async def main():
     connector = aiohttp.TCPConnector(limit=200)
     sem = asyncio.Semaphore(100)  # High concurrency
-    articles = []
-    page_num = 0
-    stop_flag = False
-
-    async with aiohttp.ClientSession(connector=connector) as session:
-        while len(articles) < MAX_ARTICLES and not stop_flag:
-            print(f"Processing page {page_num}...")
-            page_articles = await process_page(session, page_num, sem)
-
-            if not page_articles:
-                print("No more articles found")
-                break
-
-            tasks = [process_article(session, article) for article in page_articles]
-            results = await asyncio.gather(*tasks)
-
-            for result in results:
-                if result:
-                    articles.append(result)
-                    current_date = datetime.strptime(result['published_at'], '%Y-%m-%d')
-
-                    print(f"Collected: {len(articles)} | Date: {result['published_at']}")
-
-                    if current_date <= STOP_DATE:
-                        print("Reached stop date!")
-                        stop_flag = True
-                        break
-
-                if len(articles) >= MAX_ARTICLES:
-                    break
-
-            if stop_flag:
-                break
-
-            page_num += 1
-
-    df = pd.DataFrame(articles)
-    df.to_csv('alhurra_full_collection_2.csv', index=False)
-    print(f"Finished with {len(articles)} articles")
+    start_page = FRONTIER.get_cursor(FRONTIER_SOURCE, page=0)['page']
+    collected = FRONTIER.count(FRONTIER_SOURCE, DONE)
+    if collected:
+        print(f"Resuming from page {start_page} with {collected} articles")
+
+    async def fetch_page(session, page_num):
+        print(f"Processing page {page_num}...")
+        return await process_page(session, page_num, sem, pool)
+
+    # URLs are marked done, and the resume page saved, only once the
+    # part file holding their rows is on disk
+    finished = {'page': start_page}
+
+    def mark_done(urls):
+        for url in urls:
+            FRONTIER.mark_done(FRONTIER_SOURCE, url)
+        FRONTIER.set_cursor(FRONTIER_SOURCE, page=finished['page'])
+
+    collected_urls = set()  # The same teaser can show up on two listing pages
+    with open_sink(OUTPUT_DIR, on_durable=mark_done) as sink:
+
+        def collect(result):
+            nonlocal collected
+            if result['url'] in collected_urls:
+                return False
+            collected_urls.add(result['url'])
+            sink.write(result)
+            collected += 1
+            print(f"Collected: {collected} | Date: {result['published_at']}")
+            return collected >= MAX_ARTICLES
+
+        def checkpoint(page_num):
+            finished['page'] = min(FAILED_PAGES | {page_num})
+            sink.tick()
+            if not sink.pending:
+                FRONTIER.set_cursor(FRONTIER_SOURCE, page=finished['page'])
+
+        if collected < MAX_ARTICLES:
+            with ParserPool() as pool:
+                async with aiohttp.ClientSession(connector=connector) as session:
+                    last_page = await crawl(session, fetch_page, partial(process_article, pool=pool), collect,
+                                            is_last_page=is_past_stop_date, on_checkpoint=checkpoint,
+                                            start_page=start_page,
+                                            pages_in_flight=PAGES_IN_FLIGHT, workers=ARTICLE_WORKERS)
+            print(f"Stopped after page {last_page}")
+
+    FRONTIER.close()
+    print(f"Finished with {collected} articles")
 
 
 if __name__ == '__main__':
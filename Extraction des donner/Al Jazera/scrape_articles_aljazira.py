@@ -1,18 +1,34 @@
+import aiohttp
+import asyncio
 import csv
+import os
+import sys
 import time
-from selenium import webdriver
+from concurrent.futures import ThreadPoolExecutor
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from bs4 import BeautifulSoup
 
-# Initialize the WebDriver
-driver = webdriver.Chrome()
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
-# Function to scrape title and content from a given URL
-def scrape_article(url):
+from crawl_frontier import CrawlFrontier
+from driver_pool import DriverPool
+from html_parsing import ParserPool, aljazeera_article, aljazeera_static_article
+from http_cache import HttpCache
+
+FRONTIER_SOURCE = 'aljazeera'
+FILENAME = 'new_articles.csv'
+HTTP_WORKERS = 32  # Concurrent plain HTTP fetches
+BROWSERS = 4  # Headless browsers, only started for pages that need JS
+HEADERS = {'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 '
+                         '(KHTML, like Gecko) Chrome/124.0 Safari/537.36'}
+
+HTTP_CACHE = HttpCache()
+
+
+# Function to scrape title and content from a given URL with a browser
+def scrape_article(driver, url):
     driver.get(url)
-    time.sleep(2)  # Allow page to load fully
 
     # Check for and click the 'Read More' button if it exists
     try:
@@ -25,51 +41,72 @@ def scrape_article(url):
     except:
         print("No 'Read More' button found.")
 
-    # Parse the page with BeautifulSoup
-    soup = BeautifulSoup(driver.page_source, 'html.parser')
-
-    # Extract title from <h1>
-    title_tag = soup.find('h1')
-    title = title_tag.get_text(strip=True) if title_tag else "No Title Found"
-
-    # Extract content from <div class="wysiwyg wysiwyg--all-content">
-    content_div = soup.find('div', class_='wysiwyg wysiwyg--all-content')
-    if content_div:
-        paragraphs = content_div.find_all('p')
-        content = ' '.join(p.get_text(strip=True) for p in paragraphs)
-    else:
-        content = "No Content Found"
-
-    return title, content
-
-# Read URLs from 'second_half.csv', starting from line 0
-urls = []
-with open('article_links.csv', 'r', encoding='utf-8') as file:
-    reader = csv.reader(file)
-    next(reader)  # Skip header
-    for row in reader:
-        if row:  # Ensure the row is not empty
-            urls.append(row[0])
-
-print(f"Total URLs to scrape: {len(urls)}")
-
-# Prepare CSV file to store scraped data (append mode)
-with open('new_articles.csv', 'a', newline='', encoding='utf-8') as file:
-    writer = csv.writer(file, quoting=csv.QUOTE_MINIMAL)
-    if file.tell() == 0:
-        writer.writerow(['Title', 'Content'])  # Write header if file is empty
-
-    for idx, url in enumerate(urls):
-        try:
-            print(f"Scraping ({idx+1}/{len(urls)}): {url}")
-            title, content = scrape_article(url)
-
-            # Write the scraped data to CSV immediately
-            writer.writerow([title, content])
-            print(f"Successfully scraped: {title}\n")
-        except Exception as e:
-            print(f"Error scraping {url}: {e}")
-
-# Close the WebDriver
-driver.quit()
-print("Scraping completed. Data saved to 'new_articles.csv'.")
+    # Title from <h1>, content from <div class="wysiwyg wysiwyg--all-content">
+    return aljazeera_article(driver.page_source)
+
+
+def scrape_with_browser(drivers, url):
+    with drivers.driver() as driver:
+        return scrape_article(driver, url)
+
+
+async def fetch_static(session, parsers, url):
+    """(title, content) over plain HTTP, None when only a browser can render it"""
+    response = await HTTP_CACHE.fetch_async(session, url)
+    return await parsers.run(aljazeera_static_article, response.text)
+
+
+async def main():
+    # URLs come from the crawl frontier: only links not scraped yet (or failed) are left
+    frontier = CrawlFrontier()
+    if not frontier.get_cursor(FRONTIER_SOURCE, imported=False)['imported']:
+        frontier.import_csv(FRONTIER_SOURCE, 'article_links.csv')
+        frontier.set_cursor(FRONTIER_SOURCE, imported=True)
+    urls = frontier.pending(FRONTIER_SOURCE)
+
+    print(f"Total URLs to scrape: {len(urls)}")
+    loop = asyncio.get_running_loop()
+    counts = {'http': 0, 'browser': 0, 'failed': 0}
+
+    # Prepare CSV file to store scraped data (append mode)
+    with open(FILENAME, 'a', newline='', encoding='utf-8') as file, \
+            ParserPool() as parsers, DriverPool(BROWSERS) as drivers, \
+            ThreadPoolExecutor(BROWSERS) as browser_threads:
+        writer = csv.writer(file, quoting=csv.QUOTE_MINIMAL)
+        if file.tell() == 0:
+            writer.writerow(['Title', 'Content'])  # Write header if file is empty
+
+        sem = asyncio.Semaphore(HTTP_WORKERS)
+        connector = aiohttp.TCPConnector(limit=HTTP_WORKERS)
+        async with aiohttp.ClientSession(connector=connector, headers=HEADERS) as session:
+
+            async def handle(url):
+                try:
+                    async with sem:
+                        result = await fetch_static(session, parsers, url)
+                    mode = 'http'
+                    if result is None:
+                        result = await loop.run_in_executor(browser_threads, scrape_with_browser, drivers, url)
+                        mode = 'browser'
+                    title, content = result
+
+                    # Write the scraped data to CSV immediately
+                    writer.writerow([title, content])
+                    file.flush()
+                    frontier.mark_done(FRONTIER_SOURCE, url)
+                    counts[mode] += 1
+                    print(f"Scraped ({mode}, {sum(counts.values())}/{len(urls)}): {title}")
+                except Exception as e:
+                    frontier.mark_failed(FRONTIER_SOURCE, url, e)
+                    counts['failed'] += 1
+                    print(f"Error scraping {url}: {e}")
+
+            await asyncio.gather(*(handle(url) for url in urls))
+
+    frontier.close()
+    print(f"Scraping completed: {counts['http']} over HTTP, {counts['browser']} with a browser, "
+          f"{counts['failed']} failed. Data saved to '{FILENAME}'.")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -1,11 +1,41 @@
 import csv
-import time
 from selenium import webdriver
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.action_chains import ActionChains
 import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from crawl_frontier import CrawlFrontier
+
+FRONTIER_SOURCE = 'aljazeera'  # Links for scrape_articles_aljazira.py to fetch
+LINKS_SOURCE = 'aljazeera_links'  # Every link ever seen, first_half.csv's already scraped ones included
+CARD_SELECTOR = 'h3.gc__title a.u-clickable-card__link'
+SHOW_MORE_SELECTOR = '.show-more-button.big-margin[data-testid="show-more-button"]'
+LOAD_TIMEOUT = 10  # Seconds to wait for new cards after a click
+MAX_EMPTY_CLICKS = 3  # Clicks in a row that load nothing before the feed counts as exhausted
+
+# Cards from a tracked index onward, in one WebDriver round trip
+NEW_CARDS_SCRIPT = """
+const cards = document.querySelectorAll(arguments[0]);
+const hrefs = [];
+for (let i = arguments[1]; i < cards.length; i++) hrefs.push(cards[i].href);
+return [cards.length, hrefs];
+"""
+
+# Scroll the 'Show More' button into view and click it, false if there is none
+SHOW_MORE_SCRIPT = """
+const button = document.querySelector(arguments[0]);
+if (!button || button.disabled) return false;
+button.scrollIntoView({block: 'center'});
+button.click();
+return true;
+"""
+
+CARD_COUNT_SCRIPT = "return document.querySelectorAll(arguments[0]).length;"
 
 # Initialize the WebDriver (use the driver of your choice, e.g., ChromeDriver)
 driver = webdriver.Chrome()
@@ -16,88 +46,59 @@ driver.get('https://www.aljazeera.net/news/')  # Replace with your target URL
 # Wait until the page loads (adjust the timeout if necessary)
 WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.CLASS_NAME, "gc__title")))
 
-# Function to read existing links from a CSV file
-def read_existing_links(file_path):
-    if os.path.exists(file_path):
-        with open(file_path, 'r', newline='', encoding='utf-8') as file:
-            reader = csv.reader(file)
-            next(reader)  # Skip the header
-            return {row[0] for row in reader}  # Return as a set of links for quick lookup
-    return set()
-
-# Read links from both first_half.csv and article_links.csv
-first_half_links = read_existing_links('first_half.csv')
-existing_links = read_existing_links('article_links.csv')
-
-# Combine both sets to ensure no duplicates
-all_existing_links = first_half_links.union(existing_links)
+# Seen links live in the crawl frontier; the CSVs are imported only on the first run
+frontier = CrawlFrontier()
+if not frontier.get_cursor(LINKS_SOURCE, imported=False)['imported']:
+    for file_path in ('first_half.csv', 'article_links.csv'):
+        print(f"Imported {frontier.import_csv(LINKS_SOURCE, file_path)} links from {file_path}")
+    frontier.set_cursor(LINKS_SOURCE, imported=True)
 
 # Open the CSV file for appending links
 with open('article_links.csv', 'a', newline='', encoding='utf-8') as file:
     writer = csv.writer(file)
-    
+
     # If the file is empty, write the header
     if file.tell() == 0:
         writer.writerow(["Article Link"])
 
+    harvested = 0  # Index of the first card not read yet
+    empty_clicks = 0
     try:
         while True:
-            # Find all articles by locating the <a> tags inside <h3 class="gc__title">
-            titles = driver.find_elements(By.CSS_SELECTOR, 'h3.gc__title a.u-clickable-card__link')
+            # Only the cards added since the last click
+            total, hrefs = driver.execute_script(NEW_CARDS_SCRIPT, CARD_SELECTOR, harvested)
+            harvested = total
 
-            # Extract and store all href attributes (links)
-            for title in titles:
-                link = title.get_attribute('href')
-                if link not in all_existing_links:  # Only append if not already in the CSV
+            added = 0
+            for link in hrefs:
+                if link and frontier.add(LINKS_SOURCE, link):  # Only append if not already seen
                     writer.writerow([link])  # Write each new link directly to the CSV file
-                    all_existing_links.add(link)  # Add to the set of existing links
-                    print(f"Added new link: {link}")
-
-            # Debugging: Print out the number of links found
-            print(f"Found {len(titles)} articles.")
-
-            # Check for the "Show More" button with both class and data-testid attribute
-            show_more_button = driver.find_elements(By.CSS_SELECTOR, '.show-more-button.big-margin[data-testid="show-more-button"]')
-            print(f"Found {len(show_more_button)} 'Show More' button(s).")  # Debugging output
-
-            if show_more_button:
-                try:
-                    # Ensure the button is clickable
-                    WebDriverWait(driver, 10).until(EC.element_to_be_clickable(show_more_button[0]))
-
-                    # Scroll down the page to load more content
-                    driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                    print("Scrolled down to the bottom of the page.")
-
-                    # Sleep for a few seconds to allow content to load
-                    time.sleep(2)  # Adjust the sleep time if necessary
-
-                    # Check again for the button after scrolling and waiting
-                    show_more_button = driver.find_elements(By.CSS_SELECTOR, '.show-more-button.big-margin[data-testid="show-more-button"]')
-
-                    # Scroll to the 'Show More' button before clicking it
-                    if show_more_button:
-                        actions = ActionChains(driver)
-                        actions.move_to_element(show_more_button[0]).perform()  # Scroll to the button
-                        print("Scrolled to the 'Show More' button.")
-
-                        # Now, click the button
-                        show_more_button[0].click()
-                        print("Clicked the 'Show More' button.")
-                        
-                        # Wait for the page to load more content (this time we wait explicitly for the new content)
-                        WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.CSS_SELECTOR, 'h3.gc__title a.u-clickable-card__link')))
-                        print("Waiting for more content to load...")
-
-                except Exception as e:
-                    print(f"Error while clicking 'Show More' button: {e}")
-                    break  # Exit the loop if the button is not clickable
-
+                    frontier.add(FRONTIER_SOURCE, link)  # Queued for the article scraper
+                    added += 1
+            file.flush()
+            print(f"{total} cards on the page, {len(hrefs)} new, {added} new links saved.")
+
+            if not driver.execute_script(SHOW_MORE_SCRIPT, SHOW_MORE_SELECTOR):
+                print("No 'Show More' button left, the feed is exhausted.")
+                break
+
+            # Wait for the click to append cards
+            try:
+                WebDriverWait(driver, LOAD_TIMEOUT).until(
+                    lambda d: d.execute_script(CARD_COUNT_SCRIPT, CARD_SELECTOR) > harvested)
+                empty_clicks = 0
+            except TimeoutException:
+                empty_clicks += 1
+                print(f"No new cards after clicking 'Show More' ({empty_clicks}/{MAX_EMPTY_CLICKS}).")
+                if empty_clicks >= MAX_EMPTY_CLICKS:
+                    print("The feed is exhausted.")
+                    break
 
     except Exception as e:
         print(f"Error occurred: {e}")
 
 # Close the driver after scraping
 driver.quit()
+frontier.close()
 
 print("Scraping completed!")
@@ -0,0 +1,172 @@
+import csv
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from driver_pool import DriverPool
+from html_parsing import france24_archive_days, france24_article, france24_day_entries
+from http_cache import HttpCache
+
+# Scraper module for the France24 Arabic archive, replacing the
+# get_data() / complete_data() cells of scarpping_automation.ipynb
+ARCHIVE_URL = "https://www.france24.com/ar/%D8%A3%D8%B1%D8%B4%D9%8A%D9%81/{year}/"
+ARTICLES_DIR = "articles"
+DATA_DIR = "data"
+DAY_WORKERS = 4  # Archive days crawled concurrently
+ARTICLE_WORKERS = 16  # Article pages fetched concurrently, shared by all days
+BROWSERS = 4  # Long-lived headless browsers for pages plain HTTP can't get
+HEADERS = {'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 '
+                         '(KHTML, like Gecko) Chrome/124.0 Safari/537.36'}
+
+LIST_FIELDS = ["source", "title", "content", "description", "url", "published_at", "tags"]
+
+HTTP_CACHE = HttpCache()
+
+
+class Fetcher:
+    """Plain pooled HTTP first, a shared pool of browsers when that fails"""
+
+    def __init__(self, browsers=BROWSERS, use_http=True):
+        self.use_http = use_http
+        self.session = requests.Session()
+        self.session.headers.update(HEADERS)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=ARTICLE_WORKERS + DAY_WORKERS)
+        self.session.mount('https://', adapter)
+        self.drivers = DriverPool(browsers)
+        self.browser_fetches = 0
+        self.lock = threading.Lock()
+
+    def _browser(self, url):
+        with self.lock:
+            self.browser_fetches += 1
+        with self.drivers.driver() as driver:
+            driver.get(url)
+            return driver.page_source
+
+    def fetch(self, url, looks_complete=bool):
+        """Page source of url, through a browser when HTTP fails or looks_complete(html) is False"""
+        if not self.use_http:
+            return HTTP_CACHE.get_or_fetch(url, self._browser)
+        try:
+            html = HTTP_CACHE.fetch(url, session=self.session, timeout=30).text
+            if looks_complete(html):
+                return html
+        except requests.RequestException as e:
+            print(f"HTTP failed for {url}: {e}")
+        html = self._browser(url)
+        HTTP_CACHE.put(url, html)  # Replaces the incomplete HTTP copy
+        return html
+
+    def close(self):
+        self.drivers.close()
+        self.session.close()
+
+
+def file_suffix(date):
+    # "01 أبريل 2024" -> "_01_أبريل_2024", as in the notebook file names
+    return "".join("_" + d for d in date.split())
+
+
+def archive_days(fetcher, year):
+    """(url, date) of every archive day of a year"""
+    html = fetcher.fetch(ARCHIVE_URL.format(year=year),
+                         lambda page: bool(france24_archive_days(page)))
+    return france24_archive_days(html)
+
+
+def get_data(fetcher, lien, date):
+    """Write the day's article list, same layout as the notebook's get_data()"""
+    html = fetcher.fetch(lien, lambda page: bool(france24_day_entries(page)))
+    entries = france24_day_entries(html)
+    path = os.path.join(ARTICLES_DIR, f"france24_arabe_articles_archive_{file_suffix(date)}.csv")
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(LIST_FIELDS)
+        for title, article_link in entries:
+            writer.writerow(["France 24", title, "", "", article_link, date, ""])
+    return entries
+
+
+def fetch_article(fetcher, url):
+    html = fetcher.fetch(url, lambda page: 't-content__chapo' in page or '<time' in page)
+    return france24_article(html)
+
+
+def complete_data(fetcher, articles_pool, date, entries):
+    """Fetch every article of a day and stream the rows to data/ as they complete.
+
+    Rows go to a temporary file that becomes the day's CSV only once every
+    article was fetched, so a crash or a failed article leaves the day to be
+    scraped again (the articles already fetched come from the HTTP cache).
+    Returns (saved, failed).
+    """
+    path = os.path.join(DATA_DIR, f"france24_arabe_articles_content_archive_{file_suffix(date)}.csv")
+    futures = {articles_pool.submit(fetch_article, fetcher, url): (i, title, url)
+               for i, (title, url) in enumerate(entries) if url != "No Link"}
+
+    failed = 0
+    with open(path + '.tmp', "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        # Leading unnamed index column kept for the notebooks that drop 'Unnamed: 0'
+        writer.writerow([""] + LIST_FIELDS)
+        for future in as_completed(futures):
+            i, title, url = futures[future]
+            try:
+                article = future.result()
+            except Exception as e:
+                print(f"Error: {url}: {e}")
+                failed += 1
+                continue
+            writer.writerow([i, "France 24", title, article['content'], article['description'],
+                             url, article['published_at'], article['tags']])
+            file.flush()
+    # Partial days keep their rows aside, out of data/*.csv and of skip_done
+    os.replace(path + '.tmp', path + '.partial' if failed else path)
+    if not failed and os.path.exists(path + '.partial'):
+        os.remove(path + '.partial')
+    return len(futures) - failed, failed
+
+
+def scrape_day(fetcher, articles_pool, lien, date):
+    try:
+        entries = get_data(fetcher, lien, date)
+        saved, failed = complete_data(fetcher, articles_pool, date, entries)
+        if failed:
+            print(f"⚠️ {date}: {saved} articles saved, {failed} failed, the day will be scraped again")
+        else:
+            print(f"✅ {date}: {saved} articles saved")
+    except Exception as e:
+        print(f"Error for {date}: {e}")
+
+
+def scrape_years(years, skip_done=True, use_http=True):
+    os.makedirs(ARTICLES_DIR, exist_ok=True)
+    os.makedirs(DATA_DIR, exist_ok=True)
+    fetcher = Fetcher(use_http=use_http)
+    try:
+        days = [day for year in years for day in archive_days(fetcher, year)]
+        if skip_done:
+            days = [(lien, date) for lien, date in days if not os.path.exists(
+                os.path.join(DATA_DIR, f"france24_arabe_articles_content_archive_{file_suffix(date)}.csv"))]
+        print(f"{len(days)} archive days to scrape")
+
+        with ThreadPoolExecutor(ARTICLE_WORKERS) as articles_pool, \
+                ThreadPoolExecutor(DAY_WORKERS) as days_pool:
+            for future in [days_pool.submit(scrape_day, fetcher, articles_pool, lien, date)
+                           for lien, date in days]:
+                future.result()
+        print(f"Done, {fetcher.browser_fetches} pages needed a browser")
+    finally:
+        fetcher.close()
+
+
+if __name__ == '__main__':
+    # python france24_scraper.py 2024 2025 [--browser]
+    args = sys.argv[1:]
+    scrape_years([a for a in args if a.isdigit()] or ['2025'], use_http='--browser' not in args)
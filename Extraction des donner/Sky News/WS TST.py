@@ -1,14 +1,20 @@
-import requests
-import csv
+import json
 import time
 import os
+import sys
 from datetime import datetime
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from http_cache import HttpCache
+from record_sink import open_sink
+
 JSON_ENDPOINTS = [
     "https://api.skynewsarabia.com//rest/v2/search/text.json?deviceType=MOBILE&from=&offset=108&pageSize=12&q=%D8%AD%D9%85%D8%A7%D8%B3&showEpisodes=true&sort=RELEVANCE&supportsInfographic=true&to="
 ]
 
-FILENAME = "skynews_articles.csv"
+OUTPUT_DIR = "skynews_articles"  # Same part files as ws_with_loop.py
+HTTP_CACHE = HttpCache()
 
 
 def extract_article_data(article):
@@ -25,16 +31,15 @@ def extract_article_data(article):
     }
 
 
-def process_endpoint(url, writer):
+def process_endpoint(url, sink):
     """Process a single JSON endpoint"""
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
+        response = HTTP_CACHE.fetch(url)
+        data = json.loads(response.text)
 
         for item in data.get("contentItems", []):
             article_data = extract_article_data(item)
-            writer.writerow(article_data)
+            sink.write(article_data)
 
         print(f"Added {len(data.get('contentItems', []))} articles from {url}")
         return True
@@ -45,21 +50,10 @@ def process_endpoint(url, writer):
 
 
 def main():
-    # Check if file exists to determine write mode
-    file_exists = os.path.isfile(FILENAME)
-
-    with open(FILENAME, 'a', newline='', encoding='utf-8') as csvfile:
-        fieldnames = ["source", "title", "description", "url", "image_url",
-                      "published_at", "tags"]
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-
-        # Write header only if file is empty/new
-        if not file_exists or csvfile.tell() == 0:
-            writer.writeheader()
-
+    with open_sink(OUTPUT_DIR, prefix='tst') as sink:
         for idx, url in enumerate(JSON_ENDPOINTS, 1):
             print(f"Processing URL {idx}/{len(JSON_ENDPOINTS)}")
-            success = process_endpoint(url, writer)
+            success = process_endpoint(url, sink)
 
             # Add safety delays
             if idx % 5 == 0 and success:
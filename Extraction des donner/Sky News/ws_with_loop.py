@@ -1,21 +1,32 @@
-import requests
-import csv
+import aiohttp
+import asyncio
 import time
 import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from crawl_frontier import CrawlFrontier
+from rate_limiter import AdaptiveRateLimiter
+from record_sink import open_sink
 
 # Configure these variables
 URL_TEMPLATE = "https://api.skynewsarabia.com//rest/v2/search/text.json?deviceType=MOBILE&from=&offset={offset}&pageSize=12&q=%D8%AD%D9%85%D8%A7%D8%B3&showEpisodes=true&sort=RELEVANCE&supportsInfographic=true&to="
-START_OFFSET = 120
+PAGE_SIZE = 12
+START_OFFSET = 120  # Only used on the first run, later runs resume from the frontier
 MAX_OFFSET = 4000
-FILENAME = "skynews_articles_3.csv"
+CONCURRENCY = 16  # Offset pages in flight, the rate limiter decides the pace
+MAX_RETRIES = 5
+OUTPUT_DIR = "skynews_articles"  # Rotating Parquet part files, see record_sink.py
+FRONTIER_SOURCE = "skynews_hamas"
 
 
-def generate_urls():
-    """Generate URLs by replacing {offset} placeholder"""
-    offset = START_OFFSET
-    while offset <= MAX_OFFSET:
-        yield URL_TEMPLATE.format(offset=offset)
-        offset += 12  # pageSize value
+def generate_urls(start_offset=START_OFFSET, end_offset=MAX_OFFSET):
+    """Generate (offset, URL) pairs by replacing {offset} placeholder"""
+    offset = start_offset
+    while offset <= end_offset:
+        yield offset, URL_TEMPLATE.format(offset=offset)
+        offset += PAGE_SIZE
 
 
 def extract_article_data(article):
@@ -31,42 +42,131 @@ def extract_article_data(article):
     }
 
 
-def main():
-    file_exists = os.path.isfile(FILENAME)
-
-    with open(FILENAME, 'a', newline='', encoding='utf-8') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=[
-            "source", "title", "description", "url",
-            "image_url", "published_at", "tags"
-        ])
-
-        if not file_exists:
-            writer.writeheader()
-
-        for idx, url in enumerate(generate_urls(), 1):
-            print(f"Processing offset {START_OFFSET + (idx - 1) * 12}")
-
-            try:
-                response = requests.get(url, timeout=10)
+async def fetch_offset(session, limiter, offset):
+    """Return the contentItems of one offset page, retrying on 429/5xx"""
+    url = URL_TEMPLATE.format(offset=offset)
+    for attempt in range(MAX_RETRIES):
+        await limiter.wait(url)
+        started = time.monotonic()
+        recorded = False
+        try:
+            async with session.get(url) as response:
+                latency = time.monotonic() - started
+                retry_after = response.headers.get("Retry-After")
+                limiter.record(url, response.status, latency,
+                               float(retry_after) if retry_after and retry_after.isdigit() else None)
+                recorded = True
+                if response.status == 429 or response.status >= 500:
+                    print(f"Offset {offset}: HTTP {response.status}, retrying")
+                    continue
                 response.raise_for_status()
-                data = response.json()
-
-                if not data.get("contentItems"):
-                    print("No more articles. Stopping.")
-                    break
-
-                for item in data["contentItems"]:
-                    writer.writerow(extract_article_data(item))
-
-                print(f"Added {len(data['contentItems'])} articles")
-
-                # Rate limiting (10 requests)
-                time.sleep(2)
-
-            except Exception as e:
-                print(f"Error: {str(e)}")
-                continue
+                data = await response.json(content_type=None)
+                return data.get("contentItems") or []
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if not recorded:  # A 4xx from raise_for_status was recorded with its status
+                limiter.record(url, 599, time.monotonic() - started)
+            print(f"Offset {offset}: {e}, retrying")
+    raise RuntimeError(f"Offset {offset} failed after {MAX_RETRIES} attempts")
+
+
+async def find_last_offset(session, limiter, start_offset, pages):
+    """Find the last non-empty offset by exponential then binary probing.
+
+    Probed pages are kept in `pages` so they are not fetched twice.
+    Returns None when start_offset itself is already past the results.
+    """
+    async def has_items(offset):
+        if offset not in pages:
+            pages[offset] = await fetch_offset(session, limiter, offset)
+        return bool(pages[offset])
+
+    if not await has_items(start_offset):
+        return None
+
+    last_page = (MAX_OFFSET - start_offset) // PAGE_SIZE
+    lo, hi, step = 0, last_page + 1, 1  # Page indexes: lo has items, hi is past the end
+    while lo + step <= last_page:
+        if await has_items(start_offset + (lo + step) * PAGE_SIZE):
+            lo += step
+            step *= 2
+        else:
+            hi = lo + step
+            break
+
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if await has_items(start_offset + mid * PAGE_SIZE):
+            lo = mid
+        else:
+            hi = mid
+    return start_offset + lo * PAGE_SIZE
+
+
+async def main():
+    frontier = CrawlFrontier()
+    start_offset = frontier.get_cursor(FRONTIER_SOURCE, offset=START_OFFSET)['offset']
+    limiter = AdaptiveRateLimiter()
+    state = {'cursor': start_offset}
+
+    # URLs are marked done, and the resume offset saved, only once the
+    # part file holding their rows is on disk
+    def mark_done(urls):
+        for url in urls:
+            frontier.mark_done(FRONTIER_SOURCE, url)
+        frontier.set_cursor(FRONTIER_SOURCE, offset=state['cursor'])
+
+    with open_sink(OUTPUT_DIR, on_durable=mark_done) as sink:
+        connector = aiohttp.TCPConnector(limit=CONCURRENCY)
+        timeout = aiohttp.ClientTimeout(total=10)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            pages = {}
+            last_offset = await find_last_offset(session, limiter, start_offset, pages)
+            if last_offset is None:
+                print("No more articles. Stopping.")
+                sink.close()
+                frontier.close()
+                return
+            print(f"Results end at offset {last_offset} ({len(pages)} probes)")
+
+            sem = asyncio.Semaphore(CONCURRENCY)
+            done = set()
+            saved_urls = set()
+
+            def save(offset, items):
+                added = 0
+                for item in items:
+                    article = extract_article_data(item)
+                    if article["url"] and (article["url"] in saved_urls
+                                           or frontier.seen(FRONTIER_SOURCE, article["url"])):
+                        continue
+                    saved_urls.add(article["url"])
+                    sink.write(article)
+                    added += 1
+
+                # Resume point is the first offset not saved yet
+                done.add(offset)
+                while state['cursor'] in done:
+                    state['cursor'] += PAGE_SIZE
+                sink.tick()
+                if not sink.pending:
+                    frontier.set_cursor(FRONTIER_SOURCE, offset=state['cursor'])
+                print(f"Offset {offset}: added {added} articles "
+                      f"({limiter.current_rate(URL_TEMPLATE):.1f} req/s)")
+
+            async def harvest(offset):
+                try:
+                    if offset not in pages:
+                        async with sem:
+                            pages[offset] = await fetch_offset(session, limiter, offset)
+                    save(offset, pages.pop(offset))
+                except Exception as e:
+                    print(f"Error: {str(e)}")
+
+            await asyncio.gather(*(harvest(offset)
+                                   for offset, _ in generate_urls(start_offset, last_offset)))
+
+    frontier.close()
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    asyncio.run(main())
@@ -0,0 +1,287 @@
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# Approximate nearest neighbors over article embeddings ("related stories").
+# An IVF index: a KMeans coarse quantizer splits the unit vectors into
+# nlist cells, a query scans only the nprobe cells whose centroids are
+# closest, with the source / date filter applied inside those cells. Vectors
+# added after training go to their nearest cell, so the index grows without
+# a rebuild; until it is trained the index is an exact flat scan.
+ROOT = os.path.dirname(os.path.abspath(__file__))
+INDEX_DIR = os.path.join(ROOT, 'ann_index')
+N_NEIGHBORS = 10
+NPROBE = 8
+TRAIN_SAMPLE = 100000  # Vectors the coarse quantizer is fitted on
+MIN_PER_LIST = 39  # Fewer training vectors per cell than this and KMeans is noise
+NO_DAY = np.iinfo(np.int64).min
+
+
+def to_days(published_at, count):
+    """Days since epoch, NO_DAY when unknown"""
+    if published_at is None:
+        return np.full(count, NO_DAY, np.int64)
+    dates = pd.to_datetime(pd.Series(list(published_at)), errors='coerce', format='mixed', utc=True)
+    days = (dates - pd.Timestamp(0, tz='UTC')).dt.days
+    return days.fillna(NO_DAY).astype(np.int64).to_numpy()
+
+
+def normalize(vectors):
+    vectors = np.asarray(vectors, np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def default_nlist(n):
+    """About 4 * sqrt(n) cells, each with enough vectors to train on"""
+    return max(1, min(int(4 * np.sqrt(n)), n // MIN_PER_LIST))
+
+
+class AnnIndex:
+    def __init__(self, dim, nlist=None):
+        self.dim = dim
+        self.nlist = nlist
+        self.centroids = None  # (nlist, dim) once trained
+        self.ids = []
+        self.positions = {}  # Id -> row
+        self.sources = []  # Source names, rows store their code
+        self.vectors = np.empty((0, dim), np.float32)
+        self.source_codes = np.empty(0, np.int32)
+        self.days = np.empty(0, np.int64)
+        self.lists = np.empty(0, np.int32)  # Cell of every row
+        self._pending = []  # Chunks added since the arrays were last grown
+        self._order = None  # Rows sorted by cell and the cell offsets, rebuilt lazily
+        self._offsets = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, rid):
+        return rid in self.positions
+
+    @property
+    def trained(self):
+        return self.centroids is not None
+
+    def train(self, vectors, seed=42):
+        """Fit the coarse quantizer; already indexed rows are reassigned"""
+        from sklearn.cluster import MiniBatchKMeans
+
+        vectors = normalize(vectors)
+        if len(vectors) > TRAIN_SAMPLE:
+            vectors = vectors[np.random.RandomState(seed).choice(len(vectors), TRAIN_SAMPLE, replace=False)]
+        nlist = self.nlist or default_nlist(len(vectors))
+        kmeans = MiniBatchKMeans(nlist, random_state=seed, batch_size=4096, n_init=3).fit(vectors)
+        self.nlist = nlist
+        self.centroids = normalize(kmeans.cluster_centers_)
+        self._consolidate()
+        if len(self.vectors):
+            self.lists = self._assign(self.vectors)
+        self._order = None
+        return self
+
+    def _assign(self, vectors, block=8192):
+        cells = np.empty(len(vectors), np.int32)
+        for start in range(0, len(vectors), block):
+            cells[start:start + block] = np.argmax(vectors[start:start + block] @ self.centroids.T, axis=1)
+        return cells
+
+    def _code(self, source):
+        source = source if isinstance(source, str) else ''
+        if source not in self.sources:
+            self.sources.append(source)
+        return self.sources.index(source)
+
+    def add(self, ids, vectors, sources=None, published_at=None):
+        """Insert new rows; ids already in the index are skipped. Returns the rows added."""
+        vectors = np.asarray(vectors, np.float32)
+        if vectors.ndim != 2 or vectors.shape[1] != self.dim:
+            raise ValueError(f"Expected (n, {self.dim}) vectors, got {vectors.shape}")
+        if not np.isfinite(vectors).all():
+            raise ValueError("Vectors contain NaN / inf, drop the failed embeddings first")
+        keep, seen = [], set()
+        for i, rid in enumerate(ids):
+            if rid not in self.positions and rid not in seen:
+                keep.append(i)
+                seen.add(rid)
+        if not keep:
+            return 0
+        keep = np.array(keep)
+        vectors = normalize(vectors[keep])
+        codes = np.array([self._code(sources[i]) if sources is not None else self._code('')
+                          for i in keep], np.int32)
+        days = to_days(published_at, len(ids))[keep]
+        cells = self._assign(vectors) if self.trained else np.zeros(len(keep), np.int32)
+        for i in keep:
+            self.positions[ids[i]] = len(self.ids)
+            self.ids.append(ids[i])
+        self._pending.append((vectors, codes, days, cells))
+        self._order = None
+        return len(keep)
+
+    def _consolidate(self):
+        if self._pending:
+            parts = list(zip(*self._pending))
+            self.vectors = np.concatenate([self.vectors, *parts[0]])
+            self.source_codes = np.concatenate([self.source_codes, *parts[1]])
+            self.days = np.concatenate([self.days, *parts[2]])
+            self.lists = np.concatenate([self.lists, *parts[3]])
+            self._pending = []
+
+    def _cells(self):
+        if self._order is None:
+            self._consolidate()
+            self._order = np.argsort(self.lists, kind='stable')
+            self._offsets = np.searchsorted(self.lists[self._order], np.arange((self.nlist or 1) + 1))
+        return self._order, self._offsets
+
+    def _filter(self, rows, sources, start, end):
+        mask = np.ones(len(rows), bool)
+        if sources is not None:
+            codes = [self.sources.index(s) for s in sources if s in self.sources]
+            mask &= np.isin(self.source_codes[rows], codes)
+        if start is not None or end is not None:
+            days = self.days[rows]
+            mask &= days != NO_DAY
+            if start is not None:
+                mask &= days >= to_days([start], 1)[0]
+            if end is not None:
+                mask &= days <= to_days([end], 1)[0]
+        return rows[mask]
+
+    def _candidates(self, query, nprobe):
+        order, offsets = self._cells()
+        if not self.trained or nprobe >= self.nlist:
+            return order
+        cells = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+        return np.concatenate([order[offsets[c]:offsets[c + 1]] for c in cells])
+
+    def search(self, queries, k=N_NEIGHBORS, nprobe=NPROBE, sources=None, start=None, end=None,
+               exclude=None):
+        """(ids, scores) of the k most similar rows of every query, best first.
+        sources is a list of source names, start / end bound published_at (inclusive).
+        When the filter leaves fewer than k rows in the probed cells, more cells are probed."""
+        queries = normalize(np.atleast_2d(queries))
+        results_ids, results_scores = [], []
+        for q, query in enumerate(queries):
+            skip = None if exclude is None else self.positions.get(exclude[q], -1)
+            probe = nprobe
+            while True:
+                rows = self._filter(self._candidates(query, probe), sources, start, end)
+                if skip is not None:
+                    rows = rows[rows != skip]
+                if len(rows) >= k or not self.trained or probe >= self.nlist:
+                    break
+                probe *= 2
+            scores = self.vectors[rows] @ query
+            top = min(k, len(rows))
+            best = np.argpartition(-scores, top - 1)[:top] if top else np.empty(0, np.int64)
+            best = best[np.argsort(-scores[best], kind='stable')]
+            results_ids.append([self.ids[r] for r in rows[best]])
+            results_scores.append(scores[best])
+        return results_ids, results_scores
+
+    def related(self, rid, k=N_NEIGHBORS, nprobe=NPROBE, **filters):
+        """Articles most like an indexed one, itself left out"""
+        self._consolidate()
+        ids, scores = self.search(self.vectors[self.positions[rid]], k, nprobe, exclude=[rid], **filters)
+        return list(zip(ids[0], scores[0].tolist()))
+
+    def exact(self, queries, k=N_NEIGHBORS, **filters):
+        """Brute-force baseline: every row scored"""
+        return self.search(queries, k, nprobe=self.nlist or 1, **filters)
+
+    def save(self, directory=INDEX_DIR):
+        self._consolidate()
+        os.makedirs(directory, exist_ok=True)
+        # Vectors in a plain .npy so that load() can memory map them
+        tmp = os.path.join(directory, 'vectors.tmp.npy')
+        np.save(tmp, self.vectors)
+        os.replace(tmp, os.path.join(directory, 'vectors.npy'))
+        tmp = os.path.join(directory, 'meta.tmp.npz')
+        np.savez(tmp, ids=np.array(self.ids, dtype=object), sources=np.array(self.sources, dtype=object),
+                 source_codes=self.source_codes, days=self.days, lists=self.lists,
+                 centroids=self.centroids if self.trained else np.empty((0, self.dim), np.float32),
+                 dim=np.array(self.dim), nlist=np.array(self.nlist or 0))
+        os.replace(tmp, os.path.join(directory, 'meta.npz'))
+
+    @classmethod
+    def load(cls, directory=INDEX_DIR, mmap=True):
+        meta = np.load(os.path.join(directory, 'meta.npz'), allow_pickle=True)
+        index = cls(int(meta['dim']), int(meta['nlist']) or None)
+        index.vectors = np.load(os.path.join(directory, 'vectors.npy'), mmap_mode='r' if mmap else None)
+        index.ids = meta['ids'].tolist()
+        index.positions = {rid: i for i, rid in enumerate(index.ids)}
+        index.sources = meta['sources'].tolist()
+        index.source_codes = meta['source_codes']
+        index.days = meta['days']
+        index.lists = meta['lists']
+        if len(meta['centroids']):
+            index.centroids = meta['centroids']
+        return index
+
+    @classmethod
+    def open(cls, dim, directory=INDEX_DIR, **kwargs):
+        return cls.load(directory) if os.path.exists(os.path.join(directory, 'meta.npz')) else cls(dim, **kwargs)
+
+
+def build(ids, vectors, sources=None, published_at=None, nlist=None):
+    """Trained index over a batch of vectors"""
+    vectors = np.asarray(vectors, np.float32)
+    index = AnnIndex(vectors.shape[1], nlist)
+    index.add(ids, vectors, sources, published_at)
+    if len(index) >= 2 * MIN_PER_LIST:
+        index.train(vectors)
+    return index
+
+
+def benchmark(index, queries, k=N_NEIGHBORS, nprobes=(1, 2, 4, 8, 16, 32, 64), **filters):
+    """Recall@k and per-query latency of each nprobe against the exact scan"""
+    def timed(nprobe):
+        latencies, found = [], []
+        for query in queries:
+            started = time.perf_counter()
+            ids, _ = index.search(query, k, nprobe, **filters)
+            latencies.append(time.perf_counter() - started)
+            found.append(ids[0])
+        return found, np.array(latencies) * 1000
+
+    exact, exact_ms = timed(index.nlist or 1)
+    rows = [{'nprobe': 'exact', 'recall': 1.0, 'mean_ms': exact_ms.mean(),
+             'p99_ms': np.percentile(exact_ms, 99)}]
+    for nprobe in nprobes:
+        if not index.trained or nprobe >= index.nlist:
+            break
+        found, ms = timed(nprobe)
+        recall = np.mean([len(set(a) & set(b)) / max(len(b), 1) for a, b in zip(found, exact)])
+        rows.append({'nprobe': nprobe, 'recall': recall, 'mean_ms': ms.mean(), 'p99_ms': np.percentile(ms, 99)})
+    return pd.DataFrame(rows)
+
+
+if __name__ == '__main__':
+    # python ann_index.py full_data_fusionne.csv [model] [mean|cls]
+    from embedding_engine import DEFAULT_MODEL, EmbeddingEngine
+    from embedding_store import EmbeddingStore
+    from near_duplicates import record_id
+
+    args = sys.argv[1:]
+    df = pd.read_csv(args[0] if args else os.path.join(ROOT, 'full_data_fusionne.csv'))
+    engine = EmbeddingEngine(args[1] if len(args) > 1 else DEFAULT_MODEL, args[2] if len(args) > 2 else None)
+    texts = (df['title'].fillna('') + ' ' + df['content'].fillna('')).tolist()
+    with EmbeddingStore.for_engine(engine) as store:
+        vectors, failed = store.embed(texts, engine)
+    df, vectors = df[~failed].reset_index(drop=True), vectors[~failed]
+    ids = [record_id(url, title, content) for url, title, content in zip(df['url'], df['title'], df['content'])]
+
+    index = AnnIndex.open(vectors.shape[1])
+    if index.trained:
+        print(f"{index.add(ids, vectors, df['source'], df['published_at'])} new articles indexed")
+    else:
+        index = build(ids, vectors, df['source'], df['published_at'])
+        print(f"{len(index)} articles in {index.nlist} cells")
+    index.save()
+    sample = vectors[np.random.RandomState(0).choice(len(vectors), min(200, len(vectors)), replace=False)]
+    print(benchmark(index, sample).to_string(index=False))
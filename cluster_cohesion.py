@@ -0,0 +1,178 @@
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Intra-cluster similarity for fact_TFIDF.ipynb. The notebook's metric is the
+# mean normalized Levenshtein similarity 1 - dist / max_len over every pair
+# of a cluster; here it is computed in row blocks by a multi-core kernel,
+# estimated from sampled pairs with a Hoeffding bound on big clusters, or
+# replaced by a token / TF-IDF cosine that is exact in O(n).
+try:
+    from rapidfuzz.distance import Levenshtein as _rf_levenshtein
+    from rapidfuzz.process import cdist, cpdist
+except ImportError:
+    cdist = None
+
+try:
+    import Levenshtein
+except ImportError:
+    Levenshtein = None
+
+EXACT_MAX_PAIRS = 200000  # Above this many pairs a cluster is sampled
+EPSILON = 0.01  # Half-width of the sampled estimate
+CONFIDENCE = 0.95
+BLOCK_ROWS = 256  # Rows of the pairwise matrix computed at once
+WORKERS = os.cpu_count() or 1
+METHODS = ('levenshtein', 'tfidf', 'tokens')
+
+
+def available_kernels():
+    kernels = []
+    if cdist is not None:
+        kernels.append('rapidfuzz')
+    if Levenshtein is not None:
+        kernels.append('Levenshtein')
+    return kernels
+
+
+def _pair_similarities(pairs):
+    """python-Levenshtein fallback, one worker process per chunk of pairs"""
+    sims = []
+    for a, b in pairs:
+        max_len = max(len(a), len(b))
+        sims.append(1 - Levenshtein.distance(a, b) / max_len if max_len > 0 else 1.0)
+    return sims
+
+
+def similarities(left, right, workers=WORKERS):
+    """len(left) x len(right) matrix of normalized Levenshtein similarities"""
+    if cdist is not None:
+        return cdist(left, right, scorer=_rf_levenshtein.normalized_similarity,
+                     dtype=np.float32, workers=workers)
+    if Levenshtein is None:
+        raise ImportError("Install rapidfuzz (or python-Levenshtein) for the Levenshtein metric")
+    pairs = [(a, b) for a in left for b in right]
+    return np.array(paired_similarities(pairs, workers), np.float32).reshape(len(left), len(right))
+
+
+def paired_similarities(pairs, workers=WORKERS):
+    """Similarity of each (a, b) pair"""
+    if cdist is not None:
+        left, right = zip(*pairs) if pairs else ((), ())
+        return cpdist(left, right, scorer=_rf_levenshtein.normalized_similarity,
+                      dtype=np.float64, workers=workers)
+    if workers <= 1 or len(pairs) < 1000:
+        return np.array(_pair_similarities(pairs))
+    size = math.ceil(len(pairs) / workers)
+    with ProcessPoolExecutor(workers) as pool:
+        chunks = pool.map(_pair_similarities, [pairs[i:i + size] for i in range(0, len(pairs), size)])
+        return np.concatenate([np.array(chunk) for chunk in chunks])
+
+
+def exact_levenshtein(texts, workers=WORKERS, block_rows=BLOCK_ROWS):
+    """Mean similarity over every pair, the notebook's double loop by row blocks"""
+    n = len(texts)
+    if n < 2:
+        return 1.0
+    total = 0.0
+    for start in range(0, n - 1, block_rows):
+        block = texts[start:start + block_rows]
+        sims = similarities(block, texts[start:], workers)
+        # Only pairs (i, j) with j > i: the strict upper triangle of the block
+        total += float(np.triu(sims, k=1).sum(dtype=np.float64))
+    return total / (n * (n - 1) / 2)
+
+
+def hoeffding_pairs(epsilon=EPSILON, confidence=CONFIDENCE):
+    """Pairs to sample so that |estimate - mean| <= epsilon with the given confidence"""
+    return math.ceil(math.log(2 / (1 - confidence)) / (2 * epsilon ** 2))
+
+
+def sample_pairs(n, count, rng):
+    """count distinct-index pairs (i < j) drawn uniformly from all n * (n - 1) / 2"""
+    i = rng.randint(0, n, count)
+    j = rng.randint(0, n - 1, count)
+    j = j + (j >= i)  # Skips the diagonal
+    return np.minimum(i, j), np.maximum(i, j)
+
+
+def sampled_levenshtein(texts, epsilon=EPSILON, confidence=CONFIDENCE, seed=42, workers=WORKERS):
+    """(mean, lower, upper, pairs): Hoeffding interval, similarities lie in [0, 1]"""
+    n = len(texts)
+    count = hoeffding_pairs(epsilon, confidence)
+    i, j = sample_pairs(n, count, np.random.RandomState(seed))
+    sims = paired_similarities([(texts[a], texts[b]) for a, b in zip(i, j)], workers)
+    mean = float(sims.mean())
+    return mean, max(0.0, mean - epsilon), min(1.0, mean + epsilon), count
+
+
+def mean_pairwise_cosine(matrix):
+    """Exact mean cosine over every pair of rows of an L2-normalized matrix in O(nnz):
+    sum over i != j of <v_i, v_j> is |sum of v|^2 minus the n unit self products"""
+    n = matrix.shape[0]
+    if n < 2:
+        return 1.0
+    total = np.asarray(matrix.sum(axis=0)).ravel()
+    self_products = float(np.asarray(matrix.multiply(matrix).sum()))
+    return float((total @ total - self_products) / (n * (n - 1)))
+
+
+def vectorize(texts, method):
+    from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
+    from sklearn.preprocessing import normalize
+
+    if method == 'tfidf':
+        return TfidfVectorizer().fit_transform(texts)
+    # Cosine of the token sets
+    return normalize(CountVectorizer(binary=True).fit_transform(texts).astype(np.float64))
+
+
+def cohesion(df, cluster_col='cluster', text_col='full_text', method='levenshtein',
+             exact_max_pairs=EXACT_MAX_PAIRS, epsilon=EPSILON, confidence=CONFIDENCE,
+             workers=WORKERS):
+    """Mean pairwise similarity of every cluster, one row per cluster"""
+    if method not in METHODS:
+        raise ValueError(f"Unknown method {method!r}, choose from {METHODS}")
+    df = df[df[text_col].notna()]
+    texts = df[text_col].astype(str).tolist()
+    labels = df[cluster_col].to_numpy()
+    matrix = vectorize(texts, method) if method != 'levenshtein' else None  # Vocabulary of the whole corpus
+
+    rows = []
+    for cluster in sorted(pd.unique(labels)):
+        members = np.flatnonzero(labels == cluster)
+        n = len(members)
+        pairs = n * (n - 1) // 2
+        started = time.perf_counter()
+        if method != 'levenshtein':
+            mean, lower, upper, used, exact = mean_pairwise_cosine(matrix[members]), None, None, pairs, True
+        elif pairs <= exact_max_pairs:
+            mean = exact_levenshtein([texts[i] for i in members], workers)
+            lower, upper, used, exact = None, None, pairs, True
+        else:
+            mean, lower, upper, used = sampled_levenshtein(
+                [texts[i] for i in members], epsilon, confidence, workers=workers)
+            exact = False
+        rows.append({'cluster': cluster, 'size': n, 'mean_similarity': mean, 'lower': lower,
+                     'upper': upper, 'pairs': used, 'exact': exact,
+                     'seconds': time.perf_counter() - started})
+    return pd.DataFrame(rows)
+
+
+if __name__ == '__main__':
+    # python cluster_cohesion.py random_1000_clusters.csv [levenshtein|tfidf|tokens]
+    args = sys.argv[1:]
+    path = args[0] if args else 'random_1000_clusters.csv'
+    method = args[1] if len(args) > 1 else 'levenshtein'
+    started = time.perf_counter()
+    result = cohesion(pd.read_csv(path), method=method)
+    for row in result.itertuples():
+        bounds = '' if row.exact else f" [{row.lower:.4f}, {row.upper:.4f}]"
+        print(f"Nombre de titres dans le cluster {row.cluster} : {row.size}")
+        print(f"Similarité moyenne ({method}) : {row.mean_similarity:.4f}{bounds}")
+    print(f"{time.perf_counter() - started:.2f}s")
@@ -0,0 +1,198 @@
+import hashlib
+import os
+import re
+import sqlite3
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# Summaries of every cluster in one pass, for resumer_clusters.ipynb.
+# Instead of cutting the joined texts at 2000 characters, the sentences of a
+# cluster are ranked by TF-IDF cosine to the cluster centroid and the most
+# central ones are kept until the 512-token input is full. Inputs go through
+# mT5 XLSum in length-sorted batches, and summaries are cached by the hash of
+# (model, decoding, input), so an unchanged cluster is never summarized again.
+os.environ.setdefault('TRANSFORMERS_NO_TF', '1')
+os.environ.setdefault('TOKENIZERS_PARALLELISM', 'false')
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+CACHE_PATH = os.path.join(ROOT, 'summary_cache.sqlite')
+DEFAULT_MODEL = 'csebuetnlp/mT5_multilingual_XLSum'
+PREFIX = 'summarize: '
+MAX_INPUT_TOKENS = 512
+MAX_SUMMARY_TOKENS = 150
+NUM_BEAMS = 4  # 1 is greedy decoding, several times faster on CPU
+BATCH_SIZE = 8
+REDUNDANT = 0.8  # Cosine above which a sentence repeats one already picked
+SENTENCE_END = r'(?<=[.!?؟])\s+|\n+'
+MIN_SENTENCE_CHARS = 20
+
+
+def split_sentences(text):
+    if not isinstance(text, str):
+        return []
+    return [s.strip() for s in re.split(SENTENCE_END, text) if len(s.strip()) >= MIN_SENTENCE_CHARS]
+
+
+def central_sentences(texts, budget, count_tokens):
+    """Most central sentences of a cluster that fit in budget tokens, in reading order.
+    count_tokens maps a list of sentences to their token counts."""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    sentences = [s for text in texts for s in split_sentences(text)]
+    if not sentences:
+        return ''
+    try:
+        matrix = TfidfVectorizer().fit_transform(sentences)  # Rows are L2-normalized
+    except ValueError:  # No word left in the vocabulary
+        return ' '.join(sentences)[:budget]
+    centroid = np.asarray(matrix.mean(axis=0)).ravel()
+    scores = matrix @ centroid
+    lengths = count_tokens(sentences)
+
+    picked, used = [], 0
+    for i in np.argsort(-scores, kind='stable'):
+        if used + lengths[i] > budget and lengths[i] <= budget:
+            continue
+        if picked and (matrix[picked] @ matrix[i].T).max() > REDUNDANT:
+            continue  # Wire copies of the same sentence
+        if lengths[i] > budget:
+            # Unpunctuated bodies are one long "sentence", keep its start
+            sentences[i], lengths[i] = truncate(sentences[i], lengths[i], budget - used, count_tokens)
+            if not sentences[i]:
+                continue
+        picked.append(i)
+        used += lengths[i]
+    return ' '.join(sentences[i] for i in sorted(picked))
+
+
+def truncate(sentence, length, budget, count_tokens):
+    """Leading words of a sentence of length tokens that fit in budget tokens"""
+    words = sentence.split()
+    keep = len(words) * budget // max(length, 1)
+    while keep:
+        text = ' '.join(words[:keep])
+        tokens = count_tokens([text])[0]
+        if tokens <= budget:
+            return text, tokens
+        keep = min(keep - 1, keep * budget // tokens)
+    return '', 0
+
+
+def input_hash(model_name, num_beams, max_length, text):
+    return hashlib.sha1(f"{model_name}\n{num_beams}\n{max_length}\n{text}".encode('utf-8')).hexdigest()
+
+
+class SummaryCache:
+    def __init__(self, path=CACHE_PATH):
+        self.db = sqlite3.connect(path)
+        self.db.execute("CREATE TABLE IF NOT EXISTS summaries (key TEXT PRIMARY KEY, summary TEXT, created REAL)")
+        self.db.commit()
+
+    def get_many(self, keys):
+        found = {}
+        keys = list(keys)
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            found.update(self.db.execute(
+                f"SELECT key, summary FROM summaries WHERE key IN ({','.join('?' * len(chunk))})", chunk))
+        return found
+
+    def put_many(self, items):
+        now = time.time()
+        self.db.executemany("INSERT OR REPLACE INTO summaries VALUES (?, ?, ?)",
+                            [(key, summary, now) for key, summary in items])
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+
+class ClusterSummarizer:
+    def __init__(self, model_name=DEFAULT_MODEL, num_beams=NUM_BEAMS, max_length=MAX_SUMMARY_TOKENS,
+                 batch_size=BATCH_SIZE, threads=None, cache_path=CACHE_PATH):
+        import torch
+        from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+
+        self.model_name = model_name
+        self.num_beams = num_beams
+        self.max_length = max_length
+        self.batch_size = batch_size
+        torch.set_num_threads(threads or os.cpu_count() or 1)
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
+        self.model.eval()
+        self.cache = SummaryCache(cache_path) if cache_path else None
+        self.budget = MAX_INPUT_TOKENS - len(self.tokenizer(PREFIX).input_ids)
+
+    def count_tokens(self, sentences):
+        return [len(ids) for ids in self.tokenizer(sentences, add_special_tokens=False).input_ids]
+
+    def prepare(self, texts):
+        """The model input of one cluster"""
+        return central_sentences(texts, self.budget, self.count_tokens)
+
+    def generate(self, inputs):
+        """Summaries of model inputs, batched by similar length"""
+        import torch
+
+        summaries = [''] * len(inputs)
+        order = np.argsort([len(text) for text in inputs], kind='stable')
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            encoded = self.tokenizer([PREFIX + inputs[i] for i in batch], return_tensors='pt', padding=True,
+                                     truncation=True, max_length=MAX_INPUT_TOKENS)
+            with torch.inference_mode():
+                output = self.model.generate(input_ids=encoded['input_ids'], attention_mask=encoded['attention_mask'],
+                                             max_length=self.max_length, num_beams=self.num_beams,
+                                             early_stopping=self.num_beams > 1)
+            for i, summary in zip(batch, self.tokenizer.batch_decode(output, skip_special_tokens=True)):
+                summaries[i] = summary.strip()
+        return summaries
+
+    def summarize(self, df, cluster_col='cluster', text_col='full_text'):
+        """One row per cluster: size, summary, input hash and whether it came from the cache"""
+        df = df[df[text_col].notna()]
+        clusters, inputs, sizes = [], [], []
+        for cluster, texts in df.groupby(cluster_col)[text_col]:
+            clusters.append(cluster)
+            sizes.append(len(texts))
+            inputs.append(self.prepare(texts.astype(str).tolist()))
+        keys = [input_hash(self.model_name, self.num_beams, self.max_length, text) for text in inputs]
+
+        cached = self.cache.get_many(keys) if self.cache else {}
+        todo = [i for i, key in enumerate(keys) if key not in cached and inputs[i]]
+        fresh = dict(zip((keys[i] for i in todo), self.generate([inputs[i] for i in todo])))
+        if self.cache and fresh:
+            self.cache.put_many(fresh.items())
+        return pd.DataFrame({
+            cluster_col: clusters, 'size': sizes,
+            'summary': [cached.get(key, fresh.get(key, '')) for key in keys],
+            'input_hash': keys, 'cached': [key in cached for key in keys],
+        })
+
+    def close(self):
+        if self.cache:
+            self.cache.close()
+
+
+if __name__ == '__main__':
+    # python cluster_summaries.py random_1000_clusters.csv [cluster column] [num_beams]
+    args = sys.argv[1:]
+    df = pd.read_csv(args[0] if args else os.path.join(ROOT, 'random_1000_clusters.csv'))
+    cluster_col = args[1] if len(args) > 1 else 'cluster'
+    num_beams = int(args[2]) if len(args) > 2 else NUM_BEAMS
+    if 'full_text' not in df:
+        df['full_text'] = df['title'].fillna('').astype(str) + ' ' + df['content'].fillna('').astype(str)
+
+    summarizer = ClusterSummarizer(num_beams=num_beams)
+    started = time.perf_counter()
+    result = summarizer.summarize(df, cluster_col)
+    summarizer.close()
+    result.to_csv(os.path.join(ROOT, 'cluster_summaries.csv'), index=False)
+    for row in result.itertuples():
+        print(f"📝 Cluster {getattr(row, cluster_col)} ({row.size} articles) : {row.summary}")
+    print(f"{len(result)} clusters, {result['cached'].sum()} from the cache, "
+          f"{time.perf_counter() - started:.1f}s")
@@ -0,0 +1,95 @@
+import asyncio
+
+# Default sizes for the listing-page producer / article consumer pipeline
+PAGES_IN_FLIGHT = 8
+ARTICLE_WORKERS = 100
+QUEUE_SIZE = 500
+
+
+async def crawl(session, fetch_page, process_item, on_record,
+                is_last_page=None, on_checkpoint=None, start_page=0,
+                pages_in_flight=PAGES_IN_FLIGHT, workers=ARTICLE_WORKERS,
+                queue_size=QUEUE_SIZE):
+    """Crawl listing pages ahead of the article fetchers.
+
+    fetch_page(session, page_num) returns the teasers of a listing page (an
+    empty list means there are no more pages), process_item(session, teaser)
+    returns a record or None, and on_record(record) returns True once the
+    crawl should stop. The optional coroutine is_last_page(teasers) lets the
+    caller end the crawl after a page, e.g. once its oldest teaser is past
+    the stop date. on_checkpoint(page_num) is called whenever every page
+    before page_num has been fully processed, so a crawl can resume there.
+    Returns the number of the last listing page that was claimed.
+    """
+    queue = asyncio.Queue(maxsize=queue_size)
+    stop = asyncio.Event()
+    state = {'next_page': start_page, 'last_page': float('inf'), 'checkpoint': start_page}
+    remaining = {}  # Unprocessed teasers per listing page
+
+    def page_done(page_num):
+        if stop.is_set():
+            return  # Teasers skipped on the way out must be crawled again
+        remaining[page_num] = 0
+        checkpoint = state['checkpoint']
+        while remaining.get(checkpoint) == 0:
+            del remaining[checkpoint]
+            checkpoint += 1
+        if checkpoint != state['checkpoint']:
+            state['checkpoint'] = checkpoint
+            if on_checkpoint:
+                on_checkpoint(checkpoint)
+
+    async def produce():
+        while not stop.is_set():
+            page_num = state['next_page']
+            if page_num > state['last_page']:
+                return
+            state['next_page'] += 1
+
+            teasers = await fetch_page(session, page_num)
+            if not teasers:
+                state['last_page'] = min(state['last_page'], page_num - 1)
+                return
+            if is_last_page and await is_last_page(teasers):
+                state['last_page'] = min(state['last_page'], page_num)
+
+            remaining[page_num] = len(teasers)
+            for teaser in teasers:
+                await queue.put((page_num, teaser))
+
+    async def consume():
+        while True:
+            page_num, teaser = await queue.get()
+            try:
+                if stop.is_set():
+                    continue
+                record = await process_item(session, teaser)
+                if record and not stop.is_set() and on_record(record):
+                    stop.set()
+            except Exception as e:
+                print(f"Worker error: {e}")
+            finally:
+                remaining[page_num] -= 1
+                if remaining[page_num] == 0:
+                    page_done(page_num)
+                queue.task_done()
+
+    producers = [asyncio.create_task(produce()) for _ in range(pages_in_flight)]
+    consumers = [asyncio.create_task(consume()) for _ in range(workers)]
+    stopped = asyncio.create_task(stop.wait())
+    produced = asyncio.gather(*producers)
+
+    try:
+        await asyncio.wait([produced, stopped], return_when=asyncio.FIRST_COMPLETED)
+
+        # Listing is exhausted: let the workers drain what is already queued
+        if not stop.is_set():
+            drained = asyncio.create_task(queue.join())
+            await asyncio.wait([drained, stopped], return_when=asyncio.FIRST_COMPLETED)
+            drained.cancel()
+    finally:
+        for task in producers + consumers + [stopped]:
+            task.cancel()
+        await asyncio.gather(produced, *consumers, stopped, return_exceptions=True)
+
+    return min(state['next_page'] - 1, state['last_page'])
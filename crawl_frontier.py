@@ -0,0 +1,129 @@
+import csv
+import json
+import os
+import sqlite3
+import time
+
+# One SQLite file shared by every scraper: per-source cursors plus a URL index
+FRONTIER_DB = os.environ.get(
+    'CRAWL_FRONTIER_DB', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'crawl_frontier.sqlite'))
+COMMIT_EVERY = 200
+
+PENDING = 'pending'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class CrawlFrontier:
+    def __init__(self, path=FRONTIER_DB):
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS cursors ("
+            " source TEXT PRIMARY KEY, state TEXT, updated_at REAL)")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS urls ("
+            " source TEXT, url TEXT, status TEXT, attempts INTEGER DEFAULT 0,"
+            " error TEXT, updated_at REAL, PRIMARY KEY (source, url))")
+        self.db.execute("CREATE INDEX IF NOT EXISTS urls_status ON urls (source, status)")
+        self.db.commit()
+        self._writes = 0
+
+    def _written(self):
+        self._writes += 1
+        if self._writes >= COMMIT_EVERY:
+            self.commit()
+
+    def commit(self):
+        self.db.commit()
+        self._writes = 0
+
+    # Cursors: free-form per-source state such as offset, page or date
+
+    def get_cursor(self, source, **defaults):
+        row = self.db.execute("SELECT state FROM cursors WHERE source = ?", (source,)).fetchone()
+        state = dict(defaults)
+        if row:
+            state.update(json.loads(row[0]))
+        return state
+
+    def set_cursor(self, source, **state):
+        current = self.get_cursor(source)
+        current.update(state)
+        self.db.execute(
+            "INSERT OR REPLACE INTO cursors VALUES (?, ?, ?)",
+            (source, json.dumps(current, default=str), time.time()))
+        self.commit()
+
+    # URL index
+
+    def status(self, source, url):
+        row = self.db.execute(
+            "SELECT status FROM urls WHERE source = ? AND url = ?", (source, url)).fetchone()
+        return row[0] if row else None
+
+    def seen(self, source, url):
+        return self.status(source, url) is not None
+
+    def is_done(self, source, url):
+        return self.status(source, url) == DONE
+
+    def add(self, source, url):
+        """Register a URL, returns False if it was already known"""
+        cursor = self.db.execute(
+            "INSERT OR IGNORE INTO urls (source, url, status, updated_at) VALUES (?, ?, ?, ?)",
+            (source, url, PENDING, time.time()))
+        self._written()
+        return cursor.rowcount == 1
+
+    def add_many(self, source, urls):
+        now = time.time()
+        before = self.db.total_changes
+        self.db.executemany(
+            "INSERT OR IGNORE INTO urls (source, url, status, updated_at) VALUES (?, ?, ?, ?)",
+            ((source, url, PENDING, now) for url in urls))
+        self.commit()
+        return self.db.total_changes - before
+
+    def mark(self, source, url, status, error=None):
+        self.db.execute(
+            "INSERT INTO urls (source, url, status, attempts, error, updated_at) VALUES (?, ?, ?, 1, ?, ?)"
+            " ON CONFLICT(source, url) DO UPDATE SET status = excluded.status, error = excluded.error,"
+            " attempts = attempts + 1, updated_at = excluded.updated_at",
+            (source, url, status, error, time.time()))
+        self._written()
+
+    def mark_done(self, source, url):
+        self.mark(source, url, DONE)
+
+    def mark_failed(self, source, url, error):
+        self.mark(source, url, FAILED, str(error))
+
+    def pending(self, source, max_attempts=3):
+        """URLs of a source still to fetch, failed ones included until max_attempts"""
+        rows = self.db.execute(
+            "SELECT url FROM urls WHERE source = ? AND"
+            " (status = ? OR (status = ? AND attempts < ?)) ORDER BY rowid",
+            (source, PENDING, FAILED, max_attempts))
+        return [row[0] for row in rows]
+
+    def count(self, source, status=None):
+        if status is None:
+            return self.db.execute(
+                "SELECT COUNT(*) FROM urls WHERE source = ?", (source,)).fetchone()[0]
+        return self.db.execute(
+            "SELECT COUNT(*) FROM urls WHERE source = ? AND status = ?", (source, status)).fetchone()[0]
+
+    def import_csv(self, source, file_path, column=0):
+        """One-off migration of an existing link CSV into the URL index"""
+        if not os.path.exists(file_path):
+            return 0
+        with open(file_path, 'r', newline='', encoding='utf-8') as file:
+            reader = csv.reader(file)
+            next(reader, None)  # Skip the header
+            return self.add_many(source, (row[column] for row in reader if row))
+
+    def close(self):
+        self.commit()
+        self.db.close()
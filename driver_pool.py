@@ -0,0 +1,85 @@
+import queue
+import threading
+from contextlib import contextmanager
+
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.chrome.options import Options
+
+
+def headless_chrome():
+    options = Options()
+    options.add_argument("--headless=new")
+    options.add_argument("--disable-blink-features=AutomationControlled")  # Avoid bot detection
+    options.add_argument("--blink-settings=imagesEnabled=false")
+    options.page_load_strategy = 'eager'  # DOM is enough, don't wait for ads and images
+    return webdriver.Chrome(options=options)
+
+
+class DriverPool:
+    """A fixed number of long-lived browsers shared by worker threads.
+
+    Drivers are started lazily, so a run that never needs a browser never
+    pays for one. A driver that raised a WebDriverException is replaced.
+    """
+
+    def __init__(self, size=4, factory=headless_chrome):
+        self.size = size
+        self.factory = factory
+        self.idle = queue.Queue()
+        self.drivers = []
+        self.lock = threading.Lock()
+
+    def _acquire(self):
+        while True:
+            try:
+                return self.idle.get_nowait()
+            except queue.Empty:
+                pass
+            with self.lock:
+                if len(self.drivers) < self.size:
+                    driver = self.factory()
+                    self.drivers.append(driver)
+                    return driver
+            try:
+                return self.idle.get(timeout=1)
+            except queue.Empty:
+                continue  # A broken driver may have been discarded meanwhile
+
+    def _discard(self, driver):
+        with self.lock:
+            self.drivers.remove(driver)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    @contextmanager
+    def driver(self):
+        driver = self._acquire()
+        healthy = True
+        try:
+            yield driver
+        except WebDriverException:
+            healthy = False
+            raise
+        finally:
+            if healthy:
+                self.idle.put(driver)
+            else:
+                self._discard(driver)
+
+    def close(self):
+        with self.lock:
+            drivers, self.drivers = self.drivers, []
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
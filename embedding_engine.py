@@ -0,0 +1,227 @@
+import os
+import sys
+import time
+
+import numpy as np
+
+# CPU embedding engine for the Arabic BERT models of the clustering
+# notebooks. Texts are tokenized once, sorted by token length and packed into
+# batches under a token budget with dynamic padding, so a short title no
+# longer costs 512 positions. Runs on PyTorch (optionally int8 quantized) or
+# on ONNX Runtime through optimum.
+os.environ.setdefault('TOKENIZERS_PARALLELISM', 'false')
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+ONNX_DIR = os.path.join(ROOT, 'onnx_models')
+DEFAULT_MODEL = 'asafaya/bert-base-arabic'
+# Pooling each notebook used: mean over full_text, [CLS] over the titles
+POOLING = {
+    'asafaya/bert-base-arabic': 'mean',
+    'aubmindlab/bert-base-arabertv2': 'cls',
+}
+POOLINGS = ('mean', 'cls')
+BACKENDS = ('torch', 'onnx')
+MAX_LENGTH = 512
+BATCH_TOKENS = 8192  # Padded tokens per forward pass (rows x longest row)
+MAX_BATCH = 64
+
+
+def token_batches(lengths, batch_tokens=BATCH_TOKENS, max_batch=MAX_BATCH):
+    """Positions grouped into batches of similar length, shortest first.
+    A batch grows while rows x longest row stays under the token budget."""
+    order = np.argsort(lengths, kind='stable')
+    batches, batch, longest = [], [], 0
+    for position in order:
+        length = int(lengths[position])
+        if batch and (len(batch) >= max_batch or (len(batch) + 1) * max(longest, length) > batch_tokens):
+            batches.append(batch)
+            batch, longest = [], 0
+        batch.append(int(position))
+        longest = max(longest, length)
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def pool(hidden, attention_mask, pooling):
+    """(batch, hidden) vectors from the last hidden state, numpy arrays"""
+    if pooling == 'cls':
+        return hidden[:, 0, :]
+    # Mean over the real tokens only, padding is masked out
+    mask = attention_mask[:, :, None].astype(hidden.dtype)
+    return (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1)
+
+
+class EmbeddingEngine:
+    def __init__(self, model_name=DEFAULT_MODEL, pooling=None, backend='torch', quantize=False,
+                 threads=None, max_length=MAX_LENGTH, batch_tokens=BATCH_TOKENS, max_batch=MAX_BATCH):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend {backend!r}, choose from {BACKENDS}")
+        self.model_name = model_name
+        self.pooling = pooling or POOLING.get(model_name, 'mean')
+        if self.pooling not in POOLINGS:
+            raise ValueError(f"Unknown pooling {self.pooling!r}, choose from {POOLINGS}")
+        self.backend = backend
+        self.quantize = quantize
+        self.threads = threads or os.cpu_count() or 1
+        self.max_length = max_length
+        self.batch_tokens = batch_tokens
+        self.max_batch = max_batch
+        self.errors = {}  # Position -> error of the last embed() call
+
+        from transformers import AutoTokenizer
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.model = self._load_onnx() if backend == 'onnx' else self._load_torch()
+
+    @property
+    def name(self):
+        """Identifies the vectors: same name, same embedding space"""
+        suffix = '-int8' if self.quantize else ''
+        return f"{self.model_name}:{self.pooling}{suffix}"
+
+    def _load_torch(self):
+        import torch
+        from transformers import AutoModel
+
+        torch.set_num_threads(self.threads)  # Intra-op threads on every core
+        model = AutoModel.from_pretrained(self.model_name)
+        model.eval()
+        if self.quantize:
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        return model
+
+    def _load_onnx(self):
+        from optimum.onnxruntime import ORTModelForFeatureExtraction
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = self.threads
+        export_dir = os.path.join(ONNX_DIR, self.model_name.strip('/').replace('/', '--'))
+        if not os.path.exists(os.path.join(export_dir, 'model.onnx')):
+            ORTModelForFeatureExtraction.from_pretrained(self.model_name, export=True).save_pretrained(export_dir)
+        file_name = 'model.onnx'
+        if self.quantize:
+            file_name = 'model_quantized.onnx'
+            if not os.path.exists(os.path.join(export_dir, file_name)):
+                from optimum.onnxruntime import ORTQuantizer
+                from optimum.onnxruntime.configuration import AutoQuantizationConfig
+                quantizer = ORTQuantizer.from_pretrained(export_dir, file_name='model.onnx')
+                quantizer.quantize(save_dir=export_dir,
+                                   quantization_config=AutoQuantizationConfig.avx2(is_static=False))
+        return ORTModelForFeatureExtraction.from_pretrained(
+            export_dir, file_name=file_name, session_options=options)
+
+    def _forward(self, features):
+        if self.backend == 'onnx':
+            hidden = self.model(**features).last_hidden_state
+            return hidden if isinstance(hidden, np.ndarray) else hidden.numpy()
+        import torch
+        with torch.inference_mode():
+            return self.model(**features).last_hidden_state.float().numpy()
+
+    def _embed_batch(self, encodings):
+        # Dynamic padding: only up to the longest row of this batch
+        width = max(len(e['input_ids']) for e in encodings)
+        features = {key: np.zeros((len(encodings), width), np.int64)
+                    for key in ('input_ids', 'attention_mask', 'token_type_ids')}
+        features['input_ids'][:] = self.tokenizer.pad_token_id or 0
+        for row, encoding in enumerate(encodings):
+            for key, array in features.items():
+                array[row, :len(encoding[key])] = encoding[key]
+        if self.backend == 'torch':
+            import torch
+            features = {key: torch.from_numpy(array) for key, array in features.items()}
+        return pool(self._forward(features), np.asarray(features['attention_mask']), self.pooling)
+
+    def tokenize(self, texts):
+        encoded = self.tokenizer([t if isinstance(t, str) else '' for t in texts], truncation=True,
+                                 max_length=self.max_length, return_token_type_ids=True,
+                                 return_attention_mask=True)
+        return [{key: encoded[key][i] for key in ('input_ids', 'attention_mask', 'token_type_ids')}
+                for i in range(len(texts))]
+
+    def embed(self, texts, progress=None):
+        """float32 (len(texts), hidden) vectors in input order.
+        Rows that failed are NaN, never zeros, and their errors are in self.errors."""
+        self.errors = {}
+        encodings = self.tokenize(texts)
+        lengths = np.array([len(e['input_ids']) for e in encodings])
+        vectors = np.full((len(texts), self.model.config.hidden_size), np.nan, np.float32)
+        done = 0
+        for batch in token_batches(lengths, self.batch_tokens, self.max_batch):
+            try:
+                vectors[batch] = self._embed_batch([encodings[i] for i in batch])
+            except Exception:
+                # One bad row must not sink the batch: retry the rows one by one
+                for i in batch:
+                    try:
+                        vectors[i] = self._embed_batch([encodings[i]])[0]
+                    except Exception as e:
+                        self.errors[i] = f"{type(e).__name__}: {e}"
+            done += len(batch)
+            if progress:
+                progress(done, len(texts))
+        return vectors
+
+
+def legacy_embedding(tokenizer, model, text, pooling):
+    """The notebooks' get_bert_embedding / get_cls_embedding, one text per call"""
+    import torch
+    if pooling == 'mean':
+        inputs = tokenizer(text, return_tensors='pt', truncation=True, padding='max_length', max_length=512)
+    else:
+        inputs = tokenizer(text, return_tensors='pt', truncation=True, padding=True, max_length=64)
+    with torch.no_grad():
+        outputs = model(**inputs)
+    if pooling == 'mean':
+        return outputs.last_hidden_state.mean(dim=1).squeeze().cpu().numpy()
+    return outputs.last_hidden_state[:, 0, :].squeeze().cpu().numpy()
+
+
+def benchmark(texts, model_name=DEFAULT_MODEL, pooling=None, legacy_sample=50, configs=None):
+    """Texts per second of the notebooks' loop and of each engine configuration"""
+    configs = configs or [dict(backend='torch'), dict(backend='torch', quantize=True),
+                          dict(backend='onnx'), dict(backend='onnx', quantize=True)]
+    # The notebooks' loop and the cosine reference both need the fp32 torch model
+    torch_engine = EmbeddingEngine(model_name, pooling, backend='torch')
+    sample = texts[:legacy_sample]
+    started = time.perf_counter()
+    for text in sample:
+        legacy_embedding(torch_engine.tokenizer, torch_engine.model, text, torch_engine.pooling)
+    seconds = time.perf_counter() - started
+    results = [{'path': 'legacy loop', 'texts_per_s': len(sample) / seconds, 'min_cosine_vs_torch': None}]
+
+    reference = None
+    for config in configs:
+        if config == dict(backend='torch'):
+            engine = torch_engine
+        else:
+            try:
+                engine = EmbeddingEngine(model_name, pooling, **config)
+            except ImportError as e:
+                print(f"Skipping {config}: {e}")
+                continue
+        started = time.perf_counter()
+        vectors = engine.embed(texts)
+        seconds = time.perf_counter() - started
+        if reference is None:
+            reference = vectors if engine is torch_engine else torch_engine.embed(texts)
+        cosine = np.sum(reference * vectors, axis=1) / (
+            np.linalg.norm(reference, axis=1) * np.linalg.norm(vectors, axis=1))
+        results.append({'path': engine.backend + ('-int8' if engine.quantize else ''),
+                        'texts_per_s': len(texts) / seconds, 'min_cosine_vs_torch': float(np.nanmin(cosine))})
+    return results
+
+if __name__ == '__main__':
+    # python embedding_engine.py full_data_fusionne.csv [model] [mean|cls] [n_texts]
+    import pandas as pd
+
+    args = sys.argv[1:]
+    df = pd.read_csv(args[0] if args else os.path.join(ROOT, 'full_data_fusionne.csv'))
+    model_name = args[1] if len(args) > 1 else DEFAULT_MODEL
+    pooling = args[2] if len(args) > 2 else None
+    count = int(args[3]) if len(args) > 3 else 500
+    texts = (df['title'].fillna('') + ' ' + df['content'].fillna('')).tolist()[:count]
+    for row in benchmark(texts, model_name, pooling):
+        cosine = '' if row['min_cosine_vs_torch'] is None else f", min cosine vs torch {row['min_cosine_vs_torch']:.4f}"
+        print(f"{row['path']:>12}: {row['texts_per_s']:.1f} texts/s{cosine}")
@@ -0,0 +1,182 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+
+import numpy as np
+
+# Content-addressed store for the BERT vectors. One directory per embedding
+# space (model, pooling), an append-only matrix file read through np.memmap,
+# and an SQLite index from text hash to row. Reruns only embed texts never
+# seen before, and failures are recorded instead of stored as zero vectors.
+STORE_DIR = os.environ.get(
+    'EMBEDDING_STORE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'embeddings'))
+DTYPE = 'float16'  # Halves the disk and page cache, plenty for cosine / KMeans
+EMBED_CHUNK = 2048  # Texts handed to the engine at once
+
+
+def text_key(text):
+    return hashlib.sha1((text or '').encode('utf-8')).hexdigest()
+
+
+def space_dir(model_name, pooling, directory=STORE_DIR):
+    slug = re.sub(r'[^A-Za-z0-9_.-]+', '--', f"{model_name}--{pooling}").strip('-')
+    return os.path.join(directory, slug)
+
+
+class EmbeddingStore:
+    def __init__(self, model_name, pooling, dim=None, dtype=DTYPE, directory=STORE_DIR):
+        self.model_name = model_name
+        self.pooling = pooling
+        self.directory = space_dir(model_name, pooling, directory)
+        os.makedirs(self.directory, exist_ok=True)
+        self.path = os.path.join(self.directory, 'vectors.bin')
+
+        meta_path = os.path.join(self.directory, 'meta.json')
+        if os.path.exists(meta_path):
+            with open(meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+            if dim is not None and dim != meta['dim']:
+                raise ValueError(f"Store {self.directory} holds {meta['dim']}-d vectors, not {dim}")
+        else:
+            if dim is None:
+                raise ValueError("dim is needed to create a new embedding store")
+            meta = {'model': model_name, 'pooling': pooling, 'dim': dim, 'dtype': dtype}
+            with open(meta_path, 'w', encoding='utf-8') as f:
+                json.dump(meta, f, indent=1)
+        self.dim = meta['dim']
+        self.dtype = np.dtype(meta['dtype'])
+
+        self.db = sqlite3.connect(os.path.join(self.directory, 'index.sqlite'))
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS vectors (key TEXT PRIMARY KEY, row INTEGER)")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS failures ("
+            " key TEXT PRIMARY KEY, error TEXT, attempts INTEGER, failed_at REAL)")
+        self.db.commit()
+        self._matrix = None
+
+    @classmethod
+    def for_engine(cls, engine, dtype=DTYPE, directory=STORE_DIR):
+        """The store of an EmbeddingEngine's space; int8 vectors get their own"""
+        pooling = engine.pooling + ('-int8' if engine.quantize else '')
+        return cls(engine.model_name, pooling, engine.model.config.hidden_size, dtype, directory)
+
+    @property
+    def row_size(self):
+        return self.dim * self.dtype.itemsize
+
+    def __len__(self):
+        """Rows in the matrix file"""
+        return os.path.getsize(self.path) // self.row_size if os.path.exists(self.path) else 0
+
+    def matrix(self):
+        """Every stored vector, memory mapped read-only (zero copy)"""
+        rows = len(self)
+        if self._matrix is None or self._matrix.shape[0] != rows:
+            self._matrix = (np.memmap(self.path, self.dtype, mode='r', shape=(rows, self.dim))
+                            if rows else np.empty((0, self.dim), self.dtype))
+        return self._matrix
+
+    def rows(self, keys):
+        """Row of every key, -1 when it was never stored"""
+        found = {}
+        keys = list(keys)
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            found.update(self.db.execute(
+                f"SELECT key, row FROM vectors WHERE key IN ({','.join('?' * len(chunk))})", chunk))
+        return np.array([found.get(key, -1) for key in keys], np.int64)
+
+    def get(self, keys):
+        """float32 vectors of the keys, NaN rows for keys not stored"""
+        rows = self.rows(keys)
+        out = np.full((len(rows), self.dim), np.nan, np.float32)
+        present = rows >= 0
+        if present.any():
+            out[present] = self.matrix()[rows[present]]
+        return out
+
+    def add(self, keys, vectors):
+        """Append vectors; the rows hit the disk before the index points at them"""
+        vectors = np.asarray(vectors, np.float32)
+        if vectors.shape != (len(keys), self.dim):
+            raise ValueError(f"Expected {(len(keys), self.dim)} vectors, got {vectors.shape}")
+        if not np.isfinite(vectors).all():
+            raise ValueError("Refusing to store NaN / inf vectors, record them as failures")
+        if not len(keys):
+            return
+        with open(self.path, 'ab') as f:
+            # A torn write from an earlier crash would shift every later row
+            f.truncate(len(self) * self.row_size)
+            start = f.tell() // self.row_size
+            f.write(vectors.astype(self.dtype).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        self.db.executemany("INSERT OR REPLACE INTO vectors VALUES (?, ?)",
+                            [(key, start + i) for i, key in enumerate(keys)])
+        self.db.executemany("DELETE FROM failures WHERE key = ?", [(key,) for key in keys])
+        self.db.commit()
+
+    def record_failure(self, key, error):
+        self.db.execute(
+            "INSERT INTO failures VALUES (?, ?, 1, ?) ON CONFLICT(key) DO UPDATE SET"
+            " error = excluded.error, attempts = attempts + 1, failed_at = excluded.failed_at",
+            (key, str(error), time.time()))
+        self.db.commit()
+
+    def failures(self):
+        """{key: (error, attempts)} of texts that could not be embedded"""
+        return {key: (error, attempts) for key, error, attempts in
+                self.db.execute("SELECT key, error, attempts FROM failures")}
+
+    def embed(self, texts, engine, chunk=EMBED_CHUNK, progress=None):
+        """Vectors of texts, embedding only the ones not stored yet.
+        Returns (float32 vectors, failed mask); failed rows are NaN."""
+        keys = [text_key(text) for text in texts]
+        rows = self.rows(keys)
+        todo = {}
+        for position in np.flatnonzero(rows < 0):
+            todo.setdefault(keys[position], texts[position])
+        pending = list(todo.items())
+        for start in range(0, len(pending), chunk):
+            batch = pending[start:start + chunk]
+            vectors = engine.embed([text for _, text in batch])
+            ok = np.isfinite(vectors).all(axis=1)
+            self.add([key for (key, _), good in zip(batch, ok) if good], vectors[ok])
+            for i in np.flatnonzero(~ok):
+                self.record_failure(batch[i][0], engine.errors.get(i, 'non-finite vector'))
+            if progress:
+                progress(min(start + chunk, len(pending)), len(pending))
+        vectors = self.get(keys)
+        return vectors, ~np.isfinite(vectors).all(axis=1)
+
+    def close(self):
+        self._matrix = None
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+if __name__ == '__main__':
+    # python embedding_store.py full_data_fusionne.csv [model] [mean|cls]
+    import sys
+    import pandas as pd
+    from embedding_engine import DEFAULT_MODEL, EmbeddingEngine
+
+    args = sys.argv[1:]
+    df = pd.read_csv(args[0] if args else 'full_data_fusionne.csv')
+    engine = EmbeddingEngine(args[1] if len(args) > 1 else DEFAULT_MODEL, args[2] if len(args) > 2 else None)
+    texts = (df['title'].fillna('') + ' ' + df['content'].fillna('')).tolist()
+    with EmbeddingStore.for_engine(engine) as store:
+        before = len(store)
+        started = time.perf_counter()
+        vectors, failed = store.embed(texts, engine, progress=lambda done, total: print(f"{done}/{total}"))
+        print(f"{len(store) - before} texts embedded, {len(texts) - failed.sum()} vectors ready, "
+              f"{failed.sum()} failed in {time.perf_counter() - started:.1f}s ({store.directory})")
@@ -0,0 +1,389 @@
+import ast
+import glob
+import json
+import os
+import re
+import shutil
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from tag_matcher import TAGS
+
+# Cleaning and fusion of the four scraped sources, replacing the per-source
+# cleaning notebooks and fusionne_data_cleaned.ipynb. Every source has one
+# normalizer working on chunks; the merged corpus is Parquet partitioned by
+# source and month, and only sources whose input files changed are rebuilt.
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(ROOT, 'Extraction des donner')
+CORPUS_DIR = os.environ.get('CORPUS_DIR', os.path.join(ROOT, 'corpus'))
+MANIFEST = '_manifest.json'
+CHUNK_ROWS = 20000
+
+COLUMNS = ['source', 'title', 'url', 'published_at', 'tags', 'content']
+SCHEMA = pa.schema([
+    ('source', pa.string()),
+    ('title', pa.string()),
+    ('url', pa.string()),
+    ('published_at', pa.timestamp('s')),
+    ('tags', pa.list_(pa.string())),
+    ('content', pa.string()),
+])
+
+NO_TAGS = ('', 'nan', 'None', 'NO_TAGS', 'no_tags', 'No Tags', '[]')
+SINGLE_TAG_SOURCES = ('France 24', 'France_24')  # One section label per article, spaces included
+TAG_REPR = r"""['"]([^'"]*)['"]"""  # Fallback for list reprs literal_eval can't read
+WHITESPACE = r'\s+'
+
+
+def _phrases(tags):
+    """Known tags by first word, longest first: space separated text can't split them"""
+    phrases = {}
+    for index, tag in enumerate(tags):
+        phrases.setdefault(tag.split()[0], []).append((index, tag.split()))
+    for candidates in phrases.values():
+        candidates.sort(key=lambda candidate: -len(candidate[1]))
+    return phrases
+
+
+PHRASES = _phrases(TAGS)
+
+
+def split_tags(text):
+    """Tags of space separated text, multi-word tags of TAGS kept whole.
+
+    The scrapers write the matching tags in TAGS order, so the words are
+    first read as a sequence of known tags with increasing indexes, which
+    tells "لوس أنجلوس لوس أنجلوس" apart as لوس أنجلوس / لوس / أنجلوس. Text
+    that isn't such a sequence (other tags, other sources) falls back to
+    words, with the longest known tag taken wherever one starts.
+    """
+    words = text.split()
+    failed = set()
+
+    def ordered(i, last):
+        if i == len(words):
+            return []
+        if (i, last) in failed:
+            return None
+        for index, phrase in PHRASES.get(words[i], ()):
+            if index > last and words[i:i + len(phrase)] == phrase:
+                rest = ordered(i + len(phrase), index)
+                if rest is not None:
+                    return [' '.join(phrase)] + rest
+        failed.add((i, last))
+        return None
+
+    tags = ordered(0, -1)
+    if tags is not None:
+        return tags
+    tags, i = [], 0
+    while i < len(words):
+        phrase = next((phrase for _, phrase in PHRASES.get(words[i], ())
+                       if words[i:i + len(phrase)] == phrase), [words[i]])
+        tags.append(' '.join(phrase))
+        i += len(phrase)
+    return tags
+
+
+def parse_repr(text):
+    """Items of a Python list repr, "['غزة', 'حماس']", regex fallback for broken ones"""
+    try:
+        items = ast.literal_eval(text)
+    except (ValueError, SyntaxError):
+        return re.findall(TAG_REPR, text)
+    if not isinstance(items, (list, tuple)):
+        return re.findall(TAG_REPR, text)
+    return [str(item) for item in items if item is not None]
+
+
+def parse_tags(tags, single=False):
+    """Lists of tags from list reprs, space separated text or real lists.
+
+    single=True reads plain text as one tag (France24 section labels)
+    instead of splitting it on spaces.
+    """
+    tags = tags.astype(object)
+    is_text = tags.map(type) == str
+    out = pd.Series([[] for _ in range(len(tags))], index=tags.index, dtype=object)
+
+    text = tags[is_text].str.strip()
+    text = text[~text.isin(NO_TAGS)]
+    is_repr = text.str.startswith('[')
+    out[text[is_repr].index] = text[is_repr].map(parse_repr)
+    out[text[~is_repr].index] = text[~is_repr].map(
+        (lambda tag: [' '.join(tag.split())]) if single else split_tags)
+
+    # Parquet sink parts already hold lists (numpy arrays once in pandas)
+    listed = tags[~is_text & tags.notna()]
+    listed = listed[listed.map(lambda t: isinstance(t, (list, tuple, np.ndarray)))]
+    out[listed.index] = listed.map(lambda t: [str(tag) for tag in t if tag])
+    return out.map(lambda t: [tag.strip() for tag in t if tag.strip()])
+
+
+def parse_source_tags(tags, sources):
+    """parse_tags() of a raw chunk, France24 labels read as one tag each"""
+    out = parse_tags(tags)
+    if sources is None:
+        return out
+    single = np.isin(np.asarray(sources, dtype=object), SINGLE_TAG_SOURCES)
+    if single.any():
+        out[tags.index[single]] = parse_tags(tags[single], single=True)
+    return out
+
+
+def to_day(dates, format=None):
+    """Naive UTC timestamps truncated to the day, NaT when unreadable"""
+    if pd.api.types.is_datetime64_any_dtype(dates):
+        parsed = pd.to_datetime(dates, utc=True)
+    else:
+        parsed = pd.to_datetime(dates, format=format or 'mixed', errors='coerce', utc=True)
+    return parsed.dt.tz_localize(None).dt.normalize()
+
+
+def collapse_spaces(text):
+    return text.astype('string').str.strip().str.replace(WHITESPACE, ' ', regex=True)
+
+
+def column(df, name):
+    return df[name] if name in df else pd.Series(pd.NA, index=df.index, dtype='string')
+
+
+# Normalizers, one per source: raw chunk in, COLUMNS out
+def normalize_france24(df):
+    # france_24_cleaning.ipynb
+    df = df[df['published_at'] != 'No Published Date']
+    df = df.dropna(subset=['description'])
+    return pd.DataFrame({
+        'source': 'France_24',
+        'title': df['title'],
+        'url': df['url'],
+        'published_at': to_day(df['published_at'], format='%d/%m/%Y - %H:%M'),
+        'tags': parse_tags(df['tags'], single=True),
+        'content': collapse_spaces(df['description']),
+    })
+
+
+def normalize_skynews(df):
+    # skyt__news ceaning_vf.ipynb, content is the summary
+    df = df.dropna(subset=['description'])
+    return pd.DataFrame({
+        'source': df['source'].str.replace(' ', '_'),
+        'title': df['title'],
+        'url': df['url'],
+        'published_at': to_day(df['published_at']),
+        'tags': parse_tags(df['tags']),
+        'content': df['description'],
+    })
+
+
+def normalize_alhurra(df):
+    # Clean and prepare al hurra data set.ipynb
+    return pd.DataFrame({
+        'source': df['source'],
+        'title': df['title'],
+        'url': df['url'],
+        'published_at': to_day(df['published_at']),
+        'tags': parse_tags(df['tags']),
+        'content': df['content'].fillna(column(df, 'description')),
+    })
+
+
+def normalize_aljazeera(df):
+    # data_cleaned_jaziira.ipynb, the links were not kept with the articles
+    df = df.rename(columns=lambda c: c.strip()).dropna()
+    return pd.DataFrame({
+        'source': 'aljazira',
+        'title': df['Title'],
+        'url': 'no_url',
+        'published_at': to_day(df['Date'], format='%Y/%m/%d'),
+        'tags': [[] for _ in range(len(df))],
+        'content': df['Content'],
+    }, index=df.index)
+
+
+# Inputs are globs under DATA_DIR, sink directories hold Parquet / NDJSON parts
+SOURCES = {
+    'france24': {
+        'inputs': ['France24/data/*.csv'],
+        'normalize': normalize_france24,
+        'key': ['url'],
+    },
+    'skynews': {
+        'inputs': ['Sky News/skynews_full_data.csv', 'Sky News/skynews_articles/*.parquet',
+                   'Sky News/skynews_articles/*.ndjson'],
+        'normalize': normalize_skynews,
+        'key': ['url'],
+    },
+    'alhurra': {
+        'inputs': ['Al Hura/alhura_full_data.csv', 'Al Hura/alhurra_*/*.parquet',
+                   'Al Hura/alhurra_*/*.ndjson'],
+        'normalize': normalize_alhurra,
+        'key': ['url'],
+    },
+    'aljazeera': {
+        'inputs': ['Al Jazera/aljazira_articles.csv'],
+        'normalize': normalize_aljazeera,
+        'key': ['title', 'content'],
+    },
+}
+
+
+def input_files(source):
+    files = set()
+    for pattern in SOURCES[source]['inputs']:
+        files.update(glob.glob(os.path.join(DATA_DIR, pattern)))
+    return sorted(files)
+
+
+def fingerprint(files):
+    """Size and mtime of every input, compared with the manifest"""
+    return {os.path.relpath(path, ROOT): [os.path.getsize(path), os.stat(path).st_mtime_ns]
+            for path in files}
+
+
+def read_chunks(path):
+    if path.endswith('.csv'):
+        yield from pd.read_csv(path, chunksize=CHUNK_ROWS, dtype=str)
+    elif path.endswith('.parquet'):
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=CHUNK_ROWS):
+            yield batch.to_pandas()
+    elif path.endswith('.ndjson'):
+        yield from pd.read_json(path, lines=True, chunksize=CHUNK_ROWS, dtype=False)
+
+
+def clean_chunk(df, key, seen):
+    """Drop incomplete rows and rows already seen in an earlier chunk"""
+    df = df.dropna(subset=['title', 'published_at'])
+    df = df[df['title'].astype(str).str.strip() != '']
+    hashes = pd.util.hash_pandas_object(df[key].astype(str), index=False).to_numpy()
+    first = ~pd.Series(hashes).duplicated().to_numpy()
+    new = np.fromiter((h not in seen for h in hashes), bool, len(hashes))
+    keep = first & new
+    seen.update(hashes[keep].tolist())
+    return df[keep]
+
+
+def read_manifest(corpus_dir=CORPUS_DIR):
+    try:
+        with open(os.path.join(corpus_dir, MANIFEST), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_manifest(manifest, corpus_dir=CORPUS_DIR):
+    path = os.path.join(corpus_dir, MANIFEST)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, ensure_ascii=False)
+    os.replace(path + '.tmp', path)
+
+
+def build_source(source, files, corpus_dir=CORPUS_DIR):
+    """Rewrite the partitions of one source, swapped in once complete"""
+    spec = SOURCES[source]
+    staging = os.path.join(corpus_dir, f'.{source}.tmp')
+    shutil.rmtree(staging, ignore_errors=True)
+    writers = {}  # One Parquet file per month, a row group per chunk
+    seen = set()
+    rows = 0
+    try:
+        for path in files:
+            for raw in read_chunks(path):
+                df = clean_chunk(spec['normalize'](raw), spec['key'], seen)
+                if df.empty:
+                    continue
+                df = df[COLUMNS]
+                for month, part in df.groupby(df['published_at'].dt.strftime('%Y-%m')):
+                    if month not in writers:
+                        month_dir = os.path.join(staging, month)
+                        os.makedirs(month_dir)
+                        writers[month] = pq.ParquetWriter(
+                            os.path.join(month_dir, 'part-0.parquet'), SCHEMA, compression='zstd')
+                    writers[month].write_table(
+                        pa.Table.from_pandas(part, schema=SCHEMA, preserve_index=False))
+                rows += len(df)
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+    target = os.path.join(corpus_dir, source)
+    shutil.rmtree(target, ignore_errors=True)
+    if writers:
+        os.replace(staging, target)
+    return rows
+
+
+def build(sources=None, force=False, corpus_dir=CORPUS_DIR):
+    """Rebuild the sources whose inputs changed since the last build"""
+    os.makedirs(corpus_dir, exist_ok=True)
+    manifest = read_manifest(corpus_dir)
+    rebuilt = {}
+    for source in sources or SOURCES:
+        files = input_files(source)
+        inputs = fingerprint(files)
+        previous = manifest.get(source, {})
+        if not force and previous.get('inputs') == inputs:
+            print(f"{source}: unchanged ({previous.get('rows', 0)} rows)")
+            continue
+
+        started = time.time()
+        rows = build_source(source, files, corpus_dir)
+        manifest[source] = {'inputs': inputs, 'rows': rows, 'built_at': time.time()}
+        write_manifest(manifest, corpus_dir)
+        rebuilt[source] = rows
+        print(f"{source}: {rows} rows from {len(files)} files in {time.time() - started:.1f}s")
+    return rebuilt
+
+
+def corpus_files(sources=None, start=None, end=None, corpus_dir=CORPUS_DIR):
+    """Partition files, pruned by source and by month ('YYYY-MM' bounds)"""
+    files = []
+    for source in sources or SOURCES:
+        for month_dir in sorted(glob.glob(os.path.join(corpus_dir, source, '*'))):
+            month = os.path.basename(month_dir)
+            if (start and month < start[:7]) or (end and month > end[:7]):
+                continue
+            files.extend(sorted(glob.glob(os.path.join(month_dir, '*.parquet'))))
+    return files
+
+
+def iter_corpus(sources=None, start=None, end=None, columns=None, corpus_dir=CORPUS_DIR):
+    """The merged corpus as DataFrame chunks, without loading it whole"""
+    for path in corpus_files(sources, start, end, corpus_dir):
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=CHUNK_ROWS, columns=columns):
+            df = batch.to_pandas()
+            if 'published_at' in df and (start or end):
+                df = df[df['published_at'].between(pd.Timestamp(start or 0), pd.Timestamp(end or '2262-01-01'))]
+            yield df
+
+
+def read_corpus(sources=None, start=None, end=None, columns=None, corpus_dir=CORPUS_DIR):
+    chunks = list(iter_corpus(sources, start, end, columns, corpus_dir))
+    if not chunks:
+        return pd.DataFrame(columns=columns or COLUMNS)
+    return pd.concat(chunks, ignore_index=True)
+
+
+def export_csv(path=os.path.join(ROOT, 'full_data_fusionne.csv'), corpus_dir=CORPUS_DIR):
+    """full_data_fusionne.csv layout: tags space separated, 'no_tags' when empty"""
+    rows = 0
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        for df in iter_corpus(corpus_dir=corpus_dir):
+            df['published_at'] = df['published_at'].dt.strftime('%Y-%m-%d')
+            df['tags'] = df['tags'].map(lambda tags: ' '.join(tags) if len(tags) else 'no_tags')
+            df.to_csv(f, header=rows == 0, index=False)
+            rows += len(df)
+    return rows
+
+
+if __name__ == '__main__':
+    # python fusion_pipeline.py [france24 skynews ...] [--force] [--csv]
+    args = sys.argv[1:]
+    build([a for a in args if a in SOURCES] or None, force='--force' in args)
+    if '--csv' in args:
+        print(f"{export_csv()} rows written to full_data_fusionne.csv")
@@ -0,0 +1,316 @@
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Pluggable HTML backend for the scrapers. Every extractor works on the few
+# subtrees it needs and returns plain dicts / strings, never the parsed tree,
+# so it can run in a worker process and only small results cross back.
+try:
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser
+except ImportError:
+    HTMLParser = None
+
+try:
+    import lxml.html
+    import cssselect  # noqa: F401  (needed by lxml's .cssselect())
+except ImportError:
+    lxml = None
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+def available_backends():
+    backends = []
+    if HTMLParser is not None:
+        backends.append('selectolax')
+    if lxml is not None:
+        backends.append('lxml')
+    backends.append('bs4')
+    return backends
+
+
+BACKEND = os.environ.get('HTML_PARSER_BACKEND') or available_backends()[0]
+
+
+def set_backend(name):
+    global BACKEND
+    if name not in available_backends():
+        raise ValueError(f"HTML backend {name!r} is not installed, choose from {available_backends()}")
+    BACKEND = name
+
+
+class _SelectolaxNode:
+    def __init__(self, node):
+        self.node = node
+
+    def css(self, selector):
+        return [_SelectolaxNode(n) for n in self.node.css(selector)]
+
+    def css_first(self, selector):
+        node = self.node.css_first(selector)
+        return _SelectolaxNode(node) if node is not None else None
+
+    def text(self):
+        return self.node.text(deep=True)
+
+    def attr(self, name):
+        return self.node.attributes.get(name)
+
+
+class _LxmlNode:
+    def __init__(self, node):
+        self.node = node
+
+    def css(self, selector):
+        return [_LxmlNode(n) for n in self.node.cssselect(selector)]
+
+    def css_first(self, selector):
+        nodes = self.node.cssselect(selector)
+        return _LxmlNode(nodes[0]) if nodes else None
+
+    def text(self):
+        return self.node.text_content()
+
+    def attr(self, name):
+        return self.node.get(name)
+
+
+class _SoupNode:
+    def __init__(self, node):
+        self.node = node
+
+    def css(self, selector):
+        return [_SoupNode(n) for n in self.node.select(selector)]
+
+    def css_first(self, selector):
+        node = self.node.select_one(selector)
+        return _SoupNode(node) if node is not None else None
+
+    def text(self):
+        return self.node.get_text()
+
+    def attr(self, name):
+        value = self.node.get(name)
+        return ' '.join(value) if isinstance(value, list) else value
+
+
+def parse(html, only=None, backend=None):
+    """Parse a page with the selected backend.
+
+    only=(tag, class) is a hint for the BeautifulSoup backend, which then
+    builds just the matching subtrees; the C backends parse the whole page
+    faster than BeautifulSoup can skip it.
+    """
+    backend = backend or BACKEND
+    if backend == 'selectolax':
+        return _SelectolaxNode(HTMLParser(html).root)
+    if backend == 'lxml':
+        return _LxmlNode(lxml.html.fromstring(html))
+    features = 'lxml' if lxml is not None else 'html.parser'
+    if only:
+        tag, classes = only
+        if classes:
+            # Match one class token of a multi-valued class attribute
+            classes = [classes] if isinstance(classes, str) else classes
+            pattern = re.compile(r'(^|\s)(%s)(\s|$)' % '|'.join(map(re.escape, classes)))
+            strainer = SoupStrainer(tag, class_=pattern)
+        else:
+            strainer = SoupStrainer(tag)
+        return _SoupNode(BeautifulSoup(html, features, parse_only=strainer))
+    return _SoupNode(BeautifulSoup(html, features))
+
+
+def _text(node):
+    return node.text().strip() if node is not None else ''
+
+
+# Al Hurra
+
+def alhurra_teasers(html):
+    """Teasers of a search listing page as dicts"""
+    root = parse(html, only=('div', 'teaser'))
+    teasers = []
+    for teaser in root.css('div.teaser.teaser--dated'):
+        link = teaser.css_first('a.teaser__title-link')
+        image = teaser.css_first('img.media__element')
+        title = teaser.css_first('h2.teaser__title')
+        date = teaser.css_first('div.teaser__date')
+        teasers.append({
+            'title': title.text().strip() if title else None,
+            'href': link.attr('href') if link else None,
+            'date': date.text().strip() if date else None,
+            'description': _text(teaser.css_first('div.teaser__text')),
+            'image_url': image.attr('src') if image else '',
+        })
+    return teasers
+
+
+def alhurra_article(html):
+    root = parse(html, only=('div', ['article__body', 'page-header__meta-item']))
+    content_div = root.css_first('div.article__body')
+    content = ' '.join(p.text().strip() for p in content_div.css('p')) if content_div else ''
+
+    author_div = root.css_first('div.page-header__meta-item')
+    author = author_div.text().split(':')[-1].strip() if author_div else None
+    return {'content': content, 'author': author}
+
+
+# Al Jazeera
+
+def aljazeera_article(html):
+    root = parse(html, only=(['h1', 'div'], None))
+    title_tag = root.css_first('h1')
+    title = title_tag.text().strip() if title_tag else "No Title Found"
+
+    content_div = root.css_first('div.wysiwyg.wysiwyg--all-content')
+    if content_div:
+        content = ' '.join(p.text().strip() for p in content_div.css('p'))
+    else:
+        content = "No Content Found"
+    return title, content
+
+
+def json_ld_article(html):
+    """(headline, articleBody) of the first NewsArticle JSON-LD block, if any"""
+    root = parse(html, only=('script', None))
+    for script in root.css('script[type="application/ld+json"]'):
+        try:
+            data = json.loads(script.text())
+        except ValueError:
+            continue
+        items = data if isinstance(data, list) else data.get('@graph', [data])
+        for item in items:
+            if isinstance(item, dict) and item.get('articleBody'):
+                return item.get('headline'), item['articleBody']
+    return None
+
+
+def aljazeera_static_article(html):
+    """(title, content) from server-rendered HTML or JSON-LD, None if the page needs JS"""
+    title, content = aljazeera_article(html)
+    if content != "No Content Found" and content.strip():
+        return title, content
+    embedded = json_ld_article(html)
+    if embedded:
+        headline, body = embedded
+        return (headline or title), body
+    return None
+
+
+# France24
+
+def france24_archive_days(html):
+    """(url, day label) of every day link on a yearly archive page"""
+    root = parse(html, only=('a', 'o-archive-month__days__day__link'))
+    return [(f"https://www.france24.com{link.attr('href')}", link.text())
+            for link in root.css('a.o-archive-month__days__day__link')]
+
+
+def france24_day_entries(html):
+    """(title, url) of every article listed on an archive day page"""
+    root = parse(html, only=('li', 'o-archive-day__list__entry'))
+    entries = []
+    for entry in root.css('li.o-archive-day__list__entry'):
+        link = entry.css_first('a.a-archive-link')
+        href = link.attr('href') if link else None
+        title = entry.css_first('h2')
+        entries.append((title.text().strip() if title else "No Title",
+                        f"https://www.france24.com{href}" if href else "No Link"))
+    return entries
+
+
+def france24_article(html):
+    root = parse(html)
+    paragraphs = root.css('p:not([class]), p[class=""]')
+    description = root.css_first('p.t-content__chapo')
+    time_tag = root.css_first('time:not([class]), time[class=""]')
+    tags = root.css_first('div.a-tag-section')
+    return {
+        'content': ''.join("\n" + p.text().strip() for p in paragraphs),
+        'description': description.text() if description else None,
+        'published_at': time_tag.text() if time_tag else None,
+        'tags': tags.text() if tags else None,
+    }
+
+
+# Off the event loop
+
+def _init_worker(backend):
+    set_backend(backend)
+
+
+class ParserPool:
+    """Run extractors in worker processes so parsing never blocks the event loop"""
+
+    def __init__(self, workers=None, backend=None):
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(backend or BACKEND,))
+
+    async def run(self, extractor, html):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, extractor, html)
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Micro-benchmark against the original BeautifulSoup(html, 'html.parser') path
+
+def _legacy_alhurra_article(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    content_div = soup.find('div', class_='article__body')
+    content = ' '.join([p.text.strip() for p in content_div.find_all('p')]) if content_div else ''
+    author_div = soup.find('div', class_='page-header__meta-item')
+    author = author_div.text.split(':')[-1].strip() if author_div else None
+    return {'content': content, 'author': author}
+
+
+def _legacy_alhurra_teasers(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    return soup.find_all('div', class_='teaser teaser--dated')
+
+
+LEGACY = {
+    alhurra_article: _legacy_alhurra_article,
+    alhurra_teasers: _legacy_alhurra_teasers,
+}
+
+
+def benchmark(html, extractor=alhurra_article, repeat=20):
+    """Seconds per page for the legacy path and each installed backend"""
+    timings = {}
+    legacy = LEGACY.get(extractor)
+    if legacy:
+        started = time.perf_counter()
+        for _ in range(repeat):
+            legacy(html)
+        timings['bs4 html.parser (legacy)'] = (time.perf_counter() - started) / repeat
+    for backend in available_backends():
+        set_backend(backend)
+        started = time.perf_counter()
+        for _ in range(repeat):
+            extractor(html)
+        timings[backend] = (time.perf_counter() - started) / repeat
+    return timings
+
+
+if __name__ == '__main__':
+    # python html_parsing.py article.html [listing.html ...]
+    default_backend = BACKEND
+    for path in sys.argv[1:]:
+        with open(path, encoding='utf-8') as f:
+            page = f.read()
+        extractor = alhurra_teasers if 'teaser--dated' in page else alhurra_article
+        print(f"{path} ({extractor.__name__})")
+        for name, seconds in benchmark(page, extractor).items():
+            print(f"  {name:<26} {seconds * 1000:8.2f} ms/page")
+        set_backend(default_backend)
@@ -0,0 +1,208 @@
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+# Shared on-disk cache for the scrapers: compressed bodies keyed by URL,
+# revalidated with ETag / Last-Modified and evicted least-recently-used.
+CACHE_DIR = os.environ.get(
+    'HTTP_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.http_cache'))
+MAX_BYTES = 2 * 1024 ** 3  # Compressed size kept on disk
+REVALIDATE_AFTER = 7 * 24 * 3600  # Published articles almost never change
+ACCESS_FLUSH = 500  # Cache hits whose access time is written in one transaction
+
+
+class CachedResponse:
+    def __init__(self, url, body, etag=None, last_modified=None, fetched_at=None):
+        self.url = url
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at
+
+    @property
+    def text(self):
+        return self.body.decode('utf-8', errors='replace')
+
+
+class HttpCache:
+    def __init__(self, directory=CACHE_DIR, max_bytes=MAX_BYTES,
+                 revalidate_after=REVALIDATE_AFTER, offline=False):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.revalidate_after = revalidate_after
+        self.offline = offline  # Replay from disk only, never touch the network
+        os.makedirs(directory, exist_ok=True)
+        # Shared by the asyncio scrapers and the threaded ones
+        self.db = sqlite3.connect(os.path.join(directory, 'index.sqlite'), check_same_thread=False)
+        self.lock = threading.RLock()
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY, url TEXT, etag TEXT, last_modified TEXT,"
+            " size INTEGER, fetched_at REAL, accessed_at REAL)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)")
+        self.db.commit()
+        self._accessed = {}  # Key -> access time of hits not written yet, only the LRU order needs them
+
+    @staticmethod
+    def _key(url):
+        return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.z')
+
+    def get(self, url):
+        with self.lock:
+            key = self._key(url)
+            row = self.db.execute(
+                "SELECT etag, last_modified, fetched_at FROM entries WHERE key = ?", (key,)).fetchone()
+            if not row:
+                return None
+            try:
+                with open(self._path(key), 'rb') as f:
+                    body = zlib.decompress(f.read())
+            except (OSError, zlib.error):
+                self._delete(key)
+                return None
+            self._accessed[key] = time.time()
+            if len(self._accessed) >= ACCESS_FLUSH:
+                self._flush_accessed()
+            return CachedResponse(url, body, row[0], row[1], row[2])
+
+    def _flush_accessed(self):
+        self.db.executemany("UPDATE entries SET accessed_at = ? WHERE key = ?",
+                            [(accessed, key) for key, accessed in self._accessed.items()])
+        self.db.commit()
+        self._accessed.clear()
+
+    def put(self, url, body, etag=None, last_modified=None):
+        with self.lock:
+            if isinstance(body, str):
+                body = body.encode('utf-8')
+            key = self._key(url)
+            path = self._path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            data = zlib.compress(body, 6)
+            with open(path + '.tmp', 'wb') as f:
+                f.write(data)
+            os.replace(path + '.tmp', path)
+
+            now = time.time()
+            self._accessed.pop(key, None)
+            self.db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, url, etag, last_modified, len(data), now, now))
+            self.db.commit()
+            self._evict()
+            return CachedResponse(url, body, etag, last_modified, now)
+
+    def touch(self, url):
+        """Mark an entry as revalidated after a 304 Not Modified"""
+        with self.lock:
+            now = time.time()
+            self.db.execute(
+                "UPDATE entries SET fetched_at = ?, accessed_at = ? WHERE key = ?",
+                (now, now, self._key(url)))
+            self.db.commit()
+
+    def _delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+        self.db.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def _evict(self):
+        if self._accessed:
+            self._flush_accessed()  # Recent hits must not look least recently used
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Drop least recently used entries down to 90% of the budget
+        target = self.max_bytes * 0.9
+        for key, size in self.db.execute(
+                "SELECT key, size FROM entries ORDER BY accessed_at").fetchall():
+            if total <= target:
+                break
+            self._delete(key)
+            self._accessed.pop(key, None)
+            total -= size
+        self.db.commit()
+
+    def size(self):
+        with self.lock:
+            return self.db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def is_fresh(self, entry):
+        return self.offline or time.time() - entry.fetched_at < self.revalidate_after
+
+    @staticmethod
+    def conditional_headers(entry):
+        headers = {}
+        if entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def fetch(self, url, session=None, **kwargs):
+        """Cached GET through requests (or a requests.Session)"""
+        entry = self.get(url)
+        if entry and self.is_fresh(entry):
+            return entry
+        if self.offline:
+            raise LookupError(f"Not cached: {url}")
+        if session is None:
+            import requests as session
+
+        headers = dict(kwargs.pop('headers', None) or {})
+        if entry:
+            headers.update(self.conditional_headers(entry))
+        response = session.get(url, headers=headers, **kwargs)
+        if entry and response.status_code == 304:
+            self.touch(url)
+            return entry
+        response.raise_for_status()
+        return self.put(url, response.content,
+                        response.headers.get('ETag'), response.headers.get('Last-Modified'))
+
+    async def fetch_async(self, session, url, **kwargs):
+        """Cached GET through an aiohttp.ClientSession. Disk and SQLite work
+        runs in a thread, so cache hits don't block the event loop."""
+        entry = await asyncio.to_thread(self.get, url)
+        if entry and self.is_fresh(entry):
+            return entry
+        if self.offline:
+            raise LookupError(f"Not cached: {url}")
+
+        headers = dict(kwargs.pop('headers', None) or {})
+        if entry:
+            headers.update(self.conditional_headers(entry))
+        async with session.get(url, headers=headers, **kwargs) as response:
+            if entry and response.status == 304:
+                await asyncio.to_thread(self.touch, url)
+                return entry
+            response.raise_for_status()
+            body = await response.read()
+        return await asyncio.to_thread(self.put, url, body,
+                                       response.headers.get('ETag'), response.headers.get('Last-Modified'))
+
+    def get_or_fetch(self, url, fetch):
+        """Cache any fetcher returning the page source, e.g. a Selenium driver"""
+        entry = self.get(url)
+        if entry and self.is_fresh(entry):
+            return entry.text
+        if self.offline:
+            raise LookupError(f"Not cached: {url}")
+        html = fetch(url)
+        self.put(url, html)
+        return html
+
+    def close(self):
+        with self.lock:
+            if self._accessed:
+                self._flush_accessed()
+            self.db.close()
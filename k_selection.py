@@ -0,0 +1,219 @@
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Choice of k for the KMeans notebooks. Candidate k values are fitted with
+# MiniBatchKMeans in a process pool: first a coarse grid, stopping early once
+# the scores keep falling clearly below the best, then finer grids around the
+# best k, warm started from the centroids of the closest smaller k. The
+# silhouette is averaged over random samples with a confidence interval
+# (exact silhouette is O(n^2)); Davies-Bouldin and Calinski-Harabasz are
+# O(n k) and computed on every row.
+K_MIN = 2
+K_MAX = 90
+SAMPLE_SIZE = 2000  # Rows per silhouette sample
+SAMPLES = 5  # Silhouette samples per k, the same rows for every k
+CONFIDENCE_Z = 1.96  # 95% interval
+PATIENCE = 3  # Coarse k values clearly worse than the best before stopping
+COARSE_POINTS = 12
+BATCH_SIZE = 4096
+WORKERS = os.cpu_count() or 1
+
+_features = None  # Feature matrix of a worker process
+_samples = None
+
+
+def _init_worker(features, samples):
+    global _features, _samples
+    _features, _samples = features, samples
+    try:
+        # One BLAS / OpenMP thread per process, the pool is the parallelism
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(1)
+    except ImportError:
+        pass
+
+
+def grow_centroids(features, centroids, k, rng, sample_size=20000):
+    """k starting centroids from the centroids of a smaller k: the cluster with
+    the largest squared error is split in two along its main direction until
+    there are k (bisecting KMeans style, no outlier picked as a new center)"""
+    centroids = [np.asarray(c, np.float64) for c in centroids[:k]]
+    if len(centroids) == k:
+        return np.vstack(centroids)
+    sample = features[rng.choice(len(features), min(len(features), sample_size), replace=False)]
+    matrix = np.vstack(centroids)
+    # |x - c|^2 = |x|^2 - 2 x.c + |c|^2, without a (rows, k, dim) array
+    labels = np.argmin((matrix ** 2).sum(axis=1) - 2 * sample @ matrix.T, axis=1)
+    members = [sample[labels == c] for c in range(len(centroids))]
+    errors = [((m - c) ** 2).sum() if len(m) else 0.0 for m, c in zip(members, centroids)]
+    while len(centroids) < k:
+        worst = int(np.argmax(errors))
+        rows = members[worst]
+        if len(rows) < 2:
+            centroids.append(sample[rng.randint(len(sample))])  # Nothing left to split
+            members.append(sample[:0])
+            errors.append(0.0)
+            continue
+        centered = rows - rows.mean(axis=0)
+        direction = np.linalg.svd(centered, full_matrices=False)[2][0]
+        side = centered @ direction > 0
+        halves = [rows[side], rows[~side]]
+        means = [half.mean(axis=0) for half in halves]
+        centroids[worst], members[worst], errors[worst] = means[0], halves[0], ((halves[0] - means[0]) ** 2).sum()
+        centroids.append(means[1])
+        members.append(halves[1])
+        errors.append(((halves[1] - means[1]) ** 2).sum())
+    return np.vstack(centroids)
+
+
+def silhouette_interval(features, labels, samples, z=CONFIDENCE_Z):
+    """(mean, lower, upper) of the silhouette over the sampled row sets"""
+    from sklearn.metrics import silhouette_score
+
+    scores = []
+    for rows in samples:
+        if len(np.unique(labels[rows])) > 1:
+            scores.append(silhouette_score(features[rows], labels[rows]))
+    if not scores:
+        return np.nan, np.nan, np.nan
+    mean = float(np.mean(scores))
+    half = z * float(np.std(scores, ddof=1)) / math.sqrt(len(scores)) if len(scores) > 1 else 0.0
+    return mean, mean - half, mean + half
+
+
+def score_k(features, samples, k, init=None, seed=42):
+    """Fit one k and score it, a row of the curve plus the centroids"""
+    from sklearn.cluster import MiniBatchKMeans
+    from sklearn.metrics import calinski_harabasz_score, davies_bouldin_score
+
+    started = time.perf_counter()
+    kmeans = MiniBatchKMeans(k, init='k-means++' if init is None else init, n_init=3 if init is None else 1,
+                             batch_size=BATCH_SIZE, random_state=seed).fit(features)
+    labels = kmeans.predict(features)
+    silhouette, lower, upper = silhouette_interval(features, labels, samples)
+    several = len(np.unique(labels)) > 1
+    row = {'k': k, 'silhouette': silhouette, 'silhouette_lower': lower, 'silhouette_upper': upper,
+           'davies_bouldin': davies_bouldin_score(features, labels) if several else np.nan,
+           'calinski_harabasz': calinski_harabasz_score(features, labels) if several else np.nan,
+           'inertia': float(kmeans.inertia_), 'warm_start': init is not None,
+           'seconds': time.perf_counter() - started}
+    return row, kmeans.cluster_centers_
+
+
+def _score_task(args):
+    k, init, seed = args
+    return score_k(_features, _samples, k, init, seed)
+
+
+def silhouette_samples_rows(n, sample_size=SAMPLE_SIZE, samples=SAMPLES, seed=42):
+    rng = np.random.RandomState(seed)
+    if n <= sample_size:
+        return [np.arange(n)]  # The exact silhouette, no interval
+    return [np.sort(rng.choice(n, sample_size, replace=False)) for _ in range(samples)]
+
+
+class KSweep:
+    def __init__(self, k_min=K_MIN, k_max=K_MAX, coarse_points=COARSE_POINTS, patience=PATIENCE,
+                 sample_size=SAMPLE_SIZE, samples=SAMPLES, workers=WORKERS, seed=42):
+        self.k_min = k_min
+        self.k_max = k_max
+        self.coarse_points = coarse_points
+        self.patience = patience
+        self.sample_size = sample_size
+        self.samples = samples
+        self.workers = workers
+        self.seed = seed
+
+    def _run(self, pool, ks, stage):
+        tasks = []
+        for k in ks:
+            # Warm start from the closest smaller k already fitted
+            smaller = [j for j in self.centroids if j < k]
+            init = None
+            if smaller and stage != 'coarse':
+                rng = np.random.RandomState(self.seed + k)
+                init = grow_centroids(self.features, self.centroids[max(smaller)], k, rng)
+            tasks.append((k, init, self.seed))
+        results = pool.map(_score_task, tasks) if pool else (_score_task(task) for task in tasks)
+        for (row, centers) in results:
+            row['stage'] = stage
+            self.rows[row['k']] = row
+            self.centroids[row['k']] = centers
+
+    def best(self):
+        scored = [row for row in self.rows.values() if not np.isnan(row['silhouette'])]
+        return max(scored, key=lambda row: row['silhouette']) if scored else None
+
+    def fit(self, features):
+        """Sweep k, returns the score curve (one row per fitted k, sorted by k)"""
+        self.features = np.asarray(features, np.float64)
+        k_max = min(self.k_max, len(self.features) - 1)
+        if k_max < self.k_min:
+            raise ValueError(f"Need more than {self.k_min} rows to choose k")
+        self.rows, self.centroids = {}, {}
+        sample_rows = silhouette_samples_rows(len(self.features), self.sample_size, self.samples, self.seed)
+
+        pool = None
+        if self.workers > 1:
+            pool = ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                       initargs=(self.features, sample_rows))
+        else:
+            _init_worker(self.features, sample_rows)
+        try:
+            grid = sorted(set(np.linspace(self.k_min, k_max, self.coarse_points).round().astype(int)))
+            step = max(1, grid[1] - grid[0]) if len(grid) > 1 else 1
+
+            # Coarse grid, one pool-sized batch at a time, with early stopping
+            worse = 0
+            batch_size = max(1, self.workers)
+            for start in range(0, len(grid), batch_size):
+                batch = grid[start:start + batch_size]
+                self._run(pool, batch, 'coarse')
+                best = self.best()
+                for k in batch:
+                    row = self.rows[k]
+                    clearly_worse = best is not None and row['silhouette_upper'] < best['silhouette_lower']
+                    worse = worse + 1 if clearly_worse else 0
+                if worse >= self.patience:
+                    break
+
+            # Finer and finer grids around the best k
+            while step > 1 and self.best() is not None:
+                step = max(1, step // 4)
+                center = self.best()['k']
+                ks = [k for k in range(center - 3 * step, center + 3 * step + 1, step)
+                      if self.k_min <= k <= k_max and k not in self.rows]
+                self._run(pool, ks, 'fine')
+        finally:
+            if pool:
+                pool.shutdown()
+        return pd.DataFrame(sorted(self.rows.values(), key=lambda row: row['k']))
+
+
+def select_k(features, **kwargs):
+    """(best k by silhouette, score curve)"""
+    sweep = KSweep(**kwargs)
+    curve = sweep.fit(features)
+    return int(sweep.best()['k']), curve
+
+
+if __name__ == '__main__':
+    # python k_selection.py features.npy [k_min] [k_max] [workers]
+    args = sys.argv[1:]
+    features = np.load(args[0] if args else 'combined_features.npy')
+    k_min = int(args[1]) if len(args) > 1 else K_MIN
+    k_max = int(args[2]) if len(args) > 2 else K_MAX
+    workers = int(args[3]) if len(args) > 3 else WORKERS
+    started = time.perf_counter()
+    best_k, curve = select_k(features, k_min=k_min, k_max=k_max, workers=workers)
+    print(curve[['k', 'stage', 'silhouette', 'silhouette_lower', 'silhouette_upper',
+                 'davies_bouldin', 'calinski_harabasz']].to_string(index=False))
+    print(f"\n✅ Meilleur nombre de clusters : k={best_k} "
+          f"({len(curve)} k testés en {time.perf_counter() - started:.1f}s)")
+    curve.to_csv('k_selection_curve.csv', index=False)
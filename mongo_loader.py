@@ -0,0 +1,155 @@
+import datetime
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from fusion_pipeline import parse_source_tags
+from near_duplicates import record_id
+
+# Streams article CSVs into MongoDB in fixed-size batches of unordered
+# upserts keyed by the URL (a content hash when there is none), so a reload
+# updates documents instead of duplicating them and memory does not grow
+# with the file. Documents are read back by pages with a projection, keyset
+# paginated on _id. Any pymongo compatible client works.
+MONGO_URI = os.environ.get('MONGO_URI', 'mongodb://localhost:27017')
+DATABASE = 'projectSD'
+BATCH_SIZE = 1000
+PAGE_SIZE = 1000
+# Fields the dashboards filter and sort on
+INDEXES = [
+    [('source', 1)],
+    [('published_at', -1)],
+    [('tags', 1)],
+    [('cluster', 1)],
+    [('source', 1), ('published_at', -1)],
+]
+DROPPED = ('Unnamed: 0', 'index')
+
+
+def connect(uri=MONGO_URI, **kwargs):
+    from pymongo import MongoClient
+    return MongoClient(uri, **kwargs)
+
+
+def ensure_indexes(collection):
+    return [collection.create_index(keys) for keys in INDEXES]
+
+
+def _value(value):
+    """BSON-friendly Python value, None for missing ones"""
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [_value(v) for v in value]
+    # NaT is neither a numpy scalar nor a Timestamp, and BSON can't encode it
+    if value is None or value is pd.NaT or (np.isscalar(value) and pd.isnull(value)):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def to_documents(df, source=None):
+    """Documents of a chunk: _id key, parsed dates and tag lists, no NaN fields"""
+    df = df.drop(columns=[c for c in DROPPED if c in df.columns])
+    if source is not None:
+        df = df.assign(source=source)
+    if 'published_at' in df:
+        dates = pd.to_datetime(df['published_at'], errors='coerce', format='mixed', utc=True)
+        df = df.assign(published_at=dates.dt.tz_localize(None))
+    if 'tags' in df:
+        df = df.assign(tags=parse_source_tags(df['tags'], df.get('source')))
+    ids = [record_id(url, title, content) for url, title, content in
+           zip(df.get('url', [None] * len(df)), df.get('title', [''] * len(df)), df.get('content', [''] * len(df)))]
+    documents = []
+    for rid, record in zip(ids, df.to_dict(orient='records')):
+        document = {key: _value(value) for key, value in record.items()}
+        document = {key: value for key, value in document.items() if value is not None}
+        document['_id'] = rid
+        documents.append(document)
+    return documents
+
+
+def upsert_batch(collection, documents):
+    """One unordered bulk_write of upserts; returns (upserted, modified, errors)"""
+    from pymongo import UpdateOne
+    from pymongo.errors import BulkWriteError
+
+    if not documents:
+        return 0, 0, 0
+    requests = [UpdateOne({'_id': doc['_id']}, {'$set': doc}, upsert=True) for doc in documents]
+    try:
+        result = collection.bulk_write(requests, ordered=False)
+        return result.upserted_count, result.modified_count, 0
+    except BulkWriteError as e:
+        # Unordered: every other request of the batch still went through
+        details = e.details
+        return details.get('nUpserted', 0), details.get('nModified', 0), len(details.get('writeErrors', []))
+
+
+def load_chunks(collection, chunks, source=None, batch_size=BATCH_SIZE):
+    """Upsert DataFrame chunks batch by batch, totals of the whole load"""
+    totals = {'documents': 0, 'upserted': 0, 'modified': 0, 'errors': 0}
+    for df in chunks:
+        for start in range(0, len(df), batch_size):
+            documents = to_documents(df.iloc[start:start + batch_size], source)
+            upserted, modified, errors = upsert_batch(collection, documents)
+            totals['documents'] += len(documents)
+            totals['upserted'] += upserted
+            totals['modified'] += modified
+            totals['errors'] += errors
+    return totals
+
+
+def load_csv(collection, path, source=None, batch_size=BATCH_SIZE):
+    ensure_indexes(collection)
+    return load_chunks(collection, pd.read_csv(path, chunksize=batch_size), source, batch_size)
+
+
+def iter_documents(collection, filter=None, projection=None, page_size=PAGE_SIZE):
+    """Every matching document, page by page: each page resumes after the last
+    _id seen instead of skipping, so late pages cost as much as the first"""
+    filter = dict(filter or {})
+    last = None
+    while True:
+        query = dict(filter, _id={'$gt': last}) if last is not None else filter
+        page = list(collection.find(query, projection).sort('_id', 1).limit(page_size))
+        yield from page
+        if len(page) < page_size:
+            return
+        last = page[-1]['_id']
+
+
+def read_frame(collection, filter=None, fields=None, page_size=PAGE_SIZE):
+    """DataFrame of the matching documents with only the given fields"""
+    projection = dict.fromkeys(fields, 1) if fields else None
+    return pd.DataFrame(list(iter_documents(collection, filter, projection, page_size)))
+
+
+def date_filter(start=None, end=None, **equal):
+    """Filter on a published_at range plus equality fields, e.g. source='France_24'"""
+    query = dict(equal)
+    bounds = {}
+    if start is not None:
+        bounds['$gte'] = pd.Timestamp(start).to_pydatetime()
+    if end is not None:
+        bounds['$lt'] = pd.Timestamp(end).to_pydatetime()
+    if bounds:
+        query['published_at'] = bounds
+    return query
+
+
+if __name__ == '__main__':
+    # python mongo_loader.py skynews_full_data.csv skynews [source]
+    args = sys.argv[1:]
+    if len(args) < 2:
+        sys.exit("usage: python mongo_loader.py file.csv collection [source]")
+    client = connect()
+    collection = client[DATABASE][args[1]]
+    started = datetime.datetime.now()
+    totals = load_csv(collection, args[0], args[2] if len(args) > 2 else None)
+    client.close()
+    print(f"✅ {totals['documents']} documents: {totals['upserted']} new, {totals['modified']} updated, "
+          f"{totals['errors']} errors in {(datetime.datetime.now() - started).total_seconds():.1f}s")
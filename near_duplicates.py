@@ -0,0 +1,281 @@
+import hashlib
+import os
+import sys
+import zlib
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+from tag_matcher import normalize_arabic
+
+# Near-duplicate detection across sources: MinHash signatures over word
+# shingles of the normalized Arabic text, LSH banding for candidate pairs
+# and union-find for the duplicate groups. Catches the rewritten wire stories
+# that exact drop_duplicates() lets through.
+ROOT = os.path.dirname(os.path.abspath(__file__))
+INDEX_PATH = os.path.join(ROOT, 'near_duplicates.npz')
+NUM_PERM = 128
+BANDS = 16  # 16 bands of 8 rows: pairs above ~0.7 Jaccard become candidates
+SHINGLE_WORDS = 3
+THRESHOLD = 0.8  # Estimated Jaccard similarity to count as a duplicate
+PRIME = np.uint64(4294967291)  # Largest prime below 2**32, a * x + b can't overflow
+EMPTY = np.iinfo(np.uint32).max
+UNKNOWN_DAY = np.iinfo(np.int64).max  # Unknown dates sort after every real one
+
+
+def shingles(text, size=SHINGLE_WORDS):
+    words = normalize_arabic(text or '').split()
+    if len(words) <= size:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def record_id(url, title, content=''):
+    """The URL when there is one, a content hash otherwise (Al Jazeera has no links)"""
+    if isinstance(url, str) and url and url != 'no_url':
+        return url
+    digest = hashlib.sha1(f"{title}\n{content}".encode('utf-8')).hexdigest()
+    return 'sha1:' + digest[:20]
+
+
+class MinHasher:
+    def __init__(self, num_perm=NUM_PERM, seed=1):
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.a = rng.randint(1, int(PRIME), num_perm, dtype=np.uint64)
+        self.b = rng.randint(0, int(PRIME), num_perm, dtype=np.uint64)
+
+    def signature(self, text):
+        hashes = np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles(text)), np.uint64)
+        if not len(hashes):
+            return np.full(self.num_perm, EMPTY, np.uint32)
+        permuted = (hashes[:, None] * self.a + self.b) % PRIME
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def signatures(self, texts):
+        return np.vstack([self.signature(text) for text in texts]) if len(texts) else \
+            np.empty((0, self.num_perm), np.uint32)
+
+
+def similarity(a, b):
+    """Jaccard similarity estimated from two signatures"""
+    if a[0] == EMPTY or b[0] == EMPTY:
+        return 0.0
+    return float(np.mean(a == b))
+
+
+class NearDuplicateIndex:
+    """LSH index over MinHash signatures, fed in batches or one record at a time.
+
+    Every record belongs to a group; the canonical record of a group is the
+    earliest published one, the longest text breaking ties.
+    """
+
+    def __init__(self, num_perm=NUM_PERM, bands=BANDS, threshold=THRESHOLD, seed=1):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.hasher = MinHasher(num_perm, seed)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.seed = seed
+        self.ids = []
+        self.positions = {}  # Record id -> row
+        self.published = []  # Days since epoch, for the canonical choice
+        self.lengths = []
+        self.parent = []
+        self._signatures = np.empty((0, num_perm), np.uint32)  # Grown by doubling, first len(ids) rows used
+        self.buckets = [defaultdict(list) for _ in range(bands)]
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def signatures(self):
+        return self._signatures[:len(self.ids)]
+
+    def _reserve(self, count):
+        capacity = len(self._signatures)
+        if count > capacity:
+            grown = np.empty((max(count, 2 * capacity), self.hasher.num_perm), np.uint32)
+            grown[:capacity] = self._signatures
+            self._signatures = grown
+
+    def __contains__(self, rid):
+        return rid in self.positions
+
+    # Union-find
+    def _find(self, i):
+        parent = self.parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def _before(self, i, j):
+        """True if record i is a better canonical than record j"""
+        return (self.published[i], -self.lengths[i], i) < (self.published[j], -self.lengths[j], j)
+
+    def _union(self, i, j):
+        i, j = self._find(i), self._find(j)
+        if i == j:
+            return
+        if self._before(j, i):
+            i, j = j, i
+        self.parent[j] = i  # The root is always the canonical record
+
+    def _band_keys(self, signature):
+        rows = self.rows
+        return [signature[band * rows:(band + 1) * rows].tobytes() for band in range(self.bands)]
+
+    def candidates(self, signature):
+        found = set()
+        for band, key in enumerate(self._band_keys(signature)):
+            found.update(self.buckets[band].get(key, ()))
+        return found
+
+    def add_many(self, ids, texts, published_at=None):
+        """Index a batch of records, returns the canonical id of each one"""
+        new, batch = [], set()
+        for i, rid in enumerate(ids):
+            if rid not in self.positions and rid not in batch:
+                new.append(i)
+                batch.add(rid)
+        signatures = self.hasher.signatures([texts[i] for i in new])
+        days = _days(published_at, len(ids))
+
+        start = len(self.ids)
+        self._reserve(start + len(new))
+        self._signatures[start:start + len(new)] = signatures
+        for offset, i in enumerate(new):
+            position = start + offset
+            self.ids.append(ids[i])
+            self.positions[ids[i]] = position
+            self.published.append(days[i])
+            self.lengths.append(len(texts[i] or ''))
+            self.parent.append(position)
+            self._link(position)
+        return [self.canonical(rid) for rid in ids]
+
+    def add(self, rid, text, published_at=None):
+        return self.add_many([rid], [text], None if published_at is None else [published_at])[0]
+
+    def _link(self, position):
+        signature = self.signatures[position]
+        if signature[0] != EMPTY:
+            for other in self.candidates(signature):
+                if similarity(signature, self.signatures[other]) >= self.threshold:
+                    self._union(position, other)
+        for band, key in enumerate(self._band_keys(signature)):
+            self.buckets[band][key].append(position)
+
+    def canonical(self, rid):
+        return self.ids[self._find(self.positions[rid])]
+
+    def groups(self, min_size=2):
+        """{canonical id: [member ids]} for groups with at least min_size records"""
+        members = defaultdict(list)
+        for position, rid in enumerate(self.ids):
+            members[self._find(position)].append(rid)
+        return {self.ids[root]: rids for root, rids in members.items() if len(rids) >= min_size}
+
+    def assignments(self):
+        """One row per record: its group's canonical id and the similarity to it"""
+        roots = [self._find(i) for i in range(len(self.ids))]
+        rows = self.signatures
+        similar = [1.0 if root == i else similarity(rows[i], rows[root])
+                   for i, root in enumerate(roots)]
+        return pd.DataFrame({
+            'id': self.ids,
+            'canonical_id': [self.ids[root] for root in roots],
+            'is_canonical': [root == i for i, root in enumerate(roots)],
+            'similarity': similar,
+        })
+
+    def save(self, path=INDEX_PATH):
+        tmp = path + '.tmp.npz'
+        np.savez_compressed(
+            tmp, ids=np.array(self.ids, dtype=object), signatures=self.signatures,
+            published=np.array(self.published, np.int64), lengths=np.array(self.lengths, np.int64),
+            parent=np.array(self.parent, np.int64),
+            params=np.array([self.hasher.num_perm, self.bands, self.seed]),
+            threshold=np.array(self.threshold))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=INDEX_PATH):
+        data = np.load(path, allow_pickle=True)
+        num_perm, bands, seed = (int(v) for v in data['params'])
+        index = cls(num_perm, bands, float(data['threshold']), seed)
+        index.ids = data['ids'].tolist()
+        index.positions = {rid: i for i, rid in enumerate(index.ids)}
+        index._signatures = data['signatures']
+        index.published = data['published'].tolist()
+        index.lengths = data['lengths'].tolist()
+        index.parent = data['parent'].tolist()
+        for position, signature in enumerate(index.signatures):
+            for band, key in enumerate(index._band_keys(signature)):
+                index.buckets[band][key].append(position)
+        return index
+
+    @classmethod
+    def open(cls, path=INDEX_PATH, **kwargs):
+        return cls.load(path) if os.path.exists(path) else cls(**kwargs)
+
+
+def _days(published_at, count):
+    """Days since epoch, unknown dates sort last"""
+    if published_at is None:
+        return [UNKNOWN_DAY] * count
+    dates = pd.to_datetime(pd.Series(list(published_at)), errors='coerce', format='mixed', utc=True)
+    days = (dates - pd.Timestamp(0, tz='UTC')).dt.days
+    # Not fillna: the int64 max doesn't survive the float column
+    return [UNKNOWN_DAY if pd.isna(day) else int(day) for day in days]
+
+
+def document_text(df):
+    return (df['title'].fillna('').astype(str) + '\n' + df['content'].fillna('').astype(str)).tolist()
+
+
+def index_chunks(chunks, index=None):
+    """Add DataFrame chunks with title / content / url / published_at to an index"""
+    if index is None:
+        index = NearDuplicateIndex()
+    for df in chunks:
+        ids = [record_id(url, title, content) for url, title, content in
+               zip(df['url'], df['title'], df['content'])]
+        index.add_many(ids, document_text(df), df['published_at'])
+    return index
+
+
+def find_duplicates(df, **kwargs):
+    """Batch pass over a DataFrame: adds duplicate_of (canonical id) and is_canonical"""
+    index = index_chunks([df], NearDuplicateIndex(**kwargs))
+    ids = [record_id(url, title, content) for url, title, content in
+           zip(df['url'], df['title'], df['content'])]
+    out = df.copy()
+    out['record_id'] = ids
+    out['duplicate_of'] = [index.canonical(rid) for rid in ids]
+    out['is_canonical'] = out['duplicate_of'] == out['record_id']
+    return out
+
+
+if __name__ == '__main__':
+    # python near_duplicates.py [full_data_fusionne.csv | corpus] [--incremental]
+    args = sys.argv[1:]
+    source = next((a for a in args if not a.startswith('--')), os.path.join(ROOT, 'full_data_fusionne.csv'))
+    if os.path.isdir(source):
+        from fusion_pipeline import iter_corpus
+        chunks = iter_corpus(corpus_dir=source)
+    else:
+        chunks = pd.read_csv(source, chunksize=20000)
+
+    index = NearDuplicateIndex.open() if '--incremental' in args else NearDuplicateIndex()
+    before = len(index)
+    index_chunks(chunks, index)
+    index.save()
+    groups = index.groups()
+    print(f"{len(index) - before} new records, {len(index)} indexed, "
+          f"{len(groups)} duplicate groups covering {sum(map(len, groups.values()))} records")
+    index.assignments().to_csv(os.path.join(ROOT, 'near_duplicates.csv'), index=False)
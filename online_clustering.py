@@ -0,0 +1,275 @@
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from embedding_store import text_key
+from near_duplicates import record_id
+
+# Incremental version of clusters_code.ipynb. Articles fall in 3-day windows
+# counted from a fixed anchor day, and are clustered inside their window on
+# [bert x 3, date x 2, one-hot tags x 4] with k = min(5, n). The date is
+# scaled with the minimum / span of the first run, kept in the state, so the
+# feature of an existing article never moves. A new article is assigned to
+# the nearest centroid of its window (O(k)); a window is refit only once it
+# drifted, i.e. grew by REFIT_GROWTH since its last fit (or is still below
+# k = 5), and refit labels are matched to the old ones so cluster numbers
+# stay put. Vectors come from the embedding store.
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STATE_PATH = os.path.join(ROOT, 'online_clusters.joblib')
+CLUSTERS_CSV = os.path.join(ROOT, 'data_clusters.csv')
+WINDOW_DAYS = 3
+MAX_K = 5
+BERT_WEIGHT = 3.0
+DATE_WEIGHT = 2.0
+TAGS_WEIGHT = 4.0
+MIN_SPAN = 365 * 86400  # Date scale floor (seconds) when the first run covers a few days
+REFIT_GROWTH = 0.5  # Share of articles added since its last fit that makes a window refit
+
+
+def full_text(df):
+    return (df['title'].fillna('').astype(str).str.strip() + ' ' +
+            df['content'].fillna('').astype(str).str.strip()).tolist()
+
+
+def tag_value(tags):
+    """The notebook one-hot encodes the raw tags string"""
+    if isinstance(tags, (list, tuple, np.ndarray)):
+        return ' '.join(map(str, tags))
+    return '' if pd.isnull(tags) else str(tags)
+
+
+def match_labels(old_centroids, new_centroids, width):
+    """new label -> old label pairing the closest centroids (Hungarian matching) on
+    the first width columns; clusters with no old counterpart get the next free numbers"""
+    from scipy.optimize import linear_sum_assignment
+
+    mapping = {}
+    if old_centroids is not None and len(old_centroids):
+        cost = ((new_centroids[:, None, :width] - old_centroids[None, :, :width]) ** 2).sum(-1)
+        for new, old in zip(*linear_sum_assignment(cost)):
+            mapping[int(new)] = int(old)
+    free = (label for label in range(len(new_centroids) + len(mapping)) if label not in mapping.values())
+    for new in range(len(new_centroids)):
+        if new not in mapping:
+            mapping[new] = next(free)
+    return mapping
+
+
+class Window:
+    """Members and centroids of one 3-day window"""
+
+    def __init__(self):
+        self.ids = []
+        self.keys = []  # Text hashes, the vectors live in the embedding store
+        self.timestamps = []
+        self.tags = []
+        self.labels = []
+        self.categories = []  # Tag values of the one-hot columns
+        self.centroids = None
+        self.dirty = False
+        self.fitted_size = 0  # Articles at the last fit
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class OnlineClusterer:
+    def __init__(self, store, max_k=MAX_K, window_days=WINDOW_DAYS, seed=42):
+        self.store = store
+        self.max_k = max_k
+        self.window_days = window_days
+        self.seed = seed
+        self.anchor = None  # Day the windows are counted from
+        self.ts_min = None  # Date scaling, frozen on the first update
+        self.ts_span = None
+        self.windows = {}
+        self.positions = {}  # Record id -> window
+
+    def _features(self, window, vectors, timestamps, tags):
+        date = (np.asarray(timestamps, np.float64) - self.ts_min) / self.ts_span
+        onehot = np.zeros((len(tags), len(window.categories)))
+        columns = {value: i for i, value in enumerate(window.categories)}
+        for row, value in enumerate(tags):
+            if value in columns:  # An unseen value is equally far from every centroid
+                onehot[row, columns[value]] = 1.0
+        return np.hstack([vectors * BERT_WEIGHT, date[:, None] * DATE_WEIGHT, onehot * TAGS_WEIGHT])
+
+    def _assign(self, window, vectors, timestamps, tags):
+        if window.centroids is None:
+            return np.zeros(len(vectors), np.int64)
+        features = self._features(window, vectors, timestamps, tags)
+        centroids = window.centroids
+        distances = (features ** 2).sum(axis=1)[:, None] - 2 * features @ centroids.T + (centroids ** 2).sum(axis=1)
+        return np.argmin(np.nan_to_num(distances, nan=np.inf), axis=1)  # NaN rows: unused labels
+
+    def _refit(self, window):
+        from sklearn.cluster import KMeans
+
+        window.categories = sorted(set(window.tags))
+        vectors = self.store.get(window.keys)
+        features = self._features(window, vectors, window.timestamps, window.tags)
+        k = min(self.max_k, len(window))
+        if len(window) < 2:
+            labels, centroids = np.zeros(len(window), np.int64), features.copy()
+        else:
+            kmeans = KMeans(n_clusters=k, random_state=self.seed, n_init=10).fit(features)
+            # The tag columns move when categories are added, match on bert + date
+            mapping = match_labels(window.centroids, kmeans.cluster_centers_, self.store.dim + 1)
+            labels = np.array([mapping[label] for label in kmeans.labels_])
+            centroids = np.full((max(mapping.values()) + 1, features.shape[1]), np.nan)
+            centroids[list(mapping.values())] = kmeans.cluster_centers_[list(mapping.keys())]
+        window.labels = labels.tolist()
+        window.centroids = centroids
+        window.dirty = False
+        window.fitted_size = len(window)
+
+    def drifted(self, window):
+        """True when nearest-centroid assignment no longer stands for a fit of the window"""
+        fitted = getattr(window, 'fitted_size', 0)
+        if window.centroids is None or (fitted < self.max_k and len(window) > fitted):
+            return True  # New window, or one whose k = min(5, n) grew
+        return len(window) - fitted >= REFIT_GROWTH * fitted
+
+    def update(self, df, engine, refit=False):
+        """Cluster new articles (title / content / url / published_at / tags).
+        New articles go to the nearest centroid; only drifted windows are
+        refit, every window that received articles with refit=True.
+        Returns record_id, group_3_days, cluster of every article whose label was set or changed."""
+        df = df.assign(published_at=pd.to_datetime(df['published_at'], errors='coerce', format='mixed', utc=True))
+        df = df[df['published_at'].notna()]
+        ids = [record_id(url, title, content) for url, title, content in zip(df['url'], df['title'], df['content'])]
+        keep, seen = [], set(self.positions)
+        for i, rid in enumerate(ids):
+            if rid not in seen:
+                keep.append(i)
+                seen.add(rid)
+        df = df.iloc[keep]
+        ids = [ids[i] for i in keep]
+        if not ids:
+            return pd.DataFrame(columns=['record_id', 'group_3_days', 'cluster'])
+
+        texts = full_text(df)
+        vectors, failed = self.store.embed(texts, engine)
+        timestamps = (df['published_at'].dt.tz_localize(None).astype('datetime64[s]').astype(np.int64)).to_numpy()
+        days = timestamps // 86400
+        if self.anchor is None:
+            self.anchor = int(days.min())
+            self.ts_min = float(timestamps.min())
+            self.ts_span = float(max(timestamps.max() - timestamps.min(), MIN_SPAN))
+        groups = (days - self.anchor) // self.window_days
+        tags = [tag_value(t) for t in (df['tags'] if 'tags' in df.columns else [''] * len(df))]
+
+        changed = {}
+        for group in np.unique(groups[~failed]):
+            rows = np.flatnonzero((groups == group) & ~failed)
+            window = self.windows.setdefault(int(group), Window())
+            labels = self._assign(window, vectors[rows], timestamps[rows], [tags[i] for i in rows])
+            for row, label in zip(rows, labels):
+                window.ids.append(ids[row])
+                window.keys.append(text_key(texts[row]))
+                window.timestamps.append(int(timestamps[row]))
+                window.tags.append(tags[row])
+                window.labels.append(int(label))
+                self.positions[ids[row]] = int(group)
+                changed[ids[row]] = (int(group), int(label))
+            window.dirty = True
+        changed.update(self.refit_dirty(only_drifted=not refit))
+        for row in np.flatnonzero(failed):
+            changed[ids[row]] = (int(groups[row]), -1)  # No vector, no cluster
+        return pd.DataFrame([(rid, group, label) for rid, (group, label) in changed.items()],
+                            columns=['record_id', 'group_3_days', 'cluster'])
+
+    def refit_dirty(self, only_drifted=False):
+        """Refit the windows that received articles (the drifted ones only, if asked);
+        {record id: (group, cluster)}"""
+        changed = {}
+        for group, window in self.windows.items():
+            if window.dirty and (not only_drifted or self.drifted(window)):
+                before = list(window.labels)
+                self._refit(window)
+                for rid, old, new in zip(window.ids, before, window.labels):
+                    if old != new:
+                        changed[rid] = (group, int(new))
+        return changed
+
+    def labels(self):
+        rows = [(rid, group, label) for group, window in sorted(self.windows.items())
+                for rid, label in zip(window.ids, window.labels)]
+        return pd.DataFrame(rows, columns=['record_id', 'group_3_days', 'cluster'])
+
+    def save(self, path=STATE_PATH):
+        import joblib
+        store, self.store = self.store, None
+        try:
+            joblib.dump(self, path + '.tmp')
+        finally:
+            self.store = store
+        os.replace(path + '.tmp', path)
+
+    @classmethod
+    def load(cls, store, path=STATE_PATH):
+        import joblib
+        clusterer = joblib.load(path)
+        clusterer.store = store
+        return clusterer
+
+    @classmethod
+    def open(cls, store, path=STATE_PATH, **kwargs):
+        return cls.load(store, path) if os.path.exists(path) else cls(store, **kwargs)
+
+
+def update_csv(new_df, assignments, path=CLUSTERS_CSV, chunksize=20000):
+    """Rewrite data_clusters.csv with the new cluster of existing rows and the new
+    rows appended, streamed chunk by chunk and swapped in atomically"""
+    assignments = assignments.drop_duplicates('record_id', keep='last').set_index('record_id')
+    tmp = path + '.tmp'
+    seen = set()
+    header = True
+    if os.path.exists(path):
+        for chunk in pd.read_csv(path, chunksize=chunksize):
+            rids = pd.Series([record_id(url, title, content) for url, title, content in
+                              zip(chunk['url'], chunk['title'], chunk['content'])], index=chunk.index)
+            seen.update(rids)
+            hit = rids.isin(assignments.index)
+            if hit.any():
+                found = assignments.loc[rids[hit]]
+                chunk.loc[hit, 'group_3_days'] = found['group_3_days'].to_numpy()
+                chunk.loc[hit, 'cluster'] = found['cluster'].to_numpy()
+            chunk.to_csv(tmp, mode='w' if header else 'a', header=header, index=False)
+            header = False
+
+    new_df = new_df.copy()
+    new_df['record_id'] = [record_id(url, title, content) for url, title, content in
+                           zip(new_df['url'], new_df['title'], new_df['content'])]
+    new_df = new_df[~new_df['record_id'].isin(seen) & new_df['record_id'].isin(assignments.index)]
+    found = assignments.loc[new_df['record_id']]
+    new_df['group_3_days'] = found['group_3_days'].to_numpy()
+    new_df['cluster'] = found['cluster'].to_numpy()
+    new_df = new_df.drop(columns='record_id')
+    if not header and len(new_df):
+        columns = pd.read_csv(tmp, nrows=0).columns
+        new_df = new_df.reindex(columns=columns)
+    new_df.to_csv(tmp, mode='w' if header else 'a', header=header, index=False)
+    os.replace(tmp, path)
+
+
+if __name__ == '__main__':
+    # python online_clustering.py new_articles.csv [model]
+    from embedding_engine import DEFAULT_MODEL, EmbeddingEngine
+    from embedding_store import EmbeddingStore
+
+    args = sys.argv[1:]
+    new_df = pd.read_csv(args[0] if args else os.path.join(ROOT, 'full_data_fusionne.csv'))
+    engine = EmbeddingEngine(args[1] if len(args) > 1 else DEFAULT_MODEL, 'mean')
+    with EmbeddingStore.for_engine(engine) as store:
+        clusterer = OnlineClusterer.open(store)
+        started = time.perf_counter()
+        assignments = clusterer.update(new_df, engine)
+        clusterer.save()
+    update_csv(new_df, assignments)
+    print(f"{len(assignments)} articles (re)labelled in "
+          f"{assignments['group_3_days'].nunique() if len(assignments) else 0} windows "
+          f"in {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,84 @@
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate  # Tokens per second
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return now
+
+    async def acquire(self):
+        while True:
+            now = self._refill()
+            if now < self.paused_until:
+                await asyncio.sleep(self.paused_until - now)
+                continue
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class AdaptiveRateLimiter:
+    """Per-host token buckets whose rate follows the server's answers.
+
+    While responses are fast and successful each one adds increase / rate,
+    so the rate grows by about `increase` per second (additively in time,
+    like TCP congestion avoidance), and it is cut multiplicatively on
+    429 / 5xx or when latency goes above target_latency (AIMD).
+    Retry-After pauses the host's bucket.
+    """
+
+    def __init__(self, rate=4.0, min_rate=0.5, max_rate=40.0, burst=4,
+                 target_latency=2.0, increase=0.5, decrease=0.5, cooldown=1.0):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.target_latency = target_latency
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown  # One cut per cooldown, not one per in-flight response
+        self.buckets = {}
+        self.last_cut = {}
+
+    def bucket(self, url):
+        host = urlsplit(url).netloc
+        if host not in self.buckets:
+            self.buckets[host] = TokenBucket(self.rate, self.burst)
+        return self.buckets[host]
+
+    async def wait(self, url):
+        await self.bucket(url).acquire()
+
+    def _cut(self, host, bucket, factor):
+        now = time.monotonic()
+        if now - self.last_cut.get(host, 0.0) < self.cooldown:
+            return
+        self.last_cut[host] = now
+        bucket.rate = max(self.min_rate, bucket.rate * factor)
+
+    def record(self, url, status, latency, retry_after=None):
+        host = urlsplit(url).netloc
+        bucket = self.bucket(url)
+        if status == 429 or status >= 500:
+            self._cut(host, bucket, self.decrease)
+            if retry_after:
+                bucket.paused_until = time.monotonic() + retry_after
+        elif latency > self.target_latency:
+            self._cut(host, bucket, (1 + self.decrease) / 2)
+        else:
+            bucket.rate = min(self.max_rate, bucket.rate + self.increase / bucket.rate)
+
+    def current_rate(self, url):
+        return self.bucket(url).rate
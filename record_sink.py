@@ -0,0 +1,263 @@
+import glob
+import json
+import os
+import time
+from datetime import date, datetime, timezone
+
+# Streaming output for the scrapers: records are written in batches to
+# rotating Parquet (or NDJSON) part files with one fixed schema, so memory
+# stays flat and a crash only loses the part file being written.
+BATCH_SIZE = 500  # Records buffered before a row group / write
+ROWS_PER_FILE = 500  # Records per part file before rotating, bounds what a crash loses
+MAX_FILE_SECONDS = 60  # Rotate at least this often on slow crawls
+
+FIELDS = ['source', 'title', 'content', 'description', 'url',
+          'image_url', 'author', 'published_at', 'tags']
+
+
+def schema():
+    import pyarrow as pa
+    return pa.schema([
+        ('source', pa.string()),
+        ('title', pa.string()),
+        ('content', pa.string()),
+        ('description', pa.string()),
+        ('url', pa.string()),
+        ('image_url', pa.string()),
+        ('author', pa.string()),
+        ('published_at', pa.timestamp('s')),  # UTC, naive like the cleaning notebooks
+        ('tags', pa.list_(pa.string())),
+    ])
+
+
+def parse_published_at(value):
+    """datetime in UTC without tzinfo, None when the value can't be read"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.strip())
+        except ValueError:
+            return None
+    elif isinstance(value, date) and not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day)
+    if not isinstance(value, datetime):
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.replace(microsecond=0)
+
+
+def normalize_record(record):
+    """A record restricted to FIELDS with typed values, tags always a list"""
+    row = {field: record.get(field) for field in FIELDS}
+    for field in FIELDS:
+        if field not in ('published_at', 'tags') and row[field] is not None:
+            row[field] = str(row[field])
+    row['published_at'] = parse_published_at(row['published_at'])
+    tags = row['tags']
+    if tags is None:
+        row['tags'] = []
+    elif isinstance(tags, str):
+        row['tags'] = [tags] if tags else []
+    else:
+        row['tags'] = [str(tag) for tag in tags if tag]
+    return row
+
+
+class RecordSink:
+    """Batched writer rotating over part files in a directory.
+
+    on_durable(keys) is called with the `key` field of every record once it
+    is safely on disk, which is where the scrapers mark URLs done in the
+    crawl frontier. Records of a part file that was never finished are
+    fetched again on the next run (cheaply, from the HTTP cache).
+    """
+    extension = None
+    atomic = True  # Written under .tmp and renamed when the part is finished
+
+    def __init__(self, directory, prefix='part', batch_size=BATCH_SIZE,
+                 rows_per_file=ROWS_PER_FILE, max_file_seconds=MAX_FILE_SECONDS,
+                 on_durable=None, key='url'):
+        self.directory = directory
+        self.prefix = prefix
+        self.batch_size = batch_size
+        self.rows_per_file = rows_per_file
+        self.max_file_seconds = max_file_seconds
+        self.on_durable = on_durable
+        self.key = key
+        self.batch = []
+        self.pending_keys = []  # Written to the open part file, not durable yet
+        self.rows_in_file = 0
+        self.started = None  # When the oldest record that isn't durable was written
+        self.path = None
+        self.parts = 0
+        self.written = 0
+        os.makedirs(directory, exist_ok=True)
+        # Part files left unfinished by a crashed run can't be read back
+        for path in glob.glob(os.path.join(directory, f'{prefix}-*{self.extension}.tmp')):
+            os.remove(path)
+
+    def _new_path(self):
+        self.parts += 1
+        name = f"{self.prefix}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{self.parts:04d}"
+        return os.path.join(self.directory, name + self.extension)
+
+    @property
+    def pending(self):
+        """True while some written records are not durable yet"""
+        return bool(self.batch or self.pending_keys)
+
+    def _expired(self):
+        return (self.started is not None and self.max_file_seconds is not None
+                and time.monotonic() - self.started >= self.max_file_seconds)
+
+    def write(self, record):
+        if self.started is None:
+            self.started = time.monotonic()
+        self.batch.append(normalize_record(record))
+        if len(self.batch) >= self.batch_size or self._expired():
+            self.flush()
+
+    def write_many(self, records):
+        for record in records:
+            self.write(record)
+
+    def tick(self):
+        """Make buffered records durable once MAX_FILE_SECONDS passed, even
+        without a new record; the scrapers call it at every checkpoint"""
+        if self._expired():
+            self.flush()
+            self._rotate()
+
+    def flush(self):
+        if not self.batch:
+            return
+        if self.path is None:
+            self.path = self._new_path()
+            self._open(self.path + '.tmp' if self.atomic else self.path)
+        batch, self.batch = self.batch, []
+        self._write_batch(batch)
+        self.pending_keys.extend(row[self.key] for row in batch)
+        self.rows_in_file += len(batch)
+        self.written += len(batch)
+        if self.rows_in_file >= self.rows_per_file or self._expired():
+            self._rotate()
+        elif not self.atomic:
+            self._done(self.pending_keys)
+
+    def _rotate(self):
+        if self.path is None:
+            return
+        self._close_file()
+        if self.atomic:
+            os.replace(self.path + '.tmp', self.path)
+        self.path = None
+        self.rows_in_file = 0
+        self._done(self.pending_keys)
+
+    def _done(self, keys):
+        self.pending_keys = []
+        self.started = None
+        if self.on_durable and keys:
+            self.on_durable(keys)
+
+    def close(self):
+        self.flush()
+        self._rotate()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # Format specific
+    def _open(self, path):
+        raise NotImplementedError
+
+    def _write_batch(self, rows):
+        raise NotImplementedError
+
+    def _close_file(self):
+        raise NotImplementedError
+
+
+class ParquetSink(RecordSink):
+    """One row group per batch, the footer is written when the part rotates"""
+    extension = '.parquet'
+
+    def __init__(self, *args, compression='zstd', **kwargs):
+        import pyarrow  # noqa: F401, fail before the first batch is buffered
+        self.compression = compression
+        self.writer = None
+        super().__init__(*args, **kwargs)
+
+    def _open(self, path):
+        import pyarrow.parquet as pq
+        self.writer = pq.ParquetWriter(path, schema(), compression=self.compression)
+
+    def _write_batch(self, rows):
+        import pyarrow as pa
+        self.writer.write_table(pa.Table.from_pylist(rows, schema=schema()))
+
+    def _close_file(self):
+        self.writer.close()
+        self.writer = None
+
+
+class NdjsonSink(RecordSink):
+    """One JSON object per line, durable as soon as the batch is flushed"""
+    extension = '.ndjson'
+    atomic = False
+
+    def __init__(self, *args, **kwargs):
+        self.file = None
+        super().__init__(*args, **kwargs)
+
+    def _open(self, path):
+        self.file = open(path, 'w', encoding='utf-8')
+
+    def _write_batch(self, rows):
+        for row in rows:
+            if row['published_at'] is not None:
+                row = dict(row, published_at=row['published_at'].isoformat())
+            self.file.write(json.dumps(row, ensure_ascii=False) + '\n')
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def _close_file(self):
+        self.file.close()
+        self.file = None
+
+
+SINKS = {'parquet': ParquetSink, 'ndjson': NdjsonSink}
+
+
+def open_sink(directory, format='parquet', **kwargs):
+    return SINKS[format](directory, **kwargs)
+
+
+def part_files(directory, prefix='part'):
+    return sorted(glob.glob(os.path.join(directory, f'{prefix}-*.parquet')) +
+                  glob.glob(os.path.join(directory, f'{prefix}-*.ndjson')))
+
+
+def read_records(directory, prefix='part', columns=None):
+    """Every finished part file of a sink as one typed DataFrame"""
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    tables = []
+    for path in part_files(directory, prefix):
+        if path.endswith('.parquet'):
+            tables.append(pq.read_table(path, columns=columns, schema=schema()))
+        else:
+            with open(path, encoding='utf-8') as f:
+                rows = [normalize_record(json.loads(line)) for line in f if line.strip()]
+            table = pa.Table.from_pylist(rows, schema=schema())
+            tables.append(table.select(columns) if columns else table)
+    if not tables:
+        return pd.DataFrame(columns=columns or FIELDS)
+    return pa.concat_tables(tables).to_pandas()
@@ -0,0 +1,636 @@
+import asyncio
+import csv
+import glob
+import gzip
+import hashlib
+import importlib.util
+import json
+import math
+import os
+import random
+import re
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import parse_qsl, unquote, urlencode, urlsplit
+
+# Offline benchmark of the scrapers. Listing pages, articles and API answers
+# are recorded once as fixtures (or synthesized), then served by a local mock
+# server with configurable latency, error rate and per-host rate limit. Each
+# scraper runs end to end in its own process, with a cold HTTP cache and
+# frontier in a temporary directory, while every http(s) request it makes is
+# routed to the mock server. Reported: articles/s, p50/p99 request latency
+# (time to response headers), CPU per article and peak RSS.
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SCRAPERS_DIR = os.path.join(ROOT, 'Extraction des donner')
+FIXTURES_DIR = os.path.join(ROOT, 'bench_fixtures')
+RESULTS_PATH = os.path.join(ROOT, 'bench_results.jsonl')
+MANIFEST = 'manifest.json'
+HEADERS = {'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 '
+                         '(KHTML, like Gecko) Chrome/124.0 Safari/537.36'}
+
+LATENCY = 0.05  # Median seconds added to every answer
+JITTER = 0.5  # Sigma of the lognormal latency, 0 for a constant one
+ERROR_RATE = 0.0  # Share of requests answered 503
+RATE_LIMIT = 0.0  # Requests per second per host before 429s, 0 for none
+BURST = 10
+RETRY_AFTER = 1  # Seconds, sent with every 429
+SEED = 0
+PAGE_BYTES = 80_000  # Synthetic pages are padded to about the size of real ones
+
+SITES = ['alhurra', 'skynews', 'france24', 'aljazeera']
+
+
+def fixture_key(url):
+    """host + path + sorted query, the same however the scraper encoded the URL"""
+    parts = urlsplit(url)
+    path = re.sub('/+', '/', unquote(parts.path)) or '/'
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return parts.netloc.lower() + path + (f'?{query}' if query else '')
+
+
+def route_key(url):
+    """The key of a fixture without its query, for fallbacks"""
+    return fixture_key(url).split('?', 1)[0]
+
+
+# Fixtures: one directory per site, gzipped bodies plus a manifest
+
+class FixtureSet:
+    def __init__(self, directory):
+        self.directory = directory
+        self.entries = {}  # Key -> {url, kind, status, content_type, file}
+        self.fallbacks = {}  # Key without query -> {status, content_type, body}
+        self.meta = {}
+        path = os.path.join(directory, MANIFEST)
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                manifest = json.load(f)
+            self.entries = manifest['entries']
+            self.fallbacks = manifest.get('fallbacks', {})
+            self.meta = manifest.get('meta', {})
+
+    def add(self, url, body, kind, status=200, content_type='text/html; charset=utf-8'):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        key = fixture_key(url)
+        name = hashlib.sha1(key.encode('utf-8')).hexdigest() + '.gz'
+        os.makedirs(self.directory, exist_ok=True)
+        with gzip.open(os.path.join(self.directory, name), 'wb') as f:
+            f.write(body)
+        self.entries[key] = {'url': url, 'kind': kind, 'status': status,
+                             'content_type': content_type, 'file': name}
+
+    def add_fallback(self, url, body, status=200, content_type='text/html; charset=utf-8'):
+        """Answer for any query of url's path not recorded, e.g. an empty page past the end"""
+        self.fallbacks[route_key(url)] = {'status': status, 'content_type': content_type, 'body': body}
+
+    def body(self, key):
+        with gzip.open(os.path.join(self.directory, self.entries[key]['file']), 'rb') as f:
+            return f.read()
+
+    def urls(self, kind):
+        return [entry['url'] for entry in self.entries.values() if entry['kind'] == kind]
+
+    def save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, MANIFEST)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({'entries': self.entries, 'fallbacks': self.fallbacks, 'meta': self.meta},
+                      f, ensure_ascii=False, indent=1)
+        os.replace(path + '.tmp', path)
+
+
+def load_scraper(site):
+    """The scraper module of a site, imported from its notebook folder"""
+    path = os.path.join(SCRAPERS_DIR, *SCRAPERS[site]['path'])
+    spec = importlib.util.spec_from_file_location(f'bench_{site}', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# Recording from the live sites
+
+def _get(session, url, **kwargs):
+    response = session.get(url, timeout=30, **kwargs)
+    response.raise_for_status()
+    return response
+
+
+def record_alhurra(fixtures, session, articles):
+    from html_parsing import alhurra_teasers
+
+    search = 'https://www.alhurra.com/search'
+    hrefs = []
+    page = 0
+    while len(hrefs) < articles:
+        params = {"search_api_fulltext": "", "type": "2", "sort_by": "publication_time",
+                  "changed": "All", "_wrapper_format": "html", "page": page}
+        response = _get(session, search, params=params)
+        teasers = alhurra_teasers(response.text)
+        if not teasers:
+            break
+        fixtures.add(response.url, response.content, 'listing')
+        hrefs.extend(t['href'] for t in teasers if t['href'])
+        page += 1
+    for href in hrefs[:articles]:
+        response = _get(session, f"https://www.alhurra.com{href}")
+        fixtures.add(response.url, response.content, 'article')
+    fixtures.add_fallback(search, '<html><body></body></html>')  # Listing past the recorded pages
+
+
+def record_skynews(fixtures, session, articles):
+    module = load_scraper('skynews')
+    offset = 0
+    while offset < articles:
+        url = module.URL_TEMPLATE.format(offset=offset)
+        response = _get(session, url)
+        if not response.json().get('contentItems'):
+            break
+        fixtures.add(url, response.content, 'api', content_type='application/json')
+        offset += module.PAGE_SIZE
+    fixtures.add_fallback(module.URL_TEMPLATE, '{"contentItems": []}', content_type='application/json')
+
+
+def record_france24(fixtures, session, articles, year='2025', days=3):
+    from html_parsing import france24_archive_days, france24_day_entries
+
+    module = load_scraper('france24')
+    url = module.ARCHIVE_URL.format(year=year)
+    response = _get(session, url)
+    # Only the recorded days stay listed, so a run fetches nothing else
+    day_links = france24_archive_days(response.text)[:days]
+    kept = ''.join(f'<a class="o-archive-month__days__day__link" href="{urlsplit(link).path}">{label}</a>'
+                   for link, label in day_links)
+    fixtures.add(url, f'<html><body>{kept}</body></html>', 'listing')
+    per_day = max(1, articles // max(1, len(day_links)))
+    for link, _ in day_links:
+        entries = [(title, article) for title, article in france24_day_entries(_get(session, link).text)
+                   if article != "No Link"][:per_day]
+        listed = ''.join(f'<li class="o-archive-day__list__entry"><a class="a-archive-link" '
+                         f'href="{urlsplit(article).path}"><h2>{title}</h2></a></li>' for title, article in entries)
+        fixtures.add(link, f'<html><body><ul>{listed}</ul></body></html>', 'listing')
+        for _, article in entries:
+            fixtures.add(article, _get(session, article).content, 'article')
+    fixtures.meta['years'] = [year]
+
+
+def record_aljazeera(fixtures, session, articles, links=None):
+    links = links or os.path.join(SCRAPERS_DIR, 'Al Jazera', 'article_links.csv')
+    with open(links, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        urls = [row[0] for row in reader if row][:articles]
+    for url in urls:
+        fixtures.add(url, _get(session, url).content, 'article')
+
+
+def record(sites=SITES, directory=FIXTURES_DIR, articles=200):
+    """Fetch about `articles` articles per site live and keep them as fixtures"""
+    import requests
+
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    for site in sites:
+        fixtures = FixtureSet(os.path.join(directory, site))
+        SCRAPERS[site]['record'](fixtures, session, articles)
+        fixtures.save()
+        print(f"📼 {site}: {len(fixtures.entries)} responses recorded")
+
+
+# Synthetic fixtures, for a benchmark without any recording
+
+WORDS = ['غزة', 'إسرائيل', 'حماس', 'الرئيس', 'الانتخابات', 'سوريا', 'كاليفورنيا', 'المفاوضات',
+         'الحكومة', 'البرلمان', 'الاقتصاد', 'المنطقة', 'الأمم', 'المتحدة', 'وزير', 'الخارجية']
+MONTHS = ['يناير', 'فبراير', 'مارس', 'أبريل', 'مايو', 'يونيو']
+
+
+def _sentence(rng, words=12):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)) + '.'
+
+
+def _page(body):
+    """body inside the navigation / script boilerplate of a real news page"""
+    menu = ''.join(f'<li class="menu__item"><a href="/section-{i}">قسم {i}</a></li>' for i in range(40))
+    head = f'<html><head><script>var config = {{"k": "{"x" * 2000}"}};</script></head><body><ul>{menu}</ul>'
+    padding = max(0, PAGE_BYTES - len(head) - len(body)) // 60
+    footer = ''.join(f'<div class="footer__link"><a href="/p/{i}">رابط {i}</a></div>' for i in range(padding))
+    return f'{head}{body}{footer}</body></html>'
+
+
+def _article_body(rng, paragraphs=8):
+    return ''.join(f'<p>{_sentence(rng, 30)}</p>' for _ in range(paragraphs))
+
+
+def synthesize(sites=SITES, directory=FIXTURES_DIR, articles=200, seed=SEED):
+    """Fixtures shaped like the real pages of each site, about `articles` articles per site"""
+    rng = random.Random(seed)
+    for site in sites:
+        fixtures = FixtureSet(os.path.join(directory, site))
+        fixtures.entries, fixtures.fallbacks = {}, {}
+        if site == 'alhurra':
+            per_page = 10
+            for page in range(math.ceil(articles / per_page)):
+                teasers = []
+                for i in range(page * per_page, min(articles, (page + 1) * per_page)):
+                    href = f'/world/2024/01/{i % 28 + 1:02d}/article-{i}'
+                    teasers.append(
+                        f'<div class="teaser teaser--dated"><img class="media__element" src="/img/{i}.jpg">'
+                        f'<h2 class="teaser__title"><a class="teaser__title-link" href="{href}">'
+                        f'{_sentence(rng, 8)}</a></h2><div class="teaser__date">{i % 28 + 1:02d} يناير 2024</div>'
+                        f'<div class="teaser__text">{_sentence(rng)}</div></div>')
+                    fixtures.add(f'https://www.alhurra.com{href}', _page(
+                        f'<div class="page-header__meta-item">بقلم: الحرة</div>'
+                        f'<div class="article__body">{_article_body(rng)}</div>'), 'article')
+                params = {"search_api_fulltext": "", "type": "2", "sort_by": "publication_time",
+                          "changed": "All", "_wrapper_format": "html", "page": page}
+                fixtures.add('https://www.alhurra.com/search?' + urlencode(params), _page(''.join(teasers)), 'listing')
+            fixtures.add_fallback('https://www.alhurra.com/search', '<html><body></body></html>')
+        elif site == 'skynews':
+            template = load_scraper('skynews').URL_TEMPLATE
+            for offset in range(0, articles, 12):
+                items = [{'headline': _sentence(rng, 8), 'summary': _sentence(rng),
+                          'shareUrl': f'https://www.skynewsarabia.com/world/{i}-article',
+                          'mediaAsset': {'imageUrl': f'https://images.skynewsarabia.com/{i}/{{width}}/{{height}}'},
+                          'date': f'2024-01-{i % 28 + 1:02d}T10:00:00Z', 'topicTitle': rng.choice(WORDS)}
+                         for i in range(offset, min(articles, offset + 12))]
+                fixtures.add(template.format(offset=offset), json.dumps({'contentItems': items}, ensure_ascii=False),
+                             'api', content_type='application/json')
+            fixtures.add_fallback(template, '{"contentItems": []}', content_type='application/json')
+        elif site == 'france24':
+            archive = 'https://www.france24.com/ar/%D8%A3%D8%B1%D8%B4%D9%8A%D9%81/2024/'
+            per_day = 20
+            days = math.ceil(articles / per_day)
+            links = ''.join(f'<a class="o-archive-month__days__day__link" href="/ar/أرشيف/2024/01-{d + 1:02d}">'
+                            f'{d + 1:02d} يناير 2024</a>' for d in range(days))
+            fixtures.add(archive, _page(links), 'listing')
+            for d in range(days):
+                entries = []
+                for i in range(d * per_day, min(articles, (d + 1) * per_day)):
+                    href = f'/ar/{i}-article'
+                    entries.append(f'<li class="o-archive-day__list__entry"><a class="a-archive-link" href="{href}">'
+                                   f'<h2>{_sentence(rng, 8)}</h2></a></li>')
+                    fixtures.add(f'https://www.france24.com{href}', _page(
+                        f'<p class="t-content__chapo">{_sentence(rng)}</p><time>2024-01-{d + 1:02d}</time>'
+                        f'{_article_body(rng)}<div class="a-tag-section">{rng.choice(WORDS)}</div>'), 'article')
+                fixtures.add(f'https://www.france24.com/ar/أرشيف/2024/01-{d + 1:02d}', _page(''.join(entries)),
+                             'listing')
+            fixtures.meta['years'] = ['2024']
+        elif site == 'aljazeera':
+            for i in range(articles):
+                fixtures.add(f'https://www.aljazeera.net/news/2024/1/{i % 28 + 1}/article-{i}', _page(
+                    f'<h1>{_sentence(rng, 8)}</h1>'
+                    f'<div class="wysiwyg wysiwyg--all-content">{_article_body(rng)}</div>'), 'article')
+        fixtures.save()
+        print(f"🧪 {site}: {len(fixtures.entries)} responses synthesized")
+
+
+# Mock server
+
+class MockServer:
+    """Serves fixtures at http://127.0.0.1:port/<host>/<path>?<query> from a background thread"""
+
+    def __init__(self, fixture_sets, latency=LATENCY, jitter=JITTER, error_rate=ERROR_RATE,
+                 rate_limit=RATE_LIMIT, burst=BURST, error_kinds=None, seed=SEED):
+        self.fixture_sets = fixture_sets
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.burst = burst
+        self.error_kinds = error_kinds  # e.g. {'article'}, None for every request
+        self.rng = random.Random(seed)
+        self.buckets = {}  # Host -> [tokens, updated]
+        self.statuses = {}
+        self.url = None
+        self._loop = None
+        self._thread = None
+
+    def _lookup(self, key):
+        for fixtures in self.fixture_sets:
+            if key in fixtures.entries:
+                entry = fixtures.entries[key]
+                return entry['status'], entry['content_type'], fixtures.body(key), entry['kind']
+        for fixtures in self.fixture_sets:
+            fallback = fixtures.fallbacks.get(key.split('?', 1)[0])
+            if fallback:
+                return fallback['status'], fallback['content_type'], fallback['body'].encode('utf-8'), 'fallback'
+        return 404, 'text/html', b'', None
+
+    def _limited(self, host):
+        if not self.rate_limit:
+            return False
+        now = time.monotonic()
+        tokens, updated = self.buckets.get(host, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate_limit)
+        limited = tokens < 1
+        self.buckets[host] = (tokens if limited else tokens - 1, now)
+        return limited
+
+    async def _handle(self, request):
+        from aiohttp import web
+
+        key = fixture_key('http:/' + request.raw_path)
+        status, content_type, body, kind = self._lookup(key)
+        delay = self.latency * (math.exp(self.rng.gauss(0, self.jitter)) if self.jitter else 1)
+        headers = {}
+        if self._limited(key.split('/', 1)[0]):
+            status, body, headers = 429, b'', {'Retry-After': str(RETRY_AFTER)}
+            delay = 0
+        elif self.rng.random() < self.error_rate and (self.error_kinds is None or kind in self.error_kinds):
+            status, body = 503, b''
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        await asyncio.sleep(delay)
+        return web.Response(status=status, body=body, headers=headers, content_type=content_type.split(';')[0],
+                            charset='utf-8' if 'charset' in content_type else None)
+
+    def start(self):
+        from aiohttp import web
+
+        ready = threading.Event()
+
+        async def serve():
+            app = web.Application()
+            app.router.add_route('GET', '/{tail:.*}', self._handle)
+            runner = web.AppRunner(app, access_log=None)
+            await runner.setup()
+            site = web.TCPSite(runner, '127.0.0.1', 0, backlog=1024)
+            await site.start()
+            self.url = 'http://127.0.0.1:%d' % runner.addresses[0][1]
+            ready.set()
+            self._stop = asyncio.Event()
+            await self._stop.wait()
+            await runner.cleanup()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(serve())
+            self._loop.close()
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self
+
+    def stop(self):
+        self._loop.call_soon_threadsafe(self._stop.set)
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+# Scraper side: every request goes to the mock server, with its latency logged
+
+@contextmanager
+def routed(server_url, log):
+    """Patch aiohttp and requests so any http(s) URL is served by server_url;
+    log gets (seconds to response headers, status) per request"""
+    import aiohttp
+    import requests
+
+    def route(url):
+        url = str(url)
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https') or url.startswith(server_url):
+            return url
+        return f"{server_url}/{parts.netloc}{parts.path}" + (f'?{parts.query}' if parts.query else '')
+
+    aiohttp_request = aiohttp.ClientSession._request
+    requests_request = requests.Session.request
+
+    async def _request(session, method, str_or_url, *args, **kwargs):
+        started = time.perf_counter()
+        response = await aiohttp_request(session, method, route(str_or_url), *args, **kwargs)
+        log.append((time.perf_counter() - started, response.status))
+        return response
+
+    def request(session, method, url, *args, **kwargs):
+        response = requests_request(session, method, route(url), *args, **kwargs)
+        log.append((response.elapsed.total_seconds(), response.status_code))
+        return response
+
+    aiohttp.ClientSession._request = _request
+    requests.Session.request = request
+    try:
+        yield
+    finally:
+        aiohttp.ClientSession._request = aiohttp_request
+        requests.Session.request = requests_request
+
+
+# Each run_* returns (articles, failed): articles are records with content,
+# failed are the ones written empty or given up on, so a run that drops
+# articles under errors can't look faster than a clean one
+
+def _failed_urls(source):
+    from crawl_frontier import FAILED, CrawlFrontier
+    frontier = CrawlFrontier(os.environ['CRAWL_FRONTIER_DB'])
+    try:
+        return frontier.count(source, FAILED)
+    finally:
+        frontier.close()
+
+
+def _csv_rows(paths, column):
+    rows = []
+    for path in paths:
+        with open(path, newline='', encoding='utf-8') as f:
+            rows.extend(row.get(column) or '' for row in csv.DictReader(f))
+    return rows
+
+
+def run_alhurra(module, fixtures, limit=None):
+    if limit:
+        module.MAX_ARTICLES = limit
+    asyncio.run(module.main())
+    from record_sink import read_records
+    content = read_records(module.OUTPUT_DIR)['content'].fillna('').str.strip()
+    return int((content != '').sum()), int((content == '').sum()) + _failed_urls(module.FRONTIER_SOURCE)
+
+
+def run_skynews(module, fixtures, limit=None):
+    module.START_OFFSET = 0  # Fixtures are recorded from the first offset
+    if limit:
+        # MAX_OFFSET is the last offset fetched: limit articles, rounded up to whole pages
+        module.MAX_OFFSET = (math.ceil(limit / module.PAGE_SIZE) - 1) * module.PAGE_SIZE
+    asyncio.run(module.main())
+    from record_sink import read_records
+    titles = read_records(module.OUTPUT_DIR)['title'].fillna('').str.strip()
+    # The API answers are the articles: failed ones are the items of offsets given up on
+    expected = sum(len(json.loads(fixtures.body(key)).get('contentItems') or [])
+                   for key, entry in fixtures.entries.items() if entry['kind'] == 'api'
+                   and int(dict(parse_qsl(urlsplit(entry['url']).query))['offset']) <= module.MAX_OFFSET)
+    articles = int((titles != '').sum())
+    return articles, max(0, expected - articles)
+
+
+def run_france24(module, fixtures, limit=None):
+    module.scrape_years(fixtures.meta.get('years', ['2025']))
+    data = glob.glob(os.path.join(module.DATA_DIR, '*.csv')) + glob.glob(os.path.join(module.DATA_DIR, '*.partial'))
+    articles = sum(bool(content.strip()) for content in _csv_rows(data, 'content'))
+    listed = sum(url != "No Link" for url in _csv_rows(glob.glob(os.path.join(module.ARTICLES_DIR, '*.csv')), 'url'))
+    return articles, max(0, listed - articles)
+
+
+def run_aljazeera(module, fixtures, limit=None):
+    urls = fixtures.urls('article')[:limit or None]
+    with open('article_links.csv', 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['link'])
+        writer.writerows([url] for url in urls)
+    asyncio.run(module.main())
+    contents = _csv_rows([module.FILENAME], 'Content')
+    articles = sum(bool(content.strip()) and content != "No Content Found" for content in contents)
+    return articles, len(contents) - articles + _failed_urls(module.FRONTIER_SOURCE)
+
+
+SCRAPERS = {
+    'alhurra': {'path': ('Al Hura', 'web_scraping_with_async.py'), 'record': record_alhurra, 'run': run_alhurra},
+    'skynews': {'path': ('Sky News', 'ws_with_loop.py'), 'record': record_skynews, 'run': run_skynews},
+    'france24': {'path': ('France24', 'france24_scraper.py'), 'record': record_france24, 'run': run_france24},
+    'aljazeera': {'path': ('Al Jazera', 'scrape_articles_aljazira.py'), 'record': record_aljazeera,
+                  'run': run_aljazeera},
+}
+
+
+def _scenario(site, fixtures_dir, server_url, workdir, limit, results):
+    """One scraper run in a fresh process: cold cache and frontier, output in workdir"""
+    os.environ['HTTP_CACHE_DIR'] = os.path.join(workdir, 'http_cache')
+    os.environ['CRAWL_FRONTIER_DB'] = os.path.join(workdir, 'frontier.sqlite')
+    sys.path.insert(0, ROOT)
+    os.chdir(workdir)
+    log = []
+    articles, failed, error = 0, 0, None
+    cpu = time.process_time()
+    started = time.perf_counter()
+    with open('scraper.log', 'w', encoding='utf-8') as out:
+        sys.stdout = sys.stderr = out
+        try:
+            module = load_scraper(site)
+            fixtures = FixtureSet(os.path.join(fixtures_dir, site))
+            cpu = time.process_time()
+            started = time.perf_counter()
+            with routed(server_url, log):
+                articles, failed = SCRAPERS[site]['run'](module, fixtures, limit)
+        except BaseException as e:  # Reported with the result, the harness goes on
+            error = repr(e)
+        finally:
+            sys.stdout, sys.stderr = sys.__stdout__, sys.__stderr__
+    seconds = time.perf_counter() - started
+    cpu = time.process_time() - cpu
+
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    workers = resource.getrusage(resource.RUSAGE_CHILDREN)  # Parser pool processes
+    results.put({'site': site, 'articles': articles, 'failed': failed, 'seconds': seconds, 'error': error,
+                 'latencies': [latency for latency, _ in log], 'statuses': [status for _, status in log],
+                 'cpu': cpu + workers.ru_utime + workers.ru_stime,
+                 'peak_rss_mb': max(own.ru_maxrss, workers.ru_maxrss) / 1024})  # KiB on Linux
+
+
+def _result(queue, process, site):
+    """The child's result, or an error result if it died without one"""
+    import queue as queues
+
+    while True:
+        try:
+            return queue.get(timeout=1)
+        except queues.Empty:
+            if process.is_alive():
+                continue
+        try:
+            return queue.get(timeout=1)  # Put just before exiting
+        except queues.Empty:
+            return {'site': site, 'articles': 0, 'failed': 0, 'seconds': 0.0, 'cpu': 0.0, 'peak_rss_mb': 0.0,
+                    'latencies': [], 'statuses': [],
+                    'error': f"benchmark process exited with code {process.exitcode} before reporting"}
+
+
+def summarize(raw, server_statuses=None):
+    latencies = sorted(raw.pop('latencies'))
+    statuses = raw.pop('statuses')
+
+    def percentile(q):
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000 if latencies else float('nan')
+
+    articles = raw['articles']
+    return dict(raw, requests=len(latencies), errors=sum(status >= 400 for status in statuses),
+                articles_per_s=articles / raw['seconds'] if raw['seconds'] else 0.0,
+                p50_ms=percentile(0.5), p99_ms=percentile(0.99),
+                cpu_ms_per_article=raw['cpu'] * 1000 / articles if articles else float('nan'),
+                server_statuses=server_statuses or {})
+
+
+def run(sites=SITES, fixtures_dir=FIXTURES_DIR, limit=None, keep=False, **server_options):
+    """Benchmark each site's scraper against the mock server, one result dict per site"""
+    import multiprocessing
+
+    context = multiprocessing.get_context('spawn')  # No state inherited from this process
+    results = []
+    for site in sites:
+        fixtures = FixtureSet(os.path.join(fixtures_dir, site))
+        if not fixtures.entries:
+            print(f"⚠️ {site}: no fixtures in {fixtures.directory}, run record or synthesize first")
+            continue
+        workdir = tempfile.mkdtemp(prefix=f'bench_{site}_')
+        with MockServer([fixtures], **server_options) as server:
+            queue = context.Queue()
+            process = context.Process(target=_scenario,
+                                      args=(site, fixtures_dir, server.url, workdir, limit, queue))
+            process.start()
+            raw = _result(queue, process, site)
+            process.join()
+            result = summarize(raw, dict(server.statuses))
+        result.update(server_options, workdir=workdir if keep else None, at=time.time())
+        if not keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+        results.append(result)
+    return results
+
+
+def report(results):
+    print(f"{'site':<10} {'articles':>8} {'failed':>6} {'s':>7} {'art/s':>7} {'requests':>8} {'errors':>6} "
+          f"{'p50 ms':>7} {'p99 ms':>7} {'cpu ms/art':>10} {'rss MB':>7}")
+    for r in results:
+        print(f"{r['site']:<10} {r['articles']:>8} {r['failed']:>6} {r['seconds']:>7.2f} {r['articles_per_s']:>7.1f} "
+              f"{r['requests']:>8} {r['errors']:>6} {r['p50_ms']:>7.1f} {r['p99_ms']:>7.1f} "
+              f"{r['cpu_ms_per_article']:>10.2f} {r['peak_rss_mb']:>7.0f}")
+        if r['error']:
+            print(f"  ❌ {r['site']} failed: {r['error']}")
+
+
+if __name__ == '__main__':
+    # python scraper_bench.py synthesize [sites] [--articles=200]
+    # python scraper_bench.py record [sites] [--articles=200]
+    # python scraper_bench.py run [sites] [--latency=0.05] [--jitter=0.5] [--errors=0.01]
+    #                             [--rate=20] [--error-kinds=article] [--limit=N] [--keep]
+    # --limit caps the articles of a run (Sky News rounds it up to whole API pages)
+    args = sys.argv[1:]
+    command = args[0] if args else 'run'
+    options = dict(a[2:].split('=', 1) if '=' in a else (a[2:], '1') for a in args if a.startswith('--'))
+    sites = [a for a in args[1:] if not a.startswith('--')] or SITES
+    articles = int(options.get('articles', 200))
+    if command == 'synthesize':
+        synthesize(sites, articles=articles)
+    elif command == 'record':
+        record(sites, articles=articles)
+    elif command == 'run':
+        results = run(sites, limit=int(options['limit']) if 'limit' in options else None, keep='keep' in options,
+                      latency=float(options.get('latency', LATENCY)), jitter=float(options.get('jitter', JITTER)),
+                      error_rate=float(options.get('errors', ERROR_RATE)),
+                      rate_limit=float(options.get('rate', RATE_LIMIT)),
+                      error_kinds=set(options['error-kinds'].split(',')) if 'error-kinds' in options else None)
+        report(results)
+        with open(RESULTS_PATH, 'a', encoding='utf-8') as f:
+            for result in results:
+                f.write(json.dumps(result, default=str) + '\n')
+    else:
+        sys.exit(f"unknown command {command}, use synthesize, record or run")
@@ -0,0 +1,194 @@
+import os
+import sys
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from fusion_pipeline import parse_source_tags
+
+# Story threading across 3-day windows. Cluster ids are minted per window
+# (group_3_days * 5 + cluster), so an ongoing story changes id every window.
+# Here each window's clusters are linked to the stories seen in the last few
+# windows, scored by centroid cosine plus tag overlap, and inherit their
+# story id; unmatched clusters start new stories. Only stories active within
+# LOOKBACK windows are candidates, so linking a window costs the same however
+# long the history is.
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STATE_PATH = os.path.join(ROOT, 'story_threads.joblib')
+LOOKBACK = 3  # A story can be continued up to this many windows after its last cluster
+TAG_WEIGHT = 0.3  # Share of the tag Jaccard in the link score, the rest is cosine
+THRESHOLD = 0.5  # Link score needed to continue a story
+CLUSTERS_PER_WINDOW = 5  # The notebooks' clusters = group_3_days * 5 + cluster
+TAG_SEPARATOR = ', '  # Between top_tags, tags can hold spaces
+
+
+def summarize_clusters(vectors, groups, clusters, tags, published_at=None, sources=None):
+    """One row per (group, cluster): size, mean vector, tag counts and dates.
+    Rows with a negative cluster or NaN vector are left out."""
+    vectors = np.asarray(vectors, np.float32)
+    frame = pd.DataFrame({'group': np.asarray(groups), 'cluster': np.asarray(clusters),
+                          'tags': list(parse_source_tags(pd.Series(list(tags)),
+                                                         None if sources is None else list(sources)))})
+    frame['published_at'] = pd.to_datetime(pd.Series(list(published_at)), errors='coerce', format='mixed',
+                                           utc=True).dt.tz_localize(None) if published_at is not None else pd.NaT
+    valid = (frame['cluster'] >= 0).to_numpy() & np.isfinite(vectors).all(axis=1)
+    rows = []
+    for (group, cluster), members in frame[valid].groupby(['group', 'cluster']).groups.items():
+        members = np.asarray(members)
+        dates = frame.loc[members, 'published_at']
+        rows.append({'group': int(group), 'cluster': int(cluster), 'size': len(members),
+                     'centroid': vectors[members].mean(axis=0),
+                     'tags': Counter(tag for row in frame.loc[members, 'tags'] for tag in row),
+                     'start': dates.min(), 'end': dates.max()})
+    return rows
+
+
+def jaccard(a, b):
+    union = len(a.keys() | b.keys())
+    return len(a.keys() & b.keys()) / union if union else 0.0
+
+
+class Story:
+    def __init__(self, story_id):
+        self.story_id = story_id
+        self.parts = []  # Summaries of its clusters within LOOKBACK windows, newest last
+
+    @property
+    def last_group(self):
+        return self.parts[-1]['group']
+
+    def recent(self, lookback):
+        return [part for part in self.parts if part['group'] > self.last_group - lookback]
+
+    def centroid(self, lookback):
+        parts = self.recent(lookback)
+        return np.average([part['centroid'] for part in parts], axis=0, weights=[part['size'] for part in parts])
+
+    def tags(self, lookback):
+        return sum((part['tags'] for part in self.recent(lookback)), Counter())
+
+
+class StoryThreader:
+    def __init__(self, lookback=LOOKBACK, threshold=THRESHOLD, tag_weight=TAG_WEIGHT):
+        self.lookback = lookback
+        self.threshold = threshold
+        self.tag_weight = tag_weight
+        self.next_id = 0
+        self.active = {}  # Story id -> Story, the only link candidates
+        self.rows = []  # Timeline: one row per linked cluster
+        self.threaded = set()  # Groups already linked
+        # Mean BERT vectors are all alike (anisotropy): cosines are taken
+        # after removing the running mean of every centroid seen
+        self.mean = None
+        self.mean_weight = 0
+
+    def _center(self, vectors):
+        vectors = np.atleast_2d(vectors) - (self.mean if self.mean is not None else 0)
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+    def _update_mean(self, summaries):
+        for part in summaries:
+            total = self.mean_weight + part['size']
+            self.mean = part['centroid'] if self.mean is None else \
+                self.mean + (part['centroid'] - self.mean) * (part['size'] / total)
+            self.mean_weight = total
+
+    def add_window(self, group, summaries):
+        """Link the clusters of a window to open stories, {cluster: story id}.
+        Windows must come in order; a window already linked is left as it was."""
+        if group in self.threaded:
+            return {row['cluster']: row['story_id'] for row in self.rows if row['group'] == group}
+        # Stories quiet for more than LOOKBACK windows are closed for good
+        for story_id in [s for s, story in self.active.items() if story.last_group < group - self.lookback]:
+            del self.active[story_id]
+        self._update_mean(summaries)
+
+        links = {}
+        stories = list(self.active.values())
+        if stories and summaries:
+            story_vectors = self._center(np.vstack([story.centroid(self.lookback) for story in stories]))
+            story_tags = [story.tags(self.lookback) for story in stories]
+            cosine = self._center(np.vstack([part['centroid'] for part in summaries])) @ story_vectors.T
+            for i, part in enumerate(summaries):
+                scores = [(1 - self.tag_weight) * cosine[i, j] + self.tag_weight * jaccard(part['tags'], story_tags[j])
+                          for j in range(len(stories))]
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    links[i] = (stories[best], float(scores[best]))
+
+        assigned = {}
+        for i, part in enumerate(summaries):
+            story, score = links.get(i, (None, None))
+            if story is None:
+                story = Story(self.next_id)
+                self.next_id += 1
+                self.active[story.story_id] = story
+            story.parts.append(part)
+            story.parts = story.recent(self.lookback)  # Older parts only live in the timeline
+            assigned[part['cluster']] = story.story_id
+            self.rows.append({'story_id': story.story_id, 'group': group, 'cluster': part['cluster'],
+                              'clusters': group * CLUSTERS_PER_WINDOW + part['cluster'],
+                              'size': part['size'], 'start': part['start'], 'end': part['end'],
+                              'link_score': score,
+                              'top_tags': TAG_SEPARATOR.join(tag for tag, _ in part['tags'].most_common(5))})
+        self.threaded.add(group)
+        return assigned
+
+    def thread(self, summaries):
+        """Link every window of summarize_clusters() rows, oldest first"""
+        by_group = {}
+        for part in summaries:
+            by_group.setdefault(part['group'], []).append(part)
+        for group in sorted(by_group):
+            self.add_window(group, by_group[group])
+        return self.assignments()
+
+    def assignments(self):
+        """(group, cluster, clusters) -> story id"""
+        return pd.DataFrame(self.rows, columns=['story_id', 'group', 'cluster', 'clusters', 'size', 'start', 'end',
+                                                'link_score', 'top_tags'])
+
+    def timelines(self, min_windows=1):
+        """One row per story: span, windows, articles and tags over its life"""
+        frame = self.assignments()
+        if frame.empty:
+            return frame
+        stories = frame.groupby('story_id').agg(
+            first_group=('group', 'min'), last_group=('group', 'max'), windows=('group', 'nunique'),
+            clusters=('clusters', lambda c: ' '.join(map(str, c))), articles=('size', 'sum'),
+            start=('start', 'min'), end=('end', 'max'),
+            top_tags=('top_tags', lambda t: TAG_SEPARATOR.join(
+                Counter(tag for tags in t if tags for tag in tags.split(TAG_SEPARATOR)).keys())))
+        return stories[stories['windows'] >= min_windows].reset_index()
+
+    def save(self, path=STATE_PATH):
+        import joblib
+        joblib.dump(self, path + '.tmp')
+        os.replace(path + '.tmp', path)
+
+    @classmethod
+    def open(cls, path=STATE_PATH, **kwargs):
+        import joblib
+        return joblib.load(path) if os.path.exists(path) else cls(**kwargs)
+
+
+if __name__ == '__main__':
+    # python story_threading.py data_clusters.csv [model]
+    from embedding_engine import DEFAULT_MODEL, EmbeddingEngine
+    from embedding_store import EmbeddingStore
+    from online_clustering import full_text
+
+    args = sys.argv[1:]
+    df = pd.read_csv(args[0] if args else os.path.join(ROOT, 'data_clusters.csv'))
+    engine = EmbeddingEngine(args[1] if len(args) > 1 else DEFAULT_MODEL, 'mean')
+    with EmbeddingStore.for_engine(engine) as store:
+        vectors, _ = store.embed(full_text(df), engine)  # Only the articles not stored yet
+    threader = StoryThreader.open()
+    threader.thread(summarize_clusters(vectors, df['group_3_days'], df['cluster'], df['tags'], df['published_at'],
+                                       df.get('source')))
+    threader.save()
+    threader.assignments().to_csv(os.path.join(ROOT, 'story_assignments.csv'), index=False)
+    timelines = threader.timelines()
+    timelines.to_csv(os.path.join(ROOT, 'story_timelines.csv'), index=False)
+    print(f"{len(timelines)} stories, {(timelines['windows'] > 1).sum()} spanning several windows")
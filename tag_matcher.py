@@ -0,0 +1,120 @@
+import re
+from collections import deque
+
+# Same letter rules as clean_arabic_text in BERT.ipynb: drop diacritics,
+# unify alef forms, ta marbuta -> ha, ya -> alef maqsura. Characters that
+# are neither Arabic nor whitespace become a space instead of being deleted,
+# so punctuation can't glue two words into a false match.
+DIACRITICS = ''.join(chr(c) for c in range(0x064B, 0x0653))
+LETTERS = {'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ة': 'ه', 'ي': 'ى'}
+
+# Tags of the Al Hurra scrapers, which store the matching ones space separated
+TAGS = [
+    "حماس", "إسرائيل", "اسرائيل", "الفلسطينيين", "نتنياهو", "غزة", "أسرى",
+    "الاحتلال", "فلسطينية", "الإسرائيلي", "استشهاد", "الجيش الإسرائيلي",
+    "المقاومة", "المقاومة الإسلامية", "سرايا القدس", "القسام", "طوفان الأقصى",
+    "الفلسطينية", "الإسرائيلية", "أبو عبيدة", "عبيدة", "مقاطعة", "المقاطعة",
+    "سوريا", "بشار", "الأسد", "السوريين", "السورية",
+    "دونالد", "ترامب", "أميركا", "الرئاسة الأميركية", "انتخابات", "الأميركية",
+    "الانتخابات", "الولايات المتحدة", "ولاية ثانية", "الانتخابات الأميركية",
+    "الأميركي", "الانتخابية", "الرئاسية", "التصويت", "المرشح", "الولاية", "الرئيس",
+    "حرائق", "كاليفورنيا", "الغابات", "نيران", "اندلاع حرائق", "الحرائق",
+    "لوس أنجلوس", "لوس", "أنجلوس", "للحرائق", "الخسائر", "للحرق", "الرياح القوية"
+]
+
+_TABLE = str.maketrans({**{c: None for c in DIACRITICS}, **LETTERS})
+_NON_ARABIC = re.compile(r'[^\u0600-\u06FF\s]')
+
+
+def normalize_arabic(text):
+    return _NON_ARABIC.sub(' ', text.lower().translate(_TABLE))
+
+
+def _normalize_with_offsets(text):
+    """Normalized text plus the index in `text` of every normalized character"""
+    chars, offsets = [], []
+    for i, ch in enumerate(text.lower()):
+        if ch in DIACRITICS:
+            continue
+        ch = LETTERS.get(ch, ch)
+        if not ('\u0600' <= ch <= '\u06ff' or ch.isspace()):
+            ch = ' '
+        chars.append(ch)
+        offsets.append(i)
+    return ''.join(chars), offsets
+
+
+class TagMatcher:
+    """Aho-Corasick automaton over the normalized tags, built once.
+
+    Matching is substring based like the original
+    `tag.lower() in title.lower()` test, so one pass over a title or a
+    whole article body finds every tag, and spelling variants such as
+    إسرائيل / اسرائيل match each other. Variants are reported once, as
+    the first of them in the tag list.
+    """
+
+    def __init__(self, tags):
+        self.tags_list = list(tags)
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]  # Tag indexes ending at each state
+
+        patterns = set()
+        for index, tag in enumerate(self.tags_list):
+            pattern = normalize_arabic(tag)
+            if not pattern.strip() or pattern in patterns:
+                continue
+            patterns.add(pattern)
+            state = 0
+            for ch in pattern:
+                if ch not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                    self.goto[state][ch] = len(self.goto) - 1
+                state = self.goto[state][ch]
+            self.output[state].append(index)
+
+        # Breadth-first failure links
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and ch not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(ch, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+        self.lengths = [len(normalize_arabic(tag)) for tag in self.tags_list]
+
+    def _scan(self, normalized):
+        goto, fail, output = self.goto, self.fail, self.output
+        state = 0
+        for end, ch in enumerate(normalized):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for index in output[state]:
+                yield index, end + 1
+
+    def find(self, text):
+        """(tag, start, end) of every match, positions in the original text"""
+        normalized, offsets = _normalize_with_offsets(text)
+        matches = []
+        for index, end in self._scan(normalized):
+            start = end - self.lengths[index]
+            matches.append((self.tags_list[index], offsets[start], offsets[end - 1] + 1))
+        return matches
+
+    def tags(self, text):
+        """Distinct matching tags, in the order of the tag list"""
+        found = {index for index, _ in self._scan(normalize_arabic(text))}
+        return [tag for index, tag in enumerate(self.tags_list) if index in found]
+
+    def matches(self, text):
+        for _ in self._scan(normalize_arabic(text)):
+            return True
+        return False
@@ -0,0 +1,148 @@
+import os
+import sqlite3
+import sys
+
+import pandas as pd
+
+from fusion_pipeline import parse_source_tags
+from near_duplicates import record_id
+
+# Materialized tag statistics for STATISTIC_TAGS.ipynb / tags_stats.ipynb.
+# Counters per (tag, source, day) live in SQLite, with tag strings split into
+# their tags, and every article is counted once (its record id is kept), so
+# feeding the same rows again changes nothing. Top-N and time-range queries
+# are sums over the counters, never a rescan of the corpus.
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STATS_PATH = os.path.join(ROOT, 'tag_stats.sqlite')
+UNKNOWN_DAY = ''  # Articles without a readable date, outside every range
+
+
+class TagStats:
+    def __init__(self, path=STATS_PATH):
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS tag_counts ("
+            " tag TEXT, source TEXT, day TEXT, n INTEGER, PRIMARY KEY (tag, source, day))")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS article_counts ("
+            " source TEXT, day TEXT, n INTEGER, tagged INTEGER, PRIMARY KEY (source, day))")
+        self.db.execute("CREATE TABLE IF NOT EXISTS counted (id TEXT PRIMARY KEY)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS tag_counts_day ON tag_counts (day)")
+        self.db.commit()
+
+    def add(self, df):
+        """Count the articles of a chunk (url / title / content / source / published_at / tags)
+        not counted before; returns how many were new"""
+        ids = [record_id(url, title, content) for url, title, content in zip(df['url'], df['title'], df['content'])]
+        frame = pd.DataFrame({
+            'id': ids,
+            'source': df['source'].fillna('').astype(str).to_numpy(),
+            'day': pd.to_datetime(df['published_at'], errors='coerce', format='mixed', utc=True)
+                     .dt.strftime('%Y-%m-%d').fillna(UNKNOWN_DAY).to_numpy(),
+            'tags': parse_source_tags(df['tags'].reset_index(drop=True), df['source'])
+                      .map(lambda t: sorted(set(t))).to_numpy(),
+        }).drop_duplicates('id')
+
+        with self.db:  # One transaction: the counters and the ids move together
+            known = set()
+            for start in range(0, len(frame), 500):
+                chunk = frame['id'].iloc[start:start + 500].tolist()
+                known.update(row[0] for row in self.db.execute(
+                    f"SELECT id FROM counted WHERE id IN ({','.join('?' * len(chunk))})", chunk))
+            frame = frame[~frame['id'].isin(known)]
+            if frame.empty:
+                return 0
+            self.db.executemany("INSERT INTO counted VALUES (?)", [(i,) for i in frame['id']])
+
+            frame = frame.assign(tagged=frame['tags'].map(bool).astype(int))
+            articles = frame.groupby(['source', 'day']).agg(n=('id', 'size'), tagged=('tagged', 'sum')).reset_index()
+            self.db.executemany(
+                "INSERT INTO article_counts VALUES (?, ?, ?, ?) ON CONFLICT (source, day) DO UPDATE SET"
+                " n = n + excluded.n, tagged = tagged + excluded.tagged",
+                articles[['source', 'day', 'n', 'tagged']].itertuples(index=False, name=None))
+
+            tags = frame[['source', 'day', 'tags']].explode('tags').dropna(subset=['tags'])
+            counts = tags.groupby(['tags', 'source', 'day']).size().reset_index(name='n')
+            self.db.executemany(
+                "INSERT INTO tag_counts VALUES (?, ?, ?, ?) ON CONFLICT (tag, source, day) DO UPDATE SET"
+                " n = n + excluded.n",
+                ((tag, source, day, int(n)) for tag, source, day, n in counts.itertuples(index=False, name=None)))
+        return len(frame)
+
+    def _where(self, start=None, end=None, sources=None, tags=None):
+        clauses, params = [], []
+        if start is not None or end is not None:
+            clauses.append("day != ?")
+            params.append(UNKNOWN_DAY)
+        if start is not None:
+            clauses.append("day >= ?")
+            params.append(pd.Timestamp(start).strftime('%Y-%m-%d'))
+        if end is not None:
+            clauses.append("day <= ?")
+            params.append(pd.Timestamp(end).strftime('%Y-%m-%d'))
+        for column, values in (('source', sources), ('tag', tags)):
+            if values is not None:
+                values = [values] if isinstance(values, str) else list(values)
+                clauses.append(f"{column} IN ({','.join('?' * len(values))})")
+                params.extend(values)
+        return (' WHERE ' + ' AND '.join(clauses) if clauses else ''), params
+
+    def top_tags(self, n=20, start=None, end=None, sources=None):
+        """The n most used tags over a date range (inclusive days), the notebook's value_counts()"""
+        where, params = self._where(start, end, sources)
+        return pd.read_sql_query(
+            f"SELECT tag, SUM(n) AS count FROM tag_counts{where} GROUP BY tag ORDER BY count DESC, tag LIMIT ?",
+            self.db, params=params + [n])
+
+    def counts(self, by=('tag',), start=None, end=None, sources=None, tags=None):
+        """Tag occurrences summed by any of tag / source / day"""
+        by = [by] if isinstance(by, str) else list(by)
+        if not set(by) <= {'tag', 'source', 'day'}:
+            raise ValueError(f"Can only group by tag, source and day, not {by}")
+        where, params = self._where(start, end, sources, tags)
+        columns = ', '.join(by)
+        return pd.read_sql_query(
+            f"SELECT {columns}, SUM(n) AS count FROM tag_counts{where} GROUP BY {columns} ORDER BY {columns}",
+            self.db, params=params)
+
+    def daily(self, tag, start=None, end=None, sources=None):
+        """Articles per day carrying a tag"""
+        return self.counts('day', start, end, sources, tags=[tag])
+
+    def articles(self, by=('source',), start=None, end=None, sources=None):
+        """Articles (and those with at least one tag) by source and / or day"""
+        by = [by] if isinstance(by, str) else list(by)
+        if not set(by) <= {'source', 'day'}:
+            raise ValueError(f"Can only group by source and day, not {by}")
+        where, params = self._where(start, end, sources)
+        columns = ', '.join(by)
+        return pd.read_sql_query(
+            f"SELECT {columns}, SUM(n) AS articles, SUM(tagged) AS tagged FROM article_counts{where}"
+            f" GROUP BY {columns} ORDER BY {columns}", self.db, params=params)
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+if __name__ == '__main__':
+    # python tag_stats.py [full_data_fusionne.csv | corpus] [top_n]
+    args = sys.argv[1:]
+    source = args[0] if args else os.path.join(ROOT, 'full_data_fusionne.csv')
+    top_n = int(args[1]) if len(args) > 1 else 20
+    if os.path.isdir(source):
+        from fusion_pipeline import iter_corpus
+        chunks = iter_corpus(corpus_dir=source)
+    else:
+        chunks = pd.read_csv(source, chunksize=20000)
+    with TagStats() as stats:
+        added = sum(stats.add(chunk) for chunk in chunks)
+        print(f"{added} new articles counted")
+        for row in stats.top_tags(top_n).itertuples():
+            print(f"{row.tag} : {row.count}")
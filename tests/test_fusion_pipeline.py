@@ -0,0 +1,32 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fusion_pipeline import normalize_france24, parse_source_tags, parse_tags
+
+
+def test_france24_tags_stay_whole():
+    raw = pd.DataFrame({
+        'title': ['أ', 'ب', 'ج'],
+        'url': ['https://example.com/a', 'https://example.com/b', 'https://example.com/c'],
+        'published_at': ['02/01/2024 - 10:00'] * 3,
+        'description': ['نص'] * 3,
+        'tags': ['الشرق  الأوسط', 'No Tags', None],
+    })
+    tags = normalize_france24(raw)['tags'].tolist()
+    assert tags == [['الشرق الأوسط'], [], []]
+
+
+def test_list_reprs_with_quotes():
+    tags = parse_tags(pd.Series(['["it\'s", \'b\']', "['غزة', 'حماس']", "['broken"]))
+    assert tags.tolist() == [["it's", 'b'], ['غزة', 'حماس'], []]
+
+
+def test_raw_chunks_keep_france24_labels_whole():
+    tags = pd.Series(['الشرق الأوسط', 'No Tags', 'غزة حماس'], index=[5, 6, 7])
+    parsed = parse_source_tags(tags, ['France 24', 'France 24', 'alhurra'])
+    assert parsed.tolist() == [['الشرق الأوسط'], [], ['غزة', 'حماس']]
+    assert parsed.index.tolist() == [5, 6, 7]
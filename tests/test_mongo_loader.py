@@ -0,0 +1,43 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from mongo_loader import load_chunks, to_documents
+
+ROWS = pd.DataFrame({
+    'url': ['https://example.com/a', 'https://example.com/b', None],
+    'title': ['غزة', 'سوريا', 'بلا رابط'],
+    'content': ['نص أول', 'نص ثان', 'نص ثالث'],
+    'published_at': ['2024-01-02', 'garbage', None],
+    'tags': ["['غزة']", 'سوريا', None],
+})
+
+
+def test_unparseable_dates_are_dropped():
+    bson = pytest.importorskip('bson')
+    documents = to_documents(ROWS)
+    assert 'published_at' in documents[0]
+    assert 'published_at' not in documents[1] and 'published_at' not in documents[2]
+    for document in documents:
+        bson.encode(document)  # NaT used to crash here
+
+
+def _mongomock_collection():
+    mongomock = pytest.importorskip('mongomock')
+    import pymongo
+    if tuple(int(p) for p in pymongo.version.split('.')[:2]) >= (4, 9):
+        pytest.skip("mongomock's bulk_write needs pymongo < 4.9")
+    return mongomock.MongoClient()['projectSD']['articles']
+
+
+def test_reloading_a_batch_changes_nothing():
+    collection = _mongomock_collection()
+    first = load_chunks(collection, [ROWS])
+    assert first['upserted'] == 3 and first['errors'] == 0
+    again = load_chunks(collection, [ROWS])
+    assert again['upserted'] == 0 and again['modified'] == 0 and again['errors'] == 0
+    assert collection.count_documents({}) == 3
@@ -0,0 +1,14 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tag_matcher import TAGS, TagMatcher
+
+
+def test_spelling_variants_are_one_tag():
+    matcher = TagMatcher(TAGS)
+    text = 'قصف إسرائيل على غزة'
+    assert matcher.tags(text) == ['إسرائيل', 'غزة']
+    assert matcher.tags('اسرائيل') == ['إسرائيل']
+    assert [tag for tag, _, _ in matcher.find(text)] == ['إسرائيل', 'غزة']
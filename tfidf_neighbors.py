@@ -0,0 +1,166 @@
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# Top-k TF-IDF neighbors for TF_IDF_SIMILARITE.ipynb. Cosine scores come
+# from products of L2-normalized rows, one block of rows at a time,
+# and the k best of each row are picked with argpartition instead of sorting
+# all N scores in Python. Results are (n, k) index / score arrays; Arabic
+# reshaping for display happens only in display_titles().
+N_NEIGHBORS = 3
+MAX_FEATURES = 500
+BLOCK_ROWS = 512  # Rows scored at once, a dense block of BLOCK_ROWS x N floats
+DENSE_MAX_FEATURES = 1024  # Narrower vocabularies are multiplied densely (BLAS)
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tfidf_model')
+
+_matrix = None  # Corpus matrix of a worker process
+
+
+def top_k(scores, k, exclude=None):
+    """Indices and scores of the k highest scores of every row, best first.
+    exclude[i] is a column to leave out of row i (the row itself)"""
+    if exclude is not None:
+        scores[np.arange(len(scores)), exclude] = -np.inf
+    k = min(k, scores.shape[1] - (exclude is not None))
+    if k <= 0:
+        return np.empty((len(scores), 0), np.int64), np.empty((len(scores), 0), np.float32)
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    part_scores = np.take_along_axis(scores, part, axis=1)
+    order = np.argsort(-part_scores, axis=1, kind='stable')
+    return np.take_along_axis(part, order, axis=1), np.take_along_axis(part_scores, order, axis=1)
+
+
+def block_neighbors(queries, matrix, k, offset=None):
+    """Neighbors of every query row against the matrix, by blocks of rows.
+    offset is the position of queries[0] in matrix when they are the same rows"""
+    n = queries.shape[0]
+    indices = np.empty((n, k), np.int64)
+    scores = np.empty((n, k), np.float32)
+    # With max_features=500 rows are nearly dense, BLAS beats a sparse product
+    dense = matrix.shape[1] <= DENSE_MAX_FEATURES
+    transposed = np.ascontiguousarray(matrix.T.toarray()) if dense else matrix.T.tocsr()
+    for start in range(0, n, BLOCK_ROWS):
+        end = min(start + BLOCK_ROWS, n)
+        if dense:
+            block = queries[start:end].toarray() @ transposed
+        else:
+            block = (queries[start:end] @ transposed).toarray().astype(np.float32, copy=False)
+        exclude = None if offset is None else np.arange(offset + start, offset + end)
+        idx, sc = top_k(block, k, exclude)
+        indices[start:end, :idx.shape[1]] = idx
+        scores[start:end, :sc.shape[1]] = sc
+        if idx.shape[1] < k:  # Fewer documents than k
+            indices[start:end, idx.shape[1]:] = -1
+            scores[start:end, sc.shape[1]:] = np.nan
+    return indices, scores
+
+
+def _init_worker(matrix):
+    global _matrix
+    _matrix = matrix
+
+
+def _shard_neighbors(args):
+    start, end, k = args
+    return block_neighbors(_matrix[start:end], _matrix, k, offset=start)
+
+
+class TfidfNeighbors:
+    def __init__(self, k=N_NEIGHBORS, max_features=MAX_FEATURES, vectorizer=None):
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        self.k = k
+        self.vectorizer = vectorizer or TfidfVectorizer(max_features=max_features)
+        self.matrix = None
+
+    def fit(self, texts):
+        # TfidfVectorizer rows are already L2-normalized, a dot product is the cosine
+        self.matrix = self.vectorizer.fit_transform(texts).astype(np.float32).tocsr()
+        return self
+
+    def transform(self, texts):
+        return self.vectorizer.transform(texts).astype(np.float32).tocsr()
+
+    def kneighbors(self, k=None, workers=1):
+        """(indices, scores) of the k nearest other documents of every fitted document"""
+        k = k or self.k
+        n = self.matrix.shape[0]
+        if workers <= 1 or n < 2 * BLOCK_ROWS:
+            return block_neighbors(self.matrix, self.matrix, k, offset=0)
+
+        # Shard the rows over processes, each one gets the matrix once
+        bounds = np.linspace(0, n, workers + 1).astype(int)
+        shards = [(start, end, k) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(self.matrix,)) as pool:
+            results = list(pool.map(_shard_neighbors, shards))
+        return np.vstack([r[0] for r in results]), np.vstack([r[1] for r in results])
+
+    def query(self, texts, k=None):
+        """Nearest fitted documents of new texts"""
+        return block_neighbors(self.transform(texts), self.matrix, k or self.k)
+
+    def save(self, directory=MODEL_DIR):
+        import joblib
+        os.makedirs(directory, exist_ok=True)
+        joblib.dump(self.vectorizer, os.path.join(directory, 'vectorizer.joblib'))
+        sparse.save_npz(os.path.join(directory, 'matrix.npz'), self.matrix)
+
+    @classmethod
+    def load(cls, directory=MODEL_DIR, k=N_NEIGHBORS):
+        import joblib
+        model = cls(k, vectorizer=joblib.load(os.path.join(directory, 'vectorizer.joblib')))
+        model.matrix = sparse.load_npz(os.path.join(directory, 'matrix.npz')).tocsr()
+        return model
+
+
+def neighbors_frame(indices, scores, titles=None):
+    """The notebook's long layout: one row per (article, neighbor) pair"""
+    n, k = indices.shape
+    frame = pd.DataFrame({
+        'article_idx': np.repeat(np.arange(n), k),
+        'neighbor_idx': indices.ravel(),
+        'similarity_score': scores.ravel(),
+    })
+    frame = frame[frame['neighbor_idx'] >= 0]
+    if titles is not None:
+        titles = np.asarray(titles, dtype=object)
+        frame.insert(1, 'article_title', titles[frame['article_idx']])
+        frame.insert(3, 'neighbor_title', titles[frame['neighbor_idx']])
+    return frame.reset_index(drop=True)
+
+
+def reshape_arabic(text):
+    """Reshape and reorder Arabic for display"""
+    import arabic_reshaper
+    from bidi.algorithm import get_display
+    return get_display(arabic_reshaper.reshape(text))
+
+
+def display_titles(frame, columns=('article_title', 'neighbor_title')):
+    """Copy of a neighbors frame with Arabic titles reshaped, for printing only"""
+    frame = frame.copy()
+    for column in columns:
+        frame[column] = frame[column].astype(str).map(reshape_arabic)
+    return frame
+
+
+if __name__ == '__main__':
+    # python tfidf_neighbors.py full_data_fusionne.csv [workers]
+    args = sys.argv[1:]
+    df = pd.read_csv(args[0] if args else 'full_data_fusionne.csv')
+    workers = int(args[1]) if len(args) > 1 else 1
+    df = df[~df['tags'].isin(['NO_TAGS', 'no_tags'])].reset_index(drop=True)
+
+    started = time.perf_counter()
+    model = TfidfNeighbors().fit(df['content'].fillna(''))
+    indices, scores = model.kneighbors(workers=workers)
+    print(f"{len(df)} articles, {model.k} neighbors each in {time.perf_counter() - started:.2f}s")
+    model.save()
+
+    neighbors_df = neighbors_frame(indices, scores, df['title'])
+    neighbors_df.to_csv('tfidf_neighbors.csv', index=False)
+    print(display_titles(neighbors_df.head(20)))